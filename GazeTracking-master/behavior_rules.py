@@ -0,0 +1,341 @@
+"""Правила обнаружения подозрительного поведения для BehaviorAnalyzer.
+
+Кадр добавляется в общее окно последних кадров SampleWindow один раз, после чего
+каждое правило обновляет свои счетчики за O(1). Когда кадр покидает окно, правила
+получают уведомление и уменьшают счетчики, поэтому новое правило не добавляет
+прохода по истории. Правила задаются в CONFIG["behavior_rules"] списком словарей
+{"type": <тип>, "name": <имя в событиях>, "weight": <вес срабатывания>, параметры...}:
+
+    sustained_offcenter  min_consecutive_offcenter кадров вне центра (кадр в центре уменьшает счетчик)
+    offcenter_ratio      доля кадров вне центра в заполненном окне больше offcenter_threshold
+    frequent_glances     не меньше min_count взглядов в сторону среди последних window кадров
+    alternation          не меньше min_switches переходов влево-вправо среди последних window кадров
+    face_absent          лица нет в кадре дольше seconds (в том числе в режиме ожидания idle_backoff)
+    eyes_closed          глаза закрыты (blink) дольше seconds
+    multiple_faces       больше одного лица на min_frames кадрах подряд, где запускался детектор лица
+
+Параметры первых двух правил - параметры BehaviorAnalyzer, как и раньше.
+"""
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+from gaze_tracking import direction
+
+
+class Sample:
+    """Кадр окна: номер, время, код направления, число лиц и отметки правил (по биту на правило)."""
+
+    __slots__ = ("index", "timestamp", "code", "faces", "marks")
+
+    def __init__(self, index: int, timestamp: float, code: int, faces: Optional[int]):
+        self.index = index
+        self.timestamp = timestamp
+        self.code = code
+        self.faces = faces
+        self.marks = 0
+
+
+@dataclass
+class RuleEvent:
+    """Срабатывание правила: имя и тип правила, время кадра, подробности и вес в suspicious_actions."""
+    rule: str
+    kind: str
+    timestamp: float
+    details: Dict = field(default_factory=dict)
+    weight: int = 1
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"rule": self.rule, "kind": self.kind,
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.timestamp)), **self.details}
+
+
+class SampleWindow:
+    """Последние size кадров; о вытесненных кадрах сообщается правилам."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.samples = deque()
+        self.rules = []
+        self._next_index = 0
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def __iter__(self) -> Iterator[Sample]:
+        return iter(self.samples)
+
+    @property
+    def oldest_index(self) -> int:
+        return self.samples[0].index if self.samples else self._next_index
+
+    def push(self, timestamp: float, code: int, faces: Optional[int] = None) -> Sample:
+        sample = Sample(self._next_index, timestamp, code, faces)
+        self._next_index += 1
+        self.samples.append(sample)
+        self.truncate(self.size)
+        return sample
+
+    def truncate(self, keep: int) -> None:
+        """Удаление старых кадров, пока в окне больше keep кадров."""
+        while len(self.samples) > keep:
+            sample = self.samples.popleft()
+            for rule in self.rules:
+                rule.evicted(sample)
+
+    def resize(self, size: int) -> None:
+        self.size = size
+        self.truncate(size)
+
+
+class Rule:
+    """Правило: update вызывается для каждого кадра и возвращает подробности срабатывания или None.
+
+    absent вызывается, пока кадры не анализируются из-за отсутствия лица (режим ожидания
+    idle_backoff): лица нет с start до now, кадры за это время в окно не попадают.
+    """
+
+    kind = None
+
+    def __init__(self, name: Optional[str] = None, weight: int = 1):
+        self.name = name or self.kind
+        self.weight = weight
+        # Бит отметок кадров этого правила, назначается RuleEngine
+        self.bit = 0
+
+    def update(self, sample: Sample, window: SampleWindow) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def evicted(self, sample: Sample) -> None:
+        pass
+
+    def absent(self, start: float, now: float) -> Optional[Dict]:
+        return None
+
+
+class SustainedOffcenterRule(Rule):
+    kind = "sustained_offcenter"
+
+    def __init__(self, min_consecutive: int, **kwargs):
+        super().__init__(**kwargs)
+        self.min_consecutive = min_consecutive
+        self.count = 0
+
+    def update(self, sample, window):
+        self.count += 1 if sample.code & direction.OFFCENTER else -1
+        if self.count >= self.min_consecutive:
+            self.count = 0
+            return {"frames": self.min_consecutive}
+        return None
+
+
+class OffcenterRatioRule(Rule):
+    kind = "offcenter_ratio"
+
+    def __init__(self, threshold: float, **kwargs):
+        super().__init__(**kwargs)
+        self.threshold = threshold
+        self.count = 0
+
+    def update(self, sample, window):
+        if sample.code & direction.OFFCENTER:
+            self.count += 1
+        if len(window) >= window.size and self.count / window.size > self.threshold:
+            ratio = self.count / window.size
+            # Как прежде, в окне остается вторая половина (большая при нечетном размере)
+            window.truncate(-(-window.size // 2))
+            return {"ratio": round(ratio, 3)}
+        return None
+
+    def evicted(self, sample):
+        if sample.code & direction.OFFCENTER:
+            self.count -= 1
+
+
+class WindowCountRule(Rule):
+    """Число отмеченных кадров среди последних window кадров общего окна.
+
+    Кадр, выходящий из подокна, берется с конца общего окна; если его уже вытеснили,
+    счетчик был уменьшен в evicted. После срабатывания счет начинается заново.
+    """
+
+    def __init__(self, window: int, min_count: int, repeat: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.window = window
+        self.min_count = min_count
+        # repeat - срабатывание на каждом кадре, пока условие выполняется
+        self.repeat = repeat
+        self.count = 0
+        self.newest = -1
+        self.reset_index = -1
+
+    def counts(self, sample: Sample) -> bool:
+        raise NotImplementedError
+
+    def _forget(self, sample: Sample) -> None:
+        if sample.marks & self.bit and sample.index > self.reset_index:
+            self.count -= 1
+
+    def update(self, sample, window):
+        self.newest = sample.index
+        leaving = sample.index - self.window
+        if leaving >= window.oldest_index:
+            self._forget(window.samples[leaving - sample.index - 1])
+        if self.counts(sample):
+            sample.marks |= self.bit
+            self.count += 1
+        if self.count >= self.min_count:
+            details = {"count": self.count, "window": self.window}
+            if not self.repeat:
+                self.count = 0
+                self.reset_index = sample.index
+            return details
+        return None
+
+    def evicted(self, sample):
+        if sample.index > self.newest - self.window:
+            self._forget(sample)
+
+
+class FrequentGlancesRule(WindowCountRule):
+    kind = "frequent_glances"
+
+    def __init__(self, window: int = 10, min_count: int = 5, **kwargs):
+        super().__init__(window, min_count, **kwargs)
+
+    def counts(self, sample):
+        return bool(sample.code & direction.HORIZONTAL)
+
+
+class AlternationRule(WindowCountRule):
+    kind = "alternation"
+
+    def __init__(self, window: int = 20, min_switches: int = 4, **kwargs):
+        super().__init__(window, min_switches, **kwargs)
+        self.side = 0
+
+    def counts(self, sample):
+        side = sample.code & direction.HORIZONTAL
+        if not side or side == direction.HORIZONTAL:
+            return False
+        switched = self.side != 0 and side != self.side
+        self.side = side
+        return switched
+
+
+class DurationRule(Rule):
+    """Состояние (маска кодов направления) длится дольше seconds; одно срабатывание на эпизод."""
+
+    mask = 0
+
+    def __init__(self, seconds: float, **kwargs):
+        super().__init__(**kwargs)
+        self.seconds = seconds
+        self.since = None
+        self.reported = False
+
+    def update(self, sample, window):
+        if not sample.code & self.mask:
+            self.since = None
+            return None
+        if self.since is None:
+            self.since, self.reported = sample.timestamp, False
+        return self._elapsed(sample.timestamp)
+
+    def _elapsed(self, now: float) -> Optional[Dict]:
+        duration = now - self.since
+        if not self.reported and duration >= self.seconds:
+            self.reported = True
+            return {"duration": round(duration, 1)}
+        return None
+
+
+class FaceAbsentRule(DurationRule):
+    kind = "face_absent"
+    mask = direction.NO_FACE
+
+    def __init__(self, seconds: float = 5.0, **kwargs):
+        super().__init__(seconds, **kwargs)
+
+    def absent(self, start, now):
+        # Эпизод продолжается с первого кадра без лица, если он уже учтен в update
+        if self.since is None or start < self.since:
+            self.since, self.reported = start, False
+        return self._elapsed(now)
+
+
+class EyesClosedRule(DurationRule):
+    kind = "eyes_closed"
+    mask = direction.BLINK
+
+    def __init__(self, seconds: float = 2.0, **kwargs):
+        super().__init__(seconds, **kwargs)
+
+
+class MultipleFacesRule(Rule):
+    kind = "multiple_faces"
+
+    def __init__(self, min_frames: int = 3, **kwargs):
+        super().__init__(**kwargs)
+        self.min_frames = min_frames
+        self.streak = 0
+
+    def update(self, sample, window):
+        # Кадры, на которых детектор не запускался (faces is None), не прерывают и не продолжают серию
+        if sample.faces is None:
+            return None
+        if sample.faces <= 1:
+            self.streak = 0
+            return None
+        self.streak += 1
+        if self.streak == self.min_frames:
+            return {"faces": sample.faces, "frames": self.streak}
+        return None
+
+
+RULES = {rule.kind: rule for rule in (SustainedOffcenterRule, OffcenterRatioRule, FrequentGlancesRule,
+                                      AlternationRule, FaceAbsentRule, EyesClosedRule, MultipleFacesRule)}
+
+
+def create_rule(spec: Dict) -> Rule:
+    """Правило по описанию из конфигурации {"type": ..., параметры}."""
+    options = dict(spec)
+    kind = options.pop("type", None)
+    if kind not in RULES:
+        raise ValueError(f"Неизвестное правило: {kind}. Доступны: {', '.join(RULES)}")
+    return RULES[kind](**options)
+
+
+class RuleEngine:
+    """Общее окно кадров и правила, которые обновляются по каждому кадру в заданном порядке."""
+
+    def __init__(self, rules: List[Rule], window_size: int):
+        self.window = SampleWindow(window_size)
+        self.rules = []
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule: Rule) -> Rule:
+        rule.bit = 1 << len(self.rules)
+        self.rules.append(rule)
+        self.window.rules.append(rule)
+        return rule
+
+    def update(self, timestamp: float, code: int, faces: Optional[int] = None) -> List[RuleEvent]:
+        sample = self.window.push(timestamp, code, faces)
+        events = []
+        for rule in self.rules:
+            details = rule.update(sample, self.window)
+            if details is not None:
+                events.append(RuleEvent(rule.name, rule.kind, timestamp, details, rule.weight))
+        return events
+
+    def absent(self, start: float, now: float) -> List[RuleEvent]:
+        """Обновление правил интервалом без лица, кадры которого не анализировались."""
+        events = []
+        for rule in self.rules:
+            details = rule.absent(start, now)
+            if details is not None:
+                events.append(RuleEvent(rule.name, rule.kind, now, details, rule.weight))
+        return events
@@ -0,0 +1,290 @@
+"""Локальная трансляция событий для панелей наблюдателя.
+
+Подписчик подключается к локальному сокету ('host:port' для TCP или путь Unix-сокета)
+и отправляет строку со списком каналов через запятую (пустая строка - все каналы):
+gaze, detection, mark, session, presence. Сервер отправляет пакеты событий в виде
+4 байт длины (big-endian) и JSON {"events": [...], "dropped": N}.
+
+У каждого подписчика своя ограниченная очередь: если панель не успевает читать,
+старые события вытесняются и учитываются в dropped, а публикация никогда не ждет.
+Канал gaze прореживается до gaze_rate событий в секунду.
+
+    python event_feed.py client 127.0.0.1:8765 --channels detection,mark
+    python event_feed.py bench --events 100000 --subscribers 4
+"""
+import argparse
+import json
+import socket
+import socketserver
+import struct
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set
+
+HEADER = struct.Struct(">I")
+CHANNELS = ("gaze", "detection", "mark", "session", "presence")
+
+
+def encode_message(message: Dict) -> bytes:
+    payload = json.dumps(message, ensure_ascii=False).encode("utf-8")
+    return HEADER.pack(len(payload)) + payload
+
+
+def _split_address(address: str):
+    host, _, port = address.rpartition(":")
+    return (host or "127.0.0.1", int(port)) if port.isdigit() else None
+
+
+class Subscriber:
+    """Ограниченная очередь событий одного подписчика."""
+
+    def __init__(self, channels: Optional[Set[str]], max_buffer: int):
+        self.channels = channels
+        self.events = deque(maxlen=max_buffer)
+        self.dropped = 0
+        self.sent = 0
+        self.closed = False
+        self._condition = threading.Condition()
+
+    def wants(self, channel: str) -> bool:
+        return self.channels is None or channel in self.channels
+
+    def offer(self, event: Dict) -> None:
+        with self._condition:
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append(event)
+            self._condition.notify()
+
+    def take(self, batch_size: int, batch_interval: float, timeout: float = 0.5) -> List[Dict]:
+        """Пакет событий: ожидание первого события, затем до batch_interval на накопление пакета."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.events or self.closed, timeout):
+                return []
+            deadline = time.monotonic() + batch_interval
+            while len(self.events) < batch_size and not self.closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    break
+            return [self.events.popleft() for _ in range(min(batch_size, len(self.events)))]
+
+    def close(self) -> None:
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class EventFeed:
+    """Сервер публикации событий; publish вызывается из цикла обработки кадров и не блокируется."""
+
+    def __init__(self, address: str, max_buffer: int = 1000, batch_size: int = 64,
+                 batch_interval: float = 0.05, gaze_rate: float = 5.0):
+        self.address = address
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.gaze_rate = gaze_rate
+        self.subscribers = []
+        self.published = 0
+        self._lock = threading.Lock()
+        self._next_gaze = 0.0
+        self._server = None
+
+    @property
+    def server_address(self):
+        return self._server.server_address
+
+    def start(self) -> None:
+        feed = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                names = self.rfile.readline().decode("utf-8", errors="ignore").strip()
+                channels = {name.strip() for name in names.split(",") if name.strip()} or None
+                subscriber = feed.subscribe(channels)
+                try:
+                    while not subscriber.closed:
+                        events = subscriber.take(feed.batch_size, feed.batch_interval)
+                        if events:
+                            self.wfile.write(encode_message({"events": events, "dropped": subscriber.dropped}))
+                            subscriber.sent += len(events)
+                except OSError:
+                    pass
+                finally:
+                    feed.unsubscribe(subscriber)
+
+        tcp_address = _split_address(self.address)
+        if tcp_address is not None:
+            server_class = type("FeedServer", (socketserver.ThreadingMixIn, socketserver.TCPServer),
+                                {"daemon_threads": True, "allow_reuse_address": True})
+            self._server = server_class(tcp_address, Handler)
+        else:
+            server_class = type("FeedServer", (socketserver.ThreadingMixIn, socketserver.UnixStreamServer),
+                                {"daemon_threads": True})
+            Path(self.address).unlink(missing_ok=True)
+            self._server = server_class(self.address, Handler)
+        threading.Thread(target=self._server.serve_forever, name="event-feed", daemon=True).start()
+
+    def subscribe(self, channels: Optional[Set[str]] = None) -> Subscriber:
+        subscriber = Subscriber(channels, self.max_buffer)
+        with self._lock:
+            self.subscribers = self.subscribers + [subscriber]
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        subscriber.close()
+        with self._lock:
+            self.subscribers = [item for item in self.subscribers if item is not subscriber]
+
+    def publish(self, channel: str, payload: Dict, timestamp: Optional[float] = None) -> bool:
+        """Публикация события всем подписчикам канала. Возвращает False, если событие прорежено."""
+        subscribers = self.subscribers
+        if not subscribers:
+            return False
+        timestamp = time.time() if timestamp is None else timestamp
+        if channel == "gaze":
+            if timestamp < self._next_gaze:
+                return False
+            self._next_gaze = timestamp + 1.0 / self.gaze_rate
+        event = {"channel": channel, "ts": timestamp, **payload}
+        for subscriber in subscribers:
+            if subscriber.wants(channel):
+                subscriber.offer(event)
+        self.published += 1
+        return True
+
+    def close(self) -> None:
+        for subscriber in self.subscribers:
+            subscriber.close()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class EventFeedClient:
+    """Клиент трансляции для проверки и для простых панелей."""
+
+    def __init__(self, address: str, channels: Optional[List[str]] = None, timeout: Optional[float] = None):
+        tcp_address = _split_address(address)
+        if tcp_address is not None:
+            self.socket = socket.create_connection(tcp_address, timeout=timeout)
+        else:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.settimeout(timeout)
+            self.socket.connect(address)
+        self.socket.sendall((",".join(channels or []) + "\n").encode("utf-8"))
+        self._file = self.socket.makefile("rb")
+        self.dropped = 0
+
+    def receive(self) -> Optional[List[Dict]]:
+        """Следующий пакет событий или None, если сервер закрыл соединение."""
+        header = self._file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return None
+        message = json.loads(self._file.read(HEADER.unpack(header)[0]))
+        self.dropped = message["dropped"]
+        return message["events"]
+
+    def __iter__(self) -> Iterator[Dict]:
+        while True:
+            events = self.receive()
+            if events is None:
+                return
+            yield from events
+
+    def close(self) -> None:
+        self._file.close()
+        self.socket.close()
+
+
+def _percentile(values: List[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(int(share * len(values)), len(values) - 1)] if values else 0.0
+
+
+def run_client(address: str, channels: Optional[List[str]], report_interval: float = 5.0) -> None:
+    """Печать событий и статистики пропускной способности и задержки."""
+    client = EventFeedClient(address, channels)
+    count, latencies, start = 0, [], time.monotonic()
+    for event in client:
+        count += 1
+        latencies.append(time.time() - event["ts"])
+        if event["channel"] != "gaze":
+            print(json.dumps(event, ensure_ascii=False))
+        elapsed = time.monotonic() - start
+        if elapsed >= report_interval:
+            print(f"{count / elapsed:.0f} событий/с, задержка p50 {1000 * _percentile(latencies, 0.5):.1f} мс,"
+                  f" p95 {1000 * _percentile(latencies, 0.95):.1f} мс, потеряно {client.dropped}")
+            count, latencies, start = 0, [], time.monotonic()
+
+
+def benchmark(events: int = 100000, subscribers: int = 4, slow_subscribers: int = 1,
+              max_buffer: int = 1000) -> Dict[str, float]:
+    """Публикация events событий при subscribers читающих и slow_subscribers не читающих клиентах."""
+    feed = EventFeed("127.0.0.1:0", max_buffer=max_buffer)
+    feed.start()
+    address = "{}:{}".format(*feed.server_address)
+    received = [[] for _ in range(subscribers)]
+
+    def consume(index):
+        client = EventFeedClient(address, ["detection"])
+        for event in client:
+            received[index].append(time.time() - event["ts"])
+            if event.get("last"):
+                break
+        client.close()
+
+    readers = [threading.Thread(target=consume, args=(index,)) for index in range(subscribers)]
+    for reader in readers:
+        reader.start()
+    slow = [EventFeedClient(address, ["detection"]) for _ in range(slow_subscribers)]
+    while len(feed.subscribers) < subscribers + slow_subscribers:
+        time.sleep(0.01)
+
+    start = time.perf_counter()
+    for index in range(events):
+        feed.publish("detection", {"index": index, "last": index == events - 1})
+    publish_time = time.perf_counter() - start
+    for reader in readers:
+        reader.join(timeout=30)
+    total_time = time.perf_counter() - start
+
+    for client in slow:
+        client.close()
+    feed.close()
+    latencies = [latency for values in received for latency in values]
+    return {
+        "publish_us": 1e6 * publish_time / events,
+        "delivered_per_s": len(latencies) / total_time,
+        "received_share": len(latencies) / (events * max(subscribers, 1)),
+        "latency_p50_ms": 1000 * _percentile(latencies, 0.5),
+        "latency_p95_ms": 1000 * _percentile(latencies, 0.95)
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Трансляция событий для панелей наблюдателя")
+    commands = parser.add_subparsers(dest="command", required=True)
+    client_parser = commands.add_parser("client", help="подключение к трансляции")
+    client_parser.add_argument("address")
+    client_parser.add_argument("--channels", help="каналы через запятую: " + ", ".join(CHANNELS))
+    bench_parser = commands.add_parser("bench", help="замер пропускной способности и задержки")
+    bench_parser.add_argument("--events", type=int, default=100000)
+    bench_parser.add_argument("--subscribers", type=int, default=4)
+    bench_parser.add_argument("--slow-subscribers", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if args.command == "client":
+        run_client(args.address, args.channels.split(",") if args.channels else None)
+    else:
+        results = benchmark(args.events, args.subscribers, args.slow_subscribers)
+        print(f"Публикация: {results['publish_us']:.1f} мкс на событие")
+        print(f"Доставлено: {results['delivered_per_s']:.0f} событий/с ({results['received_share']:.0%})")
+        print(f"Задержка: p50 {results['latency_p50_ms']:.1f} мс, p95 {results['latency_p95_ms']:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Сохранение кадров до и после срабатывания детектора или ручной отметки.
+
+Последние кадры (уменьшенные или только область лица) хранятся в кольцевом буфере
+фиксированного размера. При событии кадры за pre_seconds до него и post_seconds
+после копируются из буфера и передаются фоновому потоку, который кодирует их
+в JPEG или видео в logs_dir/evidence. Цикл захвата кодированием не блокируется.
+"""
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class EvidenceRecorder:
+    """Кольцевой буфер кадров с фоновой записью окрестности событий."""
+
+    def __init__(self, logs_dir: str, fps: float = 5, pre_seconds: float = 5, post_seconds: float = 2,
+                 max_memory_mb: float = 32, width: int = 320, face_only: bool = False, face_size: int = 160,
+                 output_format: str = "jpeg", jpeg_quality: int = 80, queue_size: int = 2):
+        if output_format not in ("jpeg", "video"):
+            raise ValueError(f"Неизвестный формат доказательств: {output_format}")
+        self.logs_dir = Path(logs_dir)
+        self.fps = fps
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.max_bytes = int(max_memory_mb * 1024 * 1024)
+        self.width = width
+        self.face_only = face_only
+        self.face_size = face_size
+        self.output_format = output_format
+        self.jpeg_quality = jpeg_quality
+
+        self.frames = None
+        self.times = None
+        self.count = 0
+        self.dropped_events = 0
+        self._next_sample = 0.0
+        self._pending = []
+        self._event_number = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._encode_loop, name="evidence-encoder", daemon=True)
+        self._thread.start()
+
+    @property
+    def slots(self) -> int:
+        return 0 if self.frames is None else len(self.frames)
+
+    def _allocate(self, shape: Tuple[int, ...]) -> None:
+        """Выделение буфера под окно событий, но не больше max_memory_mb."""
+        wanted = max(int(np.ceil((self.pre_seconds + self.post_seconds) * self.fps)), 1)
+        affordable = max(self.max_bytes // int(np.prod(shape)), 1)
+        slots = min(wanted, affordable)
+        self.frames = np.zeros((slots,) + shape, np.uint8)
+        self.times = np.full(slots, -np.inf)
+        self.count = 0
+
+    def _prepare(self, frame: np.ndarray, face=None) -> np.ndarray:
+        if self.face_only:
+            if face is not None:
+                margin = face.width() // 4
+                top, left = max(face.top() - margin, 0), max(face.left() - margin, 0)
+                frame = frame[top:face.bottom() + margin, left:face.right() + margin]
+            return cv2.resize(frame, (self.face_size, self.face_size), interpolation=cv2.INTER_AREA)
+        height = max(int(frame.shape[0] * self.width / frame.shape[1]), 1)
+        return cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+
+    def add(self, frame: np.ndarray, face=None, timestamp: Optional[float] = None) -> None:
+        """Добавление кадра не чаще fps раз в секунду и завершение событий, окно которых закончилось."""
+        timestamp = time.time() if timestamp is None else timestamp
+        if timestamp >= self._next_sample:
+            # Небольшой допуск, чтобы кадры камеры с той же частотой не пропускались из-за джиттера
+            self._next_sample = timestamp + 0.9 / self.fps
+            small = self._prepare(frame, face)
+            if self.frames is None or small.shape != self.frames.shape[1:]:
+                self._allocate(small.shape)
+            slot = self.count % len(self.frames)
+            self.frames[slot] = small
+            self.times[slot] = timestamp
+            self.count += 1
+
+        while self._pending and timestamp >= self._pending[0][0] + self.post_seconds:
+            self._finish(*self._pending.pop(0))
+
+    def trigger(self, reason: str, timestamp: Optional[float] = None) -> str:
+        """Регистрация события. Возвращает путь к доказательствам относительно logs_dir."""
+        timestamp = time.time() if timestamp is None else timestamp
+        self._event_number += 1
+        name = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(timestamp))}_{reason}_{self._event_number}"
+        relative = f"evidence/{name}" + (".avi" if self.output_format == "video" else "")
+        self._pending.append((timestamp, relative))
+        return relative
+
+    def _snapshot(self, start: float, end: float) -> List[np.ndarray]:
+        if self.frames is None:
+            return []
+        order = np.argsort(self.times)
+        selected = [slot for slot in order if start <= self.times[slot] <= end]
+        return [self.frames[slot].copy() for slot in selected]
+
+    def _finish(self, timestamp: float, relative: str) -> None:
+        frames = self._snapshot(timestamp - self.pre_seconds, timestamp + self.post_seconds)
+        try:
+            self._queue.put_nowait((relative, frames))
+        except queue.Full:
+            self.dropped_events += 1
+            print(f"Кадры события {relative} не сохранены: очередь записи переполнена")
+
+    def _encode_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self.encode(*item)
+            except Exception as error:
+                print(f"Ошибка записи кадров события: {error}")
+            finally:
+                self._queue.task_done()
+
+    def encode(self, relative: str, frames: List[np.ndarray]) -> None:
+        """Запись кадров события в JPEG-файлы или видео."""
+        if not frames:
+            return
+        path = self.logs_dir / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if self.output_format == "video":
+            height, width = frames[0].shape[:2]
+            writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), self.fps, (width, height),
+                                     frames[0].ndim == 3)
+            for frame in frames:
+                writer.write(frame)
+            writer.release()
+        else:
+            path.mkdir(exist_ok=True)
+            for index, frame in enumerate(frames):
+                cv2.imwrite(str(path / f"{index:03d}.jpg"), frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+
+    def close(self) -> None:
+        """Запись незавершенных событий с уже имеющимися кадрами и остановка фонового потока."""
+        while self._pending:
+            timestamp, relative = self._pending.pop(0)
+            frames = self._snapshot(timestamp - self.pre_seconds, timestamp + self.post_seconds)
+            self._queue.put((relative, frames))
+        self._queue.put(None)
+        self._thread.join()
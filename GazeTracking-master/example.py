@@ -1,10 +1,13 @@
+import sys
 import cv2
 from gaze_tracking import GazeTracking
+from frame_sources import open_frame_source
 
-url = "http://192.168.91.138:8080/video"
+# Номер камеры, путь к видео или URL потока, например http://192.168.91.138:8080/video
+source = sys.argv[1] if len(sys.argv) > 1 else 0
 
 gaze = GazeTracking()
-webcam = cv2.VideoCapture(0)
+webcam = open_frame_source(source)
 
 # Устанавливаем размер окна (ширина, высота)
 window_width = 800
@@ -0,0 +1,331 @@
+import argparse
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def _align(offset: int, alignment: int = 64) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+class FrameRing:
+    """Кольцевой буфер кадров в разделяемой памяти между процессом захвата и процессами анализа.
+
+    Кадры пишутся в фиксированные слоты с порядковым номером и временем захвата,
+    читатели получают кадр как массив numpy прямо поверх разделяемой памяти, без копирования.
+    В режиме overwrite запись никогда не ждет, отстающий читатель пропускает кадры и может
+    проверить через is_valid, что слот не был перезаписан во время обработки. Без overwrite
+    запись ждет, пока все открытые читатели не освободят слот (release).
+    """
+
+    HEADER_SIZE = 64
+    _WRITE_SEQ, _SLOTS, _HEIGHT, _WIDTH, _CHANNELS, _READERS, _OVERWRITE = range(7)
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self._owner = owner
+        self._header = np.ndarray((8,), np.int64, shm.buf, 0)
+        slots, height, width, channels, readers = (int(value) for value in self._header[1:6])
+        self.shape = (height, width, channels) if channels else (height, width)
+        self.slots = slots
+        self.overwrite = bool(self._header[self._OVERWRITE])
+
+        offset = self.HEADER_SIZE
+        self._seqs = np.ndarray((slots,), np.int64, shm.buf, offset)
+        offset += 8 * slots
+        self._timestamps = np.ndarray((slots,), np.float64, shm.buf, offset)
+        offset += 8 * slots
+        self._cursors = np.ndarray((readers,), np.int64, shm.buf, offset)
+        offset = _align(offset + 8 * readers)
+        self._frames = np.ndarray((slots,) + self.shape, np.uint8, shm.buf, offset)
+
+    @staticmethod
+    def _size(shape: Tuple[int, ...], slots: int, max_readers: int) -> int:
+        return _align(FrameRing.HEADER_SIZE + 16 * slots + 8 * max_readers) + slots * int(np.prod(shape))
+
+    @classmethod
+    def create(cls, shape: Tuple[int, ...], slots: int = 8, max_readers: int = 4,
+               overwrite: bool = True, name: Optional[str] = None) -> "FrameRing":
+        """Создание буфера для кадров формы shape (высота, ширина[, каналы])."""
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls._size(shape, slots, max_readers))
+        header = np.ndarray((8,), np.int64, shm.buf, 0)
+        header[:] = 0
+        header[cls._SLOTS] = slots
+        header[cls._HEIGHT], header[cls._WIDTH] = shape[:2]
+        header[cls._CHANNELS] = shape[2] if len(shape) == 3 else 0
+        header[cls._READERS] = max_readers
+        header[cls._OVERWRITE] = int(overwrite)
+        del header
+        ring = cls(shm, owner=True)
+        ring._seqs[:] = 0
+        ring._cursors[:] = -1
+        return ring
+
+    @classmethod
+    def attach(cls, name: str) -> "FrameRing":
+        """Подключение к буферу, созданному другим процессом."""
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def write_seq(self) -> int:
+        """Номер последнего записанного кадра, 0 если кадров еще не было."""
+        return int(self._header[self._WRITE_SEQ])
+
+    def _wait_readers(self, seq: int, timeout: Optional[float]) -> bool:
+        """Ожидание, пока открытые читатели освободят слот, который займет кадр seq."""
+        oldest_needed = seq - self.slots
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            active = self._cursors[self._cursors >= 0]
+            if not active.size or active.min() >= oldest_needed:
+                return True
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+            time.sleep(0.0005)
+
+    def begin_write(self, timeout: Optional[float] = None) -> Optional[Tuple[int, np.ndarray]]:
+        """Резервирование следующего слота: номер кадра и массив для записи на месте,
+        например через cv2.VideoCapture.read(image). None, если читатели не освободили слот."""
+        seq = self.write_seq + 1
+        if not self.overwrite and not self._wait_readers(seq, timeout):
+            return None
+        slot = seq % self.slots
+        self._seqs[slot] = -1
+        return seq, self._frames[slot]
+
+    def commit_write(self, seq: int, timestamp: Optional[float] = None) -> None:
+        """Публикация кадра, записанного в слот из begin_write."""
+        slot = seq % self.slots
+        self._timestamps[slot] = time.time() if timestamp is None else timestamp
+        self._seqs[slot] = seq
+        self._header[self._WRITE_SEQ] = seq
+
+    def write(self, frame: np.ndarray, timestamp: Optional[float] = None,
+              timeout: Optional[float] = None) -> Optional[int]:
+        """Копирование кадра в буфер. Возвращает номер кадра или None, если кадр отброшен."""
+        if frame.shape != self.shape:
+            raise ValueError(f"Размер кадра {frame.shape} не совпадает с размером буфера {self.shape}")
+        reserved = self.begin_write(timeout)
+        if reserved is None:
+            return None
+        seq, slot = reserved
+        np.copyto(slot, frame)
+        self.commit_write(seq, timestamp)
+        return seq
+
+    def open_reader(self, reader_id: int) -> None:
+        """Регистрация читателя, запись будет ждать его в режиме без overwrite."""
+        self._cursors[reader_id] = self.write_seq
+
+    def close_reader(self, reader_id: int) -> None:
+        self._cursors[reader_id] = -1
+
+    def release(self, reader_id: int, seq: int) -> None:
+        """Отметка, что читатель закончил работу с кадром seq и всеми предыдущими."""
+        self._cursors[reader_id] = seq
+
+    def read(self, after_seq: int = 0, timeout: Optional[float] = None,
+             latest: bool = False) -> Optional[Tuple[int, float, np.ndarray]]:
+        """Следующий кадр после after_seq (или самый свежий при latest) без копирования:
+        номер, время захвата и массив поверх разделяемой памяти. None по истечении timeout."""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            write_seq = self.write_seq
+            if write_seq > after_seq:
+                seq = write_seq if latest else max(after_seq + 1, write_seq - self.slots + 1)
+                slot = seq % self.slots
+                timestamp = float(self._timestamps[slot])
+                if self._seqs[slot] == seq:
+                    return seq, timestamp, self._frames[slot]
+                continue
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+            time.sleep(0.0005)
+
+    def is_valid(self, seq: int) -> bool:
+        """Проверка, что слот кадра seq не был перезаписан."""
+        return self._seqs[seq % self.slots] == seq
+
+    def close(self) -> None:
+        """Отключение от буфера. Полученные через read массивы должны быть уже освобождены."""
+        del self._header, self._seqs, self._timestamps, self._cursors, self._frames
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def capture_process(ring_name: str, source, stop_event) -> None:
+    """Процесс захвата: кадры камеры пишутся прямо в слоты буфера."""
+    ring = FrameRing.attach(ring_name)
+    capture = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    slot = frame = None
+    try:
+        while not stop_event.is_set():
+            reserved = ring.begin_write(timeout=0.5)
+            if reserved is None:
+                continue
+            seq, slot = reserved
+            ok, frame = capture.read(slot)
+            if not ok:
+                break
+            if frame is not None and not np.shares_memory(frame, slot):
+                np.copyto(slot, frame)
+            ring.commit_write(seq)
+    finally:
+        capture.release()
+        del slot, frame
+        ring.close()
+        stop_event.set()
+
+
+def analysis_process(ring_name: str, reader_id: int, stop_event, results) -> None:
+    """Процесс анализа: GazeTracking.refresh работает прямо над кадром в разделяемой памяти."""
+    from gaze_tracking import GazeTracking
+
+    ring = FrameRing.attach(ring_name)
+    ring.open_reader(reader_id)
+    gaze = GazeTracking()
+    seq = 0
+    try:
+        while not stop_event.is_set():
+            item = ring.read(seq, timeout=0.5, latest=True)
+            if item is None:
+                continue
+            seq, timestamp, frame = item
+            gaze.refresh(frame)
+            gaze.frame = None
+            del frame, item
+            if ring.is_valid(seq):
+                results.put((reader_id, seq, timestamp, gaze.horizontal_ratio(), gaze.vertical_ratio()))
+            ring.release(reader_id, seq)
+    finally:
+        ring.close_reader(reader_id)
+        ring.close()
+
+
+def _ring_consumer(ring_name: str, count: int, done) -> None:
+    ring = FrameRing.attach(ring_name)
+    seq = checksum = 0
+    for _ in range(count):
+        seq, _, frame = ring.read(seq, timeout=10)
+        checksum += int(frame[0, 0, 0])
+        del frame
+        ring.release(0, seq)
+    ring.close()
+    done.put(checksum)
+
+
+def _queue_consumer(frames, count: int, done) -> None:
+    checksum = 0
+    for _ in range(count):
+        frame = frames.get()
+        checksum += int(frame[0, 0, 0])
+    done.put(checksum)
+
+
+def benchmark(shape: Tuple[int, int, int] = (1080, 1920, 3), count: int = 300, slots: int = 8) -> dict:
+    """Сравнение пропускной способности буфера и очереди multiprocessing с сериализацией кадров."""
+    frame = np.random.randint(0, 255, shape, np.uint8)
+    megabytes = frame.nbytes * count / 2 ** 20
+    results = {}
+    done = multiprocessing.Queue()
+
+    ring = FrameRing.create(shape, slots, max_readers=1, overwrite=False)
+    ring.open_reader(0)
+    consumer = multiprocessing.Process(target=_ring_consumer, args=(ring.name, count, done))
+    consumer.start()
+    start = time.perf_counter()
+    for _ in range(count):
+        ring.write(frame)
+    done.get()
+    elapsed = time.perf_counter() - start
+    consumer.join()
+    ring.close()
+    results["shared_memory"] = {"fps": count / elapsed, "mb_per_s": megabytes / elapsed}
+
+    frames = multiprocessing.Queue(maxsize=slots)
+    consumer = multiprocessing.Process(target=_queue_consumer, args=(frames, count, done))
+    consumer.start()
+    start = time.perf_counter()
+    for _ in range(count):
+        frames.put(frame)
+    done.get()
+    elapsed = time.perf_counter() - start
+    consumer.join()
+    results["pickled_queue"] = {"fps": count / elapsed, "mb_per_s": megabytes / elapsed}
+    return results
+
+
+def run_pipeline(source, analyzers: int = 1, slots: int = 8, overwrite: bool = True,
+                 duration: float = 10.0) -> None:
+    """Запуск процесса захвата и процессов анализа над общим буфером кадров."""
+    probe = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    ok, frame = probe.read()
+    probe.release()
+    if not ok:
+        raise ValueError(f"Не удалось получить кадр из источника {source}")
+
+    ring = FrameRing.create(frame.shape, slots, max_readers=analyzers, overwrite=overwrite)
+    stop_event = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=analysis_process, args=(ring.name, reader_id, stop_event, results))
+                 for reader_id in range(analyzers)]
+    processes.append(multiprocessing.Process(target=capture_process, args=(ring.name, source, stop_event)))
+    for process in processes:
+        process.start()
+
+    processed = [0] * analyzers
+    start = time.perf_counter()
+    try:
+        while not stop_event.is_set() and time.perf_counter() - start < duration:
+            try:
+                reader_id, seq, timestamp, horizontal, vertical = results.get(timeout=0.5)
+            except Exception:
+                continue
+            processed[reader_id] += 1
+    finally:
+        stop_event.set()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+        print(f"Записано кадров: {ring.write_seq}, "
+              f"обработано: {', '.join(f'{count / elapsed:.1f} к/с' for count in processed)}")
+        ring.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Передача кадров между процессами через разделяемую память")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    bench = subparsers.add_parser("benchmark", help="сравнение с очередью multiprocessing")
+    bench.add_argument("--width", type=int, default=1920)
+    bench.add_argument("--height", type=int, default=1080)
+    bench.add_argument("--frames", type=int, default=300)
+    bench.add_argument("--slots", type=int, default=8)
+
+    run = subparsers.add_parser("run", help="захват и анализ в отдельных процессах")
+    run.add_argument("--source", default="0")
+    run.add_argument("--analyzers", type=int, default=1)
+    run.add_argument("--slots", type=int, default=8)
+    run.add_argument("--backpressure", action="store_true", help="ждать читателей вместо перезаписи")
+    run.add_argument("--duration", type=float, default=10.0)
+
+    args = parser.parse_args()
+    if args.command == "benchmark":
+        results = benchmark((args.height, args.width, 3), args.frames, args.slots)
+        for transport, stats in results.items():
+            print(f"{transport}: {stats['fps']:.1f} к/с, {stats['mb_per_s']:.0f} МБ/с")
+    else:
+        run_pipeline(args.source, args.analyzers, args.slots, not args.backpressure, args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""Источники кадров: камера, видеофайл и синтетический источник для тестов.
+
+Все источники читаются как cv2.VideoCapture (read() -> (ok, frame), release()),
+сообщают время последнего кадра и ведут статистику: среднее время ожидания
+кадра в read() и фактическую частоту выдачи кадров. Если частота ниже
+запрошенной, а ожидание велико, проблема в камере; если ожидание мало,
+а частота низкая, не успевает обработка.
+
+    python frame_sources.py 0 --width 640 --height 480 --fps 30 --fourcc MJPG
+    python frame_sources.py lecture.avi --fast
+"""
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+
+class EndOfStream(Exception):
+    """Источник больше не выдает кадры: видеофайл закончился или камера отключена."""
+
+
+class FrameSource:
+    """Общая часть источников: чтение кадра с учетом задержки и частоты."""
+
+    # Время кадра отсчитывается от начала видео, а не по часам системы
+    relative_time = False
+    # Частота, с которой источник выдает кадры; по ней оцениваются пропущенные кадры
+    nominal_fps = None
+
+    def __init__(self, smoothing: float = 0.1):
+        self.smoothing = smoothing
+        self.frames = 0
+        self.failures = 0
+        # Кадры, которые источник выдал, но которые не были прочитаны: счетчик не сбрасывается
+        self.frames_dropped = 0
+        # Время последнего кадра: для камеры - время получения, для файла - позиция в видео
+        self.timestamp = None
+        self.latency = 0.0
+        self._interval = None
+        self._last_read = None
+        self._opened_at = time.perf_counter()
+        self._opened_wall = time.time()
+
+    def _read(self) -> Tuple[bool, Optional[np.ndarray], Optional[float]]:
+        raise NotImplementedError
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        start = time.perf_counter()
+        ok, frame, timestamp = self._read()
+        end = time.perf_counter()
+        if not ok:
+            self.failures += 1
+            return False, None
+
+        self.frames += 1
+        if self.nominal_fps and self.timestamp is not None:
+            self.frames_dropped += max(int(round((timestamp - self.timestamp) * self.nominal_fps)) - 1, 0)
+        self.timestamp = timestamp
+        # Экспоненциальное сглаживание: значения отражают последние секунды работы
+        waited = end - start
+        self.latency = waited if self.frames == 1 else self.latency + self.smoothing * (waited - self.latency)
+        if self._last_read is not None:
+            interval = end - self._last_read
+            self._interval = interval if self._interval is None else \
+                self._interval + self.smoothing * (interval - self._interval)
+        self._last_read = end
+        return True, frame
+
+    @property
+    def wall_time(self) -> Optional[float]:
+        """Время последнего кадра по часам системы; для видео - момент открытия плюс позиция кадра."""
+        if self.timestamp is None or not self.relative_time:
+            return self.timestamp
+        return self._opened_wall + self.timestamp
+
+    @property
+    def fps(self) -> float:
+        """Фактическая частота выдачи кадров."""
+        return 1.0 / self._interval if self._interval else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        elapsed = time.perf_counter() - self._opened_at
+        return {
+            "frames": self.frames,
+            "failures": self.failures,
+            "dropped": self.frames_dropped,
+            "fps": self.fps,
+            "average_fps": self.frames / elapsed if elapsed > 0 else 0.0,
+            "latency_ms": 1000 * self.latency
+        }
+
+    def release(self) -> None:
+        pass
+
+
+class CameraSource(FrameSource):
+    """Камера или сетевой поток с согласованием разрешения, частоты и формата.
+
+    MJPG уменьшает нагрузку на USB при высоком разрешении, буфер драйвера
+    в один кадр не дает читать устаревшие кадры, если обработка медленнее камеры.
+    """
+
+    def __init__(self, source: Union[int, str] = 0, width: Optional[int] = None, height: Optional[int] = None,
+                 fps: Optional[float] = None, fourcc: Optional[str] = "MJPG", buffer_size: Optional[int] = 1):
+        super().__init__()
+        self.source = source
+        self.capture = cv2.VideoCapture(source)
+        # Формат задается до разрешения: некоторые драйверы иначе сбрасывают размер кадра
+        if fourcc:
+            self.capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        if width:
+            self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        if height:
+            self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps:
+            self.capture.set(cv2.CAP_PROP_FPS, fps)
+        if buffer_size:
+            self.capture.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+        self.nominal_fps = self.capture.get(cv2.CAP_PROP_FPS) or None
+
+    def negotiated(self) -> Dict[str, object]:
+        """Параметры, которые драйвер установил на самом деле."""
+        code = int(self.capture.get(cv2.CAP_PROP_FOURCC))
+        return {
+            "width": int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": self.capture.get(cv2.CAP_PROP_FPS),
+            "fourcc": "".join(chr((code >> (8 * index)) & 0xFF) for index in range(4)) if code else None,
+            "buffer_size": int(self.capture.get(cv2.CAP_PROP_BUFFERSIZE))
+        }
+
+    def _read(self):
+        ok, frame = self.capture.read()
+        return ok, frame, time.time()
+
+    def release(self) -> None:
+        self.capture.release()
+
+
+class VideoFileSource(FrameSource):
+    """Видеофайл. Время кадра берется из позиции в файле; в реальном времени кадры
+    выдаются с частотой файла, в режиме realtime=False - так быстро, как их читают."""
+
+    relative_time = True
+
+    def __init__(self, path: str, realtime: bool = True, loop: bool = False):
+        super().__init__()
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise ValueError(f"Не удалось открыть видеофайл: {path}")
+        self.file_fps = self.nominal_fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_index = -1
+        self._offset = 0.0
+        self._clock_start = None
+
+    def _read(self):
+        ok, frame = self.capture.read()
+        if not ok and self.loop and self.frame_index >= 0:
+            # Следующий проход продолжает шкалу времени, чтобы она оставалась монотонной
+            self._offset = self.timestamp + 1.0 / self.file_fps
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.capture.read()
+        if not ok:
+            return False, None, None
+
+        self.frame_index += 1
+        position = self.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if position <= 0 and self.frame_index and self._offset == 0:
+            position = self.frame_index / self.file_fps
+        timestamp = self._offset + position
+
+        if self.realtime:
+            if self._clock_start is None:
+                self._clock_start = time.perf_counter() - timestamp
+            delay = self._clock_start + timestamp - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return True, frame, timestamp
+
+    def release(self) -> None:
+        self.capture.release()
+
+
+class SyntheticSource(FrameSource):
+    """Детерминированный источник: лицо с двумя глазами, зрачки движутся по заданному
+    закону. Время кадра - номер кадра, деленный на fps; ожидания нет, если realtime=False."""
+
+    relative_time = True
+
+    def __init__(self, count: Optional[int] = None, size: Tuple[int, int] = (320, 240), fps: float = 30.0,
+                 amplitude: int = 8, period: int = 60, realtime: bool = False):
+        super().__init__()
+        self.count = count
+        self.size = size
+        self.synthetic_fps = self.nominal_fps = fps
+        self.amplitude = amplitude
+        self.period = period
+        self.realtime = realtime
+        self.frame_index = -1
+        self._clock_start = None
+
+    def frame(self, index: int) -> np.ndarray:
+        """Кадр с номером index: серый фон, белки глаз и зрачки со смещением по синусоиде."""
+        width, height = self.size
+        frame = np.full((height, width, 3), 120, np.uint8)
+        offset = int(round(self.amplitude * np.sin(2 * np.pi * index / self.period)))
+        eye_y = int(height * 0.46)
+        for eye_x in (int(width * 0.34), int(width * 0.66)):
+            cv2.ellipse(frame, (eye_x, eye_y), (25, 10), 0, 0, 360, (235, 235, 235), -1)
+            cv2.circle(frame, (eye_x + offset, eye_y), 7, (20, 20, 20), -1)
+        return frame
+
+    def _read(self):
+        if self.count is not None and self.frame_index + 1 >= self.count:
+            return False, None, None
+        self.frame_index += 1
+        timestamp = self.frame_index / self.synthetic_fps
+        if self.realtime:
+            if self._clock_start is None:
+                self._clock_start = time.perf_counter()
+            delay = self._clock_start + timestamp - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return True, self.frame(self.frame_index), timestamp
+
+
+def open_frame_source(source: Union[int, str] = 0, width: Optional[int] = None, height: Optional[int] = None,
+                      fps: Optional[float] = None, fourcc: Optional[str] = "MJPG", buffer_size: Optional[int] = 1,
+                      realtime: bool = True) -> FrameSource:
+    """Источник по описанию: номер камеры, 'synthetic[:число кадров]', путь к видеофайлу или URL потока."""
+    if isinstance(source, int) or str(source).isdigit():
+        return CameraSource(int(source), width, height, fps, fourcc, buffer_size)
+    source = str(source)
+    if source == "synthetic" or source.startswith("synthetic:"):
+        count = source.partition(":")[2]
+        return SyntheticSource(int(count) if count else None, (width or 320, height or 240), fps or 30.0,
+                               realtime=realtime)
+    if Path(source).is_file():
+        return VideoFileSource(source, realtime)
+    return CameraSource(source, width, height, fps, fourcc, buffer_size)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Проверка источника кадров: частота и задержка чтения")
+    parser.add_argument("source", help="номер камеры, путь к видео, URL потока или synthetic[:N]")
+    parser.add_argument("--width", type=int)
+    parser.add_argument("--height", type=int)
+    parser.add_argument("--fps", type=float)
+    parser.add_argument("--fourcc", default="MJPG")
+    parser.add_argument("--buffer-size", type=int, default=1)
+    parser.add_argument("--fast", action="store_true", help="видео читается без паузы между кадрами")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    source = open_frame_source(args.source, args.width, args.height, args.fps, args.fourcc or None,
+                               args.buffer_size, realtime=not args.fast)
+    if isinstance(source, CameraSource):
+        print(f"Параметры камеры: {source.negotiated()}")
+    deadline = time.perf_counter() + args.seconds
+    try:
+        while time.perf_counter() < deadline:
+            ok, _ = source.read()
+            if not ok:
+                break
+    finally:
+        source.release()
+    stats = source.stats()
+    print(f"Кадров: {stats['frames']}, ошибок чтения: {stats['failures']}, пропущено: {stats['dropped']}")
+    print(f"Частота: {stats['average_fps']:.1f} к/с, ожидание кадра: {stats['latency_ms']:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
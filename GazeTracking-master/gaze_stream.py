@@ -0,0 +1,217 @@
+"""Асинхронный потоковый интерфейс к анализу взгляда для встраивания в asyncio-сервисы.
+
+Чтение кадров и анализ выполняются в пулах потоков, поэтому цикл событий не
+блокируется и один процесс обслуживает несколько сеансов вместе с сетевым вводом-выводом:
+
+    async with GazeStream(open_frame_source(0)) as stream:
+        async for event in stream:
+            if isinstance(event, DetectionEvent):
+                await notify(event.report)
+
+Если анализ не успевает за источником, backpressure="latest" анализирует только
+самый свежий кадр (остальные отбрасываются и учитываются в dropped), а "queue"
+хранит до queue_size кадров и приостанавливает чтение, пока очередь полна.
+При выходе из цикла, закрытии или отмене задачи источник освобождается после
+завершения текущего чтения.
+
+    python gaze_stream.py synthetic:300 --sessions 4 --backpressure latest
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Union
+
+from gaze_tracking import direction
+from main import CONFIG, BehaviorAnalyzer, GazeTracker
+from frame_sources import FrameSource, open_frame_source
+
+LATEST, QUEUE = "latest", "queue"
+
+
+@dataclass
+class GazeSample:
+    """Результат анализа кадра: код и название направления (gaze_tracking.direction)."""
+    timestamp: float
+    code: int
+    direction: str
+    reused: bool
+    dropped: int
+
+
+@dataclass
+class DetectionEvent:
+    """Срабатывание BehaviorAnalyzer с его отчетом."""
+    timestamp: float
+    report: Dict
+
+
+@dataclass
+class AbsenceEvent:
+    """Завершившийся интервал без лица в кадре (при включенном idle_backoff)."""
+    start: float
+    end: float
+
+
+StreamEvent = Union[GazeSample, DetectionEvent, AbsenceEvent]
+
+
+class GazeStream:
+    """Асинхронный итератор событий анализа взгляда по источнику кадров."""
+
+    def __init__(self, source, gaze_tracker: Optional[GazeTracker] = None,
+                 analyzer: Optional[BehaviorAnalyzer] = None, backpressure: str = LATEST, queue_size: int = 8,
+                 executor: Optional[Executor] = None, interval: Optional[float] = None, calibrate: bool = True):
+        if backpressure not in (LATEST, QUEUE):
+            raise ValueError(f"Неизвестный режим backpressure: {backpressure}")
+        self.source = source
+        self.gaze_tracker = GazeTracker(debug=False) if gaze_tracker is None else gaze_tracker
+        self.analyzer = BehaviorAnalyzer() if analyzer is None else analyzer
+        self.backpressure = backpressure
+        self.queue_size = queue_size
+        # Общий пул анализа можно передать для нескольких сеансов; кадры одного сеанса
+        # анализируются по очереди, так как GazeTracker хранит состояние
+        self.executor = executor
+        self.interval = interval
+        self.calibrate = calibrate
+        self.frames = 0
+        self.dropped = 0
+        self.closed = False
+        # Чтение блокирует поток до прихода кадра, поэтому у каждого сеанса свой поток захвата
+        self._capture_executor = ThreadPoolExecutor(1, thread_name_prefix="capture")
+        self._events = None
+
+    def __aiter__(self) -> AsyncIterator[StreamEvent]:
+        if self._events is None:
+            self._events = self._run()
+        return self._events
+
+    async def __aenter__(self) -> "GazeStream":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Остановка потока и освобождение источника."""
+        if self._events is not None:
+            await self._events.aclose()
+        if not self.closed:
+            await self._release()
+
+    async def _release(self) -> None:
+        self.closed = True
+        loop = asyncio.get_running_loop()
+        # В том же потоке, что и чтение: источник освобождается после завершения текущего read()
+        await loop.run_in_executor(self._capture_executor, self.source.release)
+        self._capture_executor.shutdown(wait=False)
+
+    async def _capture(self, frames: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                ok, frame = await loop.run_in_executor(self._capture_executor, self.source.read)
+                if not ok:
+                    break
+                # Время видеофайла и синтетического источника отсчитывается от начала: правилам нужно время по часам
+                item = (frame, self.source.wall_time if isinstance(self.source, FrameSource) else None)
+                if self.backpressure == LATEST:
+                    # Неанализированный кадр заменяется более свежим
+                    while not frames.empty():
+                        frames.get_nowait()
+                        self.dropped += 1
+                await frames.put(item)
+            await frames.put(StopAsyncIteration())
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            await frames.put(error)
+
+    async def _run(self) -> AsyncIterator[StreamEvent]:
+        loop = asyncio.get_running_loop()
+        # В режиме latest в очереди не больше одного кадра и, возможно, признак конца потока
+        frames = asyncio.Queue(0 if self.backpressure == LATEST else self.queue_size)
+        if self.calibrate and not self.gaze_tracker.calibrated:
+            self.gaze_tracker.calibrate()
+        capture = asyncio.ensure_future(self._capture(frames))
+        dropped = 0
+        try:
+            while True:
+                started = time.perf_counter()
+                item = await frames.get()
+                if isinstance(item, StopAsyncIteration):
+                    return
+                if isinstance(item, Exception):
+                    raise item
+
+                frame, timestamp = item
+                name = await loop.run_in_executor(self.executor, self.gaze_tracker.process_frame, frame, timestamp)
+                self.frames += 1
+                timestamp = self.gaze_tracker.frame_time
+                # Кадры без лица в режиме ожидания не анализируются: правила получают интервалы отсутствия
+                rule_events = []
+                for start, end in self.gaze_tracker.absent_intervals:
+                    rule_events += self.analyzer.analyze_absence(start, end)
+                    yield AbsenceEvent(start, end)
+                self.gaze_tracker.absent_intervals = []
+                idle = self.gaze_tracker.idle
+                if idle is not None and idle.idle:
+                    rule_events += self.analyzer.analyze_absence(idle.absent_since, timestamp)
+
+                code = self.gaze_tracker.direction
+                yield GazeSample(timestamp, code, direction.to_name(code), self.gaze_tracker.last_sample_reused,
+                                 self.dropped - dropped)
+                dropped = self.dropped
+                sampled = bool(name) and code != direction.NOT_CALIBRATED
+                if sampled:
+                    self.analyzer.analyze_gaze_pattern(code, self.gaze_tracker.face_count, timestamp)
+                if (sampled or rule_events) and self.analyzer.detect_cheating():
+                    yield DetectionEvent(timestamp, self.analyzer.generate_report())
+
+                if self.interval is not None:
+                    await asyncio.sleep(max(self.interval - (time.perf_counter() - started), 0))
+        finally:
+            capture.cancel()
+            try:
+                await capture
+            except asyncio.CancelledError:
+                pass
+            if not self.closed:
+                await self._release()
+
+
+async def _session(index: int, args: argparse.Namespace, executor: Executor) -> Dict[str, float]:
+    counts = {"samples": 0, "detections": 0}
+    start = time.perf_counter()
+    async with GazeStream(open_frame_source(args.source, realtime=True), backpressure=args.backpressure,
+                          executor=executor) as stream:
+        async for event in stream:
+            if isinstance(event, GazeSample):
+                counts["samples"] += 1
+            elif isinstance(event, DetectionEvent):
+                counts["detections"] += 1
+        counts["dropped"] = stream.dropped
+    counts["seconds"] = time.perf_counter() - start
+    print(f"Сеанс {index}: кадров {counts['samples']}, отброшено {counts['dropped']}, "
+          f"срабатываний {counts['detections']}, {counts['seconds']:.1f} с")
+    return counts
+
+
+async def _main(args: argparse.Namespace) -> None:
+    with ThreadPoolExecutor(args.workers, thread_name_prefix="analysis") as executor:
+        await asyncio.gather(*(_session(index, args, executor) for index in range(args.sessions)))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Несколько сеансов анализа взгляда в одном цикле asyncio")
+    parser.add_argument("source", nargs="?", default=str(CONFIG["camera_source"]),
+                        help="номер камеры, путь к видео, URL потока или synthetic[:N]")
+    parser.add_argument("--sessions", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=2, help="потоков анализа на все сеансы")
+    parser.add_argument("--backpressure", choices=(LATEST, QUEUE), default=LATEST)
+    asyncio.run(_main(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,7 @@
-from .gaze_tracking import GazeTracking
+from .gaze_tracking import LANDMARKS_MODEL, GazeBatch, GazeTracking, batch_from_rows, load_models
+from .motion import MotionGate
+from .idle import IdleBackoff
+from .prediction import GazePredictor
+from .recording import SessionRecorder, landmarks_to_detection, read_recording
+from .face_detector import DlibHogDetector, HaarCascadeDetector, create_face_detector
+from . import direction
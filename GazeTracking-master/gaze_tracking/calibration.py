@@ -1,4 +1,5 @@
 from __future__ import division
+import threading
 import cv2
 from .pupil import Pupil
 
@@ -7,16 +8,19 @@ class Calibration(object):
     """
     This class calibrates the pupil detection algorithm by finding the
     best binarization threshold value for the person and the webcam.
+    Both eyes can be evaluated concurrently from different threads.
     """
 
     def __init__(self):
         self.nb_frames = 20
         self.thresholds_left = []
         self.thresholds_right = []
+        self._lock = threading.Lock()
 
     def is_complete(self):
         """Returns true if the calibration is completed"""
-        return len(self.thresholds_left) >= self.nb_frames and len(self.thresholds_right) >= self.nb_frames
+        with self._lock:
+            return len(self.thresholds_left) >= self.nb_frames and len(self.thresholds_right) >= self.nb_frames
 
     def threshold(self, side):
         """Returns the threshold value for the given eye.
@@ -24,10 +28,11 @@ class Calibration(object):
         Argument:
             side: Indicates whether it's the left eye (0) or the right eye (1)
         """
-        if side == 0:
-            return int(sum(self.thresholds_left) / len(self.thresholds_left))
-        elif side == 1:
-            return int(sum(self.thresholds_right) / len(self.thresholds_right))
+        with self._lock:
+            if side == 0:
+                return int(sum(self.thresholds_left) / len(self.thresholds_left))
+            elif side == 1:
+                return int(sum(self.thresholds_right) / len(self.thresholds_right))
 
     @staticmethod
     def iris_size(frame):
@@ -71,7 +76,8 @@ class Calibration(object):
         """
         threshold = self.find_best_threshold(eye_frame)
 
-        if side == 0:
-            self.thresholds_left.append(threshold)
-        elif side == 1:
-            self.thresholds_right.append(threshold)
+        with self._lock:
+            if side == 0:
+                self.thresholds_left.append(threshold)
+            elif side == 1:
+                self.thresholds_right.append(threshold)
@@ -0,0 +1,72 @@
+from __future__ import division
+import argparse
+import glob
+import os
+import time
+import cv2
+import numpy as np
+from .face_detector import create_face_detector
+
+
+def load_frames(frames_dir, max_frames=None):
+    """Returns the grayscale images of a folder, sorted by file name"""
+    paths = sorted(path for pattern in ("*.jpg", "*.jpeg", "*.png", "*.bmp")
+                   for path in glob.glob(os.path.join(frames_dir, pattern)))
+    frames = [cv2.imread(path, cv2.IMREAD_GRAYSCALE) for path in paths[:max_frames]]
+    return [frame for frame in frames if frame is not None]
+
+
+def benchmark(detectors, frames):
+    """Runs every detector over the frames and returns, for each of them,
+    the mean and 95th percentile latency in milliseconds and the hit rate
+    (share of frames where at least one face was found)
+
+    Arguments:
+        detectors (dict): Detectors by configuration name
+        frames (list): Grayscale frames
+    """
+    results = {}
+    for name, detector in detectors.items():
+        latencies = []
+        hits = 0
+        for frame in frames:
+            start = time.perf_counter()
+            faces = detector(frame)
+            latencies.append(time.perf_counter() - start)
+            hits += len(faces) > 0
+        latencies = np.array(latencies) * 1000
+        results[name] = {
+            "mean_ms": float(latencies.mean()) if frames else 0.0,
+            "p95_ms": float(np.percentile(latencies, 95)) if frames else 0.0,
+            "hit_rate": hits / len(frames) if frames else 0.0,
+        }
+    return results
+
+
+DEFAULT_CONFIGURATIONS = {
+    "dlib_hog": ("dlib_hog", {}),
+    "dlib_hog_upsample1": ("dlib_hog", {"upsample": 1}),
+    "dlib_hog_scale0.5": ("dlib_hog", {"scale": 0.5}),
+    "haar_default": ("haar", {}),
+    "haar_alt2": ("haar", {"cascade": "haarcascade_frontalface_alt2.xml"}),
+    "haar_scale0.5": ("haar", {"scale": 0.5, "min_size": (30, 30)}),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares the face detector backends on a folder of frames")
+    parser.add_argument("frames_dir", help="folder of .jpg/.png frames")
+    parser.add_argument("--max-frames", type=int, default=None)
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames_dir, args.max_frames)
+    detectors = {name: create_face_detector(backend, **options)
+                 for name, (backend, options) in DEFAULT_CONFIGURATIONS.items()}
+    print("{} frames".format(len(frames)))
+    print("{:<22}{:>10}{:>10}{:>10}".format("detector", "mean ms", "p95 ms", "hit rate"))
+    for name, stats in benchmark(detectors, frames).items():
+        print("{:<22}{:>10.1f}{:>10.1f}{:>10.1%}".format(name, stats["mean_ms"], stats["p95_ms"], stats["hit_rate"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Compact gaze direction codes shared by the tracker, the behavior analyzer
+and the logs. A direction is a small integer made of bit flags, so checks
+like "is the gaze off-center" are a single mask test. Names such as
+"left up" are only produced when a direction is displayed or serialized.
+"""
+import numpy as np
+
+CENTER = 0x01
+LEFT = 0x02
+RIGHT = 0x04
+UP = 0x08
+DOWN = 0x10
+BLINK = 0x20
+NOT_CALIBRATED = 0x40
+NO_FACE = 0x80
+
+HORIZONTAL = LEFT | RIGHT
+VERTICAL = UP | DOWN
+OFFCENTER = HORIZONTAL | VERTICAL
+# Samples that don't say anything about where the person is looking
+NEUTRAL = CENTER | BLINK | NOT_CALIBRATED | NO_FACE
+
+_NAMES = {CENTER: "center", BLINK: "blink", NOT_CALIBRATED: "not calibrated", NO_FACE: "no face"}
+for _horizontal, _horizontal_name in ((0, None), (LEFT, "left"), (RIGHT, "right")):
+    for _vertical, _vertical_name in ((0, None), (UP, "up"), (DOWN, "down")):
+        if _horizontal or _vertical:
+            _NAMES[_horizontal | _vertical] = " ".join(
+                name for name in (_horizontal_name, _vertical_name) if name)
+_CODES = {name: code for code, name in _NAMES.items()}
+NAMES = frozenset(_CODES)
+
+
+def from_offsets(horizontal, vertical, threshold):
+    """Returns the code of a gaze that is shifted from the calibrated center
+
+    Arguments:
+        horizontal (float): Horizontal ratio minus the calibrated center
+        vertical (float): Vertical ratio minus the calibrated center
+        threshold (float): Shift below which the gaze is considered centered
+    """
+    code = 0
+    if abs(horizontal) > threshold:
+        code |= RIGHT if horizontal < 0 else LEFT
+    if abs(vertical) > threshold:
+        code |= UP if vertical < 0 else DOWN
+    return code or CENTER
+
+
+def classify(horizontal, vertical, horizontal_center, vertical_center, threshold, face_found=None):
+    """Returns the codes of arrays of ratios, like from_offsets for each
+    element. Missing ratios (NaN) are blinks, or NO_FACE where face_found
+    is false.
+
+    Arguments:
+        horizontal (numpy.ndarray): Horizontal ratios
+        vertical (numpy.ndarray): Vertical ratios
+        horizontal_center (float): Calibrated horizontal center
+        vertical_center (float): Calibrated vertical center
+        threshold (float): Shift below which the gaze is considered centered
+        face_found (numpy.ndarray): Optional mask of the frames where a face was found
+    """
+    horizontal = np.asarray(horizontal, dtype=np.float64) - horizontal_center
+    vertical = np.asarray(vertical, dtype=np.float64) - vertical_center
+    with np.errstate(invalid="ignore"):
+        codes = (np.where(horizontal > threshold, LEFT, 0) | np.where(horizontal < -threshold, RIGHT, 0)
+                 | np.where(vertical > threshold, DOWN, 0) | np.where(vertical < -threshold, UP, 0))
+    codes = codes.astype(np.uint8)
+    codes[codes == 0] = CENTER
+    missing = np.isnan(horizontal) | np.isnan(vertical)
+    codes[missing] = BLINK
+    if face_found is not None:
+        codes[missing & ~np.asarray(face_found, dtype=bool)] = NO_FACE
+    return codes
+
+
+def to_names(codes):
+    """Returns the display names of an array of codes
+
+    Arguments:
+        codes (numpy.ndarray): Direction codes
+    """
+    return [to_name(code) for code in np.asarray(codes).tolist()]
+
+
+def to_name(code):
+    """Returns the display name of a code, e.g. "right up"
+
+    Arguments:
+        code (int): Direction code
+    """
+    try:
+        return _NAMES[code]
+    except KeyError:
+        raise ValueError("Unknown gaze direction code: {}".format(code))
+
+
+def from_name(name):
+    """Returns the code of a direction name, as written in the logs
+
+    Arguments:
+        name (str): Direction name, e.g. "left" or "right up"
+    """
+    try:
+        return _CODES[name]
+    except KeyError:
+        raise ValueError("Unknown gaze direction: {}".format(name))
+
+
+def to_code(direction):
+    """Returns the code of a direction given either as a code or as a name
+
+    Arguments:
+        direction (int or str): Direction code or name
+    """
+    return direction if isinstance(direction, int) else from_name(direction)
+
+
+def is_offcenter(code):
+    """Returns true if the code is a left/right/up/down gaze"""
+    return bool(code & OFFCENTER)
@@ -13,14 +13,25 @@ class Eye(object):
     LEFT_EYE_POINTS = [36, 37, 38, 39, 40, 41]
     RIGHT_EYE_POINTS = [42, 43, 44, 45, 46, 47]
 
-    def __init__(self, original_frame, landmarks, side, calibration):
+    MARGIN = 5
+
+    def __init__(self, original_frame, landmarks, side, calibration, crop=None):
+        """
+        Arguments:
+            original_frame (numpy.ndarray): Frame passed by the user
+            landmarks (dlib.full_object_detection): Facial landmarks for the face region
+            side: Indicates whether it's the left eye (0) or the right eye (1)
+            calibration (calibration.Calibration): Manages the binarization threshold value
+            crop (numpy.ndarray): Eye frame recorded from a previous isolation, used
+                instead of cutting it out of original_frame (which can then be None)
+        """
         self.frame = None
         self.origin = None
         self.center = None
         self.pupil = None
         self.landmark_points = None
 
-        self._analyze(original_frame, landmarks, side, calibration)
+        self._analyze(original_frame, landmarks, side, calibration, crop)
 
     @staticmethod
     def _middle_point(p1, p2):
@@ -54,18 +65,34 @@ class Eye(object):
         eye = cv2.bitwise_not(black_frame, frame.copy(), mask=mask)
 
         # Cropping on the eye
-        margin = 5
-        min_x = np.min(region[:, 0]) - margin
-        max_x = np.max(region[:, 0]) + margin
-        min_y = np.min(region[:, 1]) - margin
-        max_y = np.max(region[:, 1]) + margin
+        min_x = np.min(region[:, 0]) - self.MARGIN
+        max_x = np.max(region[:, 0]) + self.MARGIN
+        min_y = np.min(region[:, 1]) - self.MARGIN
+        max_y = np.max(region[:, 1]) + self.MARGIN
+
+        self._set_frame(eye[min_y:max_y, min_x:max_x], (min_x, min_y))
 
-        self.frame = eye[min_y:max_y, min_x:max_x]
-        self.origin = (min_x, min_y)
+    def _set_frame(self, frame, origin):
+        """Keeps the isolated eye frame and its position in the original frame"""
+        self.frame = frame
+        self.origin = origin
 
         height, width = self.frame.shape[:2]
         self.center = (width / 2, height / 2)
 
+    def _restore(self, crop, landmarks, points):
+        """Uses a recorded eye frame instead of isolating the eye again. Its
+        position is recomputed from the landmarks, as _isolate does.
+
+        Arguments:
+            crop (numpy.ndarray): Eye frame isolated when the session was recorded
+            landmarks (dlib.full_object_detection): Facial landmarks for the face region
+            points (list): Points of an eye (from the 68 Multi-PIE landmarks)
+        """
+        region = np.array([(landmarks.part(point).x, landmarks.part(point).y) for point in points], np.int32)
+        self.landmark_points = region
+        self._set_frame(crop, (np.min(region[:, 0]) - self.MARGIN, np.min(region[:, 1]) - self.MARGIN))
+
     def _blinking_ratio(self, landmarks, points):
         """Calculates a ratio that can indicate whether an eye is closed or not.
         It's the division of the width of the eye, by its height.
@@ -92,7 +119,7 @@ class Eye(object):
 
         return ratio
 
-    def _analyze(self, original_frame, landmarks, side, calibration):
+    def _analyze(self, original_frame, landmarks, side, calibration, crop=None):
         """Detects and isolates the eye in a new frame, sends data to the calibration
         and initializes Pupil object.
 
@@ -101,6 +128,7 @@ class Eye(object):
             landmarks (dlib.full_object_detection): Facial landmarks for the face region
             side: Indicates whether it's the left eye (0) or the right eye (1)
             calibration (calibration.Calibration): Manages the binarization threshold value
+            crop (numpy.ndarray): Recorded eye frame, or None to isolate it from original_frame
         """
         if side == 0:
             points = self.LEFT_EYE_POINTS
@@ -110,7 +138,10 @@ class Eye(object):
             return
 
         self.blinking = self._blinking_ratio(landmarks, points)
-        self._isolate(original_frame, landmarks, points)
+        if crop is None:
+            self._isolate(original_frame, landmarks, points)
+        else:
+            self._restore(crop, landmarks, points)
 
         if not calibration.is_complete():
             calibration.evaluate(self.frame, side)
@@ -0,0 +1,108 @@
+from __future__ import division
+import os
+import cv2
+import dlib
+
+
+def detect_scaled(detector, frame, scale):
+    """Runs the detector on a downsized copy of the frame and returns the
+    rectangles in the coordinates of the original frame
+
+    Arguments:
+        detector: Callable returning dlib rectangles for a grayscale frame
+        frame (numpy.ndarray): Grayscale frame
+        scale (float): Resize factor applied before the detection (1.0 to disable)
+    """
+    if scale >= 1.0:
+        return detector(frame)
+
+    small_frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return dlib.rectangles([dlib.rectangle(int(face.left() / scale), int(face.top() / scale),
+                                           int(face.right() / scale), int(face.bottom() / scale))
+                            for face in detector(small_frame)])
+
+
+class DlibHogDetector(object):
+    """
+    Dlib HOG + linear SVM frontal face detector. Upsampling finds smaller
+    faces at a high cost, the adjust threshold trades misses for false
+    detections and scale starts the image pyramid from a downsized frame.
+    """
+
+    def __init__(self, upsample=0, adjust_threshold=0.0, scale=1.0, detector=None):
+        """
+        Arguments:
+            upsample (int): Number of times the frame is upsampled before the detection
+            adjust_threshold (float): Added to the detection threshold, negative values detect more faces
+            scale (float): Resize factor applied before the detection
+            detector (dlib.fhog_object_detector): Detector to share, a new one is created if not given
+        """
+        self.upsample = upsample
+        self.adjust_threshold = adjust_threshold
+        self.scale = scale
+        self._detector = dlib.get_frontal_face_detector() if detector is None else detector
+
+    def _detect(self, frame):
+        if self.adjust_threshold:
+            faces, scores, _ = self._detector.run(frame, self.upsample, self.adjust_threshold)
+            return faces
+        return self._detector(frame, self.upsample)
+
+    def __call__(self, frame):
+        """Returns the faces found in a grayscale frame as dlib rectangles"""
+        return detect_scaled(self._detect, frame, self.scale)
+
+
+class HaarCascadeDetector(object):
+    """
+    OpenCV Viola-Jones detector using one of the Haar cascades that ship
+    with opencv-python. The scale factor is the step of the image pyramid.
+    Faces are returned largest first.
+    """
+
+    def __init__(self, cascade="haarcascade_frontalface_default.xml", scale_factor=1.1,
+                 min_neighbors=5, min_size=(60, 60), scale=1.0):
+        """
+        Arguments:
+            cascade (str): File name in cv2.data.haarcascades, or path to a cascade file
+            scale_factor (float): Size ratio between two levels of the image pyramid
+            min_neighbors (int): Number of overlapping detections needed to keep a face
+            min_size (tuple): Smallest face size (width, height) in the detection frame
+            scale (float): Resize factor applied before the detection
+        """
+        path = cascade if os.path.exists(cascade) else os.path.join(cv2.data.haarcascades, cascade)
+        self._classifier = cv2.CascadeClassifier(path)
+        if self._classifier.empty():
+            raise ValueError("Unable to load the Haar cascade {}".format(path))
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = tuple(min_size)
+        self.scale = scale
+
+    def _detect(self, frame):
+        faces = self._classifier.detectMultiScale(frame, scaleFactor=self.scale_factor,
+                                                  minNeighbors=self.min_neighbors, minSize=self.min_size)
+        faces = sorted(faces, key=lambda face: face[2] * face[3], reverse=True)
+        return dlib.rectangles([dlib.rectangle(int(x), int(y), int(x + w), int(y + h)) for x, y, w, h in faces])
+
+    def __call__(self, frame):
+        """Returns the faces found in a grayscale frame as dlib rectangles"""
+        return detect_scaled(self._detect, frame, self.scale)
+
+
+BACKENDS = {
+    "dlib_hog": DlibHogDetector,
+    "haar": HaarCascadeDetector,
+}
+
+
+def create_face_detector(backend="dlib_hog", **options):
+    """Returns a face detector for the given backend name
+
+    Arguments:
+        backend (str): One of BACKENDS
+        options: Keyword arguments of the backend class
+    """
+    if backend not in BACKENDS:
+        raise ValueError("Unknown face detector backend '{}', expected one of {}".format(backend, sorted(BACKENDS)))
+    return BACKENDS[backend](**options)
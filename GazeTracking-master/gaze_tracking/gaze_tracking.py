@@ -1,9 +1,59 @@
 from __future__ import division
 import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import dlib
+import numpy as np
 from .eye import Eye
 from .calibration import Calibration
+from .face_detector import detect_scaled
+
+
+_models = None
+
+# Path of the facial landmarks model loaded by load_models
+LANDMARKS_MODEL = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                               "trained_models/shape_predictor_68_face_landmarks.dat"))
+
+# Results of refresh_batch, one row per frame. Values of frames where the
+# pupils were not located are NaN.
+GazeBatch = namedtuple("GazeBatch", ["face_found", "located", "pupil_left", "pupil_right",
+                                     "horizontal_ratio", "vertical_ratio", "blinking_ratio"])
+
+
+MISSING_ROWS = [[np.nan] * 7] * 2
+
+
+def batch_from_rows(face_found, rows):
+    """Returns the GazeBatch of a sequence of frames analyzed one by one
+
+    Arguments:
+        face_found: Per frame, true if a face was found
+        rows: Per frame, the two eye rows returned by GazeTracking.eye_rows
+    """
+    values = np.array(rows, dtype=np.float64).reshape(len(rows), 2, 7)
+    pupils = values[:, :, 2:4] + values[:, :, 0:2]
+    return GazeBatch(
+        face_found=np.array(face_found, dtype=bool),
+        located=~np.isnan(values[:, 0, 0]),
+        pupil_left=pupils[:, 0],
+        pupil_right=pupils[:, 1],
+        horizontal_ratio=(values[:, :, 0] / (values[:, :, 4] * 2 - 10)).mean(axis=1),
+        vertical_ratio=(values[:, :, 1] / (values[:, :, 5] * 2 - 10)).mean(axis=1),
+        blinking_ratio=values[:, :, 6].mean(axis=1)
+    )
+
+
+def load_models():
+    """Returns the face detector and the facial landmarks predictor.
+    They are loaded once per process and shared by every GazeTracking
+    instance, as they are only read during the analysis.
+    """
+    global _models
+    if _models is None:
+        _models = (dlib.get_frontal_face_detector(), dlib.shape_predictor(LANDMARKS_MODEL))
+    return _models
 
 
 class GazeTracking(object):
@@ -13,19 +63,45 @@ class GazeTracking(object):
     and pupils and allows to know if the eyes are open or closed
     """
 
-    def __init__(self):
+    def __init__(self, face_detector=None, predictor=None, parallel_eyes=False):
+        """
+        Arguments:
+            face_detector: Face detector to use instead of the shared one
+            predictor (dlib.shape_predictor): Landmarks predictor to use instead of the shared one
+            parallel_eyes (bool): Analyzes the left eye on a worker thread while
+                the right eye is analyzed on the calling thread
+        """
         self.frame = None
+        self.face = None
+        # face_count is the number of faces found by the detector on the last
+        # frame, None when the face box of an earlier detection was reused
+        self.face_count = 0
         self.eye_left = None
         self.eye_right = None
         self.calibration = Calibration()
 
+        # detection_scale downsizes the frame given to the face detector and
+        # redetect_interval reuses the last face box between two detections
+        self.detection_scale = 1.0
+        self.redetect_interval = 1
+        self._frames_since_detection = 0
+
+        # recorder (SessionRecorder) saves the landmarks and eye frames of each analysis
+        self.recorder = None
+
+        if face_detector is None or predictor is None:
+            shared_detector, shared_predictor = load_models()
+            face_detector = face_detector or shared_detector
+            predictor = predictor or shared_predictor
+
         # _face_detector is used to detect faces
-        self._face_detector = dlib.get_frontal_face_detector()
+        self._face_detector = face_detector
 
         # _predictor is used to get facial landmarks of a given face
-        cwd = os.path.abspath(os.path.dirname(__file__))
-        model_path = os.path.abspath(os.path.join(cwd, "trained_models/shape_predictor_68_face_landmarks.dat"))
-        self._predictor = dlib.shape_predictor(model_path)
+        self._predictor = predictor
+
+        # _eye_executor is a persistent worker that processes one of the eyes
+        self._eye_executor = ThreadPoolExecutor(1, thread_name_prefix="eye") if parallel_eyes else None
 
     @property
     def pupils_located(self):
@@ -39,19 +115,52 @@ class GazeTracking(object):
         except Exception:
             return False
 
+    def _detect_faces(self, frame):
+        """Returns the faces found in the frame. The last face box is reused
+        until redetect_interval frames have passed, and the detector runs on
+        a frame downsized by detection_scale.
+
+        Arguments:
+            frame (numpy.ndarray): Grayscale frame
+        """
+        self._frames_since_detection += 1
+        if self.face is not None and self._frames_since_detection < self.redetect_interval:
+            return [self.face]
+        self._frames_since_detection = 0
+        return detect_scaled(self._face_detector, frame, self.detection_scale)
+
     def _analyze(self):
         """Detects the face and initialize Eye objects"""
         frame = cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY)
-        faces = self._face_detector(frame)
+        faces = self._detect_faces(frame)
+        self.face_count = len(faces) if self._frames_since_detection == 0 else None
 
         try:
-            landmarks = self._predictor(frame, faces[0])
-            self.eye_left = Eye(frame, landmarks, 0, self.calibration)
-            self.eye_right = Eye(frame, landmarks, 1, self.calibration)
+            self.face = faces[0]
+            landmarks = self._predictor(frame, self.face)
+            if self._eye_executor is not None:
+                eye_left = self._eye_executor.submit(Eye, frame, landmarks, 0, self.calibration)
+                self.eye_right = Eye(frame, landmarks, 1, self.calibration)
+                self.eye_left = eye_left.result()
+            else:
+                self.eye_left = Eye(frame, landmarks, 0, self.calibration)
+                self.eye_right = Eye(frame, landmarks, 1, self.calibration)
+            if self.recorder is not None:
+                self.recorder.add(landmarks, self.eye_left, self.eye_right)
 
         except IndexError:
+            self.face = None
             self.eye_left = None
             self.eye_right = None
+            if self.recorder is not None:
+                self.recorder.add(None, None, None)
+
+    def close(self):
+        """Stops the eye worker thread of the parallel mode. The object stays
+        usable: later frames are analyzed sequentially."""
+        if self._eye_executor is not None:
+            self._eye_executor.shutdown()
+            self._eye_executor = None
 
     def refresh(self, frame):
         """Refreshes the frame and analyzes it.
@@ -62,6 +171,68 @@ class GazeTracking(object):
         self.frame = frame
         self._analyze()
 
+    def refresh_recorded(self, record):
+        """Analyzes a frame of a session recording: the recorded landmarks and
+        eye frames go straight to the pupil detection and its calibration,
+        the face detector and the landmarks predictor are not used.
+
+        Arguments:
+            record (RecordedFrame): Frame read with read_recording
+        """
+        self.frame = None
+        # Only the analyzed face is recorded, the number of faces is unknown
+        self.face_count = None if record.landmarks is not None else 0
+        if record.landmarks is None:
+            self.face = None
+            self.eye_left = None
+            self.eye_right = None
+            return
+
+        landmarks = record.detection()
+        self.face = landmarks.rect
+        self.eye_left = Eye(None, landmarks, 0, self.calibration, record.crops[0])
+        self.eye_right = Eye(None, landmarks, 1, self.calibration, record.crops[1])
+
+    def refresh_batch(self, frames):
+        """Analyzes a sequence of frames and returns a GazeBatch of NumPy
+        arrays. Only the face and eye detection runs per frame; coordinates
+        and ratios are computed for the whole batch at once. Afterwards the
+        object holds the analysis of the last frame, as after refresh.
+
+        Arguments:
+            frames: Sequence, iterable or array of frames
+        """
+        face_found = []
+        rows = []
+        for frame in frames:
+            self.refresh(frame)
+            face_found.append(self.face is not None)
+            rows.append(self.eye_rows())
+        return batch_from_rows(face_found, rows)
+
+    def eye_rows(self):
+        """Returns the result of the last analysis as one row per eye: pupil
+        x, y, origin x, y, center x, y and blinking ratio. Values are NaN
+        when the pupils were not located.
+        """
+        if not self.pupils_located:
+            return MISSING_ROWS
+        return [[eye.pupil.x, eye.pupil.y, eye.origin[0], eye.origin[1],
+                 eye.center[0], eye.center[1], eye.blinking]
+                for eye in (self.eye_left, self.eye_right)]
+
+    def face_present(self, frame, scale=1.0):
+        """Returns true if the face detector finds a face in the frame. Only
+        the detector runs, on a frame downsized by scale, and the state of
+        the last analysis is left untouched.
+
+        Arguments:
+            frame (numpy.ndarray): The frame to check
+            scale (float): Resize factor applied before the detection
+        """
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return len(detect_scaled(self._face_detector, frame, scale)) > 0
+
     def pupil_left_coords(self):
         """Returns the coordinates of the left pupil"""
         if self.pupils_located:
@@ -0,0 +1,79 @@
+from __future__ import division
+
+
+class IdleBackoff(object):
+    """
+    This class puts the analysis to sleep while nobody is in front of the
+    camera. After a number of consecutive analyzed frames without a face,
+    the full pipeline stops and only a face detection on a downsized frame
+    runs every check_interval seconds. The first face found wakes it up,
+    and the time without a face is reported as one interval.
+    """
+
+    def __init__(self, absent_frames=30, check_interval=1.0, scale=0.5):
+        """
+        Arguments:
+            absent_frames (int): Consecutive frames without a face before going idle
+            check_interval (float): Seconds between two face checks while idle
+            scale (float): Resize factor of the frame given to the detector while idle
+        """
+        self.absent_frames = absent_frames
+        self.check_interval = check_interval
+        self.scale = scale
+        self.idle = False
+        self.missed = 0
+        self.absent_since = None
+        self.checks = 0
+        self._next_check = 0.0
+
+    def update(self, face_found, timestamp):
+        """Registers the result of a full analysis and returns true when
+        it switches to idle mode
+
+        Arguments:
+            face_found (bool): Whether the analysis found a face
+            timestamp (float): Time of the frame, in seconds
+        """
+        if face_found:
+            self.missed = 0
+            self.absent_since = None
+            return False
+
+        if self.missed == 0:
+            self.absent_since = timestamp
+        self.missed += 1
+        if not self.idle and self.missed >= self.absent_frames:
+            self.idle = True
+            self._next_check = timestamp + self.check_interval
+            return True
+        return False
+
+    def due(self, timestamp):
+        """Returns true if an idle face check should run on this frame"""
+        return timestamp >= self._next_check
+
+    def checked(self, face_found, timestamp):
+        """Registers the result of an idle face check. Returns the (start, end)
+        interval without a face if a face was found, None otherwise
+
+        Arguments:
+            face_found (bool): Whether the downsized detection found a face
+            timestamp (float): Time of the frame, in seconds
+        """
+        self.checks += 1
+        self._next_check = timestamp + self.check_interval
+        if not face_found:
+            return None
+        return self.wake(timestamp)
+
+    def wake(self, timestamp):
+        """Leaves idle mode and returns the (start, end) interval without a face
+
+        Arguments:
+            timestamp (float): End of the interval, in seconds
+        """
+        interval = (self.absent_since, timestamp)
+        self.idle = False
+        self.missed = 0
+        self.absent_since = None
+        return interval
@@ -0,0 +1,93 @@
+from __future__ import division
+import cv2
+
+
+class MotionGate(object):
+    """
+    This class decides whether a frame differs enough from the last
+    fully analyzed one to be worth a new analysis. The comparison is done
+    on a small downsampled copy of the face region, so it costs a tiny
+    fraction of the face detection and pupil pipeline.
+    """
+
+    def __init__(self, threshold=4.0, max_reuse=5, size=32, margin=0.25):
+        """
+        Arguments:
+            threshold (float): Mean absolute difference (0-255) above which the scene is considered changed
+            max_reuse (int): Maximum number of consecutive frames that can reuse a previous result
+            size (int): Side of the square thumbnail the region is downsampled to
+            margin (float): Margin added around the face box, relative to its size
+        """
+        self.threshold = threshold
+        self.max_reuse = max_reuse
+        self.size = size
+        self.margin = margin
+        self.streak = 0
+        self.last_difference = None
+        self._reference = None
+        self._box = None
+        self._shape = None
+
+    def _region(self, frame, face):
+        """Returns the (x1, y1, x2, y2) region to compare, the face box
+        enlarged by the margin or the whole frame if there is no face
+
+        Arguments:
+            frame (numpy.ndarray): Frame being compared
+            face (dlib.rectangle): Last detected face, or None
+        """
+        height, width = frame.shape[:2]
+        if face is None:
+            return 0, 0, width, height
+
+        margin_x = int(face.width() * self.margin)
+        margin_y = int(face.height() * self.margin)
+        x1 = max(face.left() - margin_x, 0)
+        y1 = max(face.top() - margin_y, 0)
+        x2 = min(face.right() + margin_x, width)
+        y2 = min(face.bottom() + margin_y, height)
+        if x2 <= x1 or y2 <= y1:
+            return 0, 0, width, height
+        return x1, y1, x2, y2
+
+    def _signature(self, frame):
+        """Returns the downsampled grayscale thumbnail of the compared region"""
+        x1, y1, x2, y2 = self._box
+        thumbnail = cv2.resize(frame[y1:y2, x1:x2], (self.size, self.size), interpolation=cv2.INTER_AREA)
+        if thumbnail.ndim == 3:
+            thumbnail = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+        return thumbnail
+
+    def reset(self, frame, face=None):
+        """Takes the given frame as the new reference for the comparisons
+
+        Arguments:
+            frame (numpy.ndarray): Frame that is going to be fully analyzed
+            face (dlib.rectangle): Last detected face, or None
+        """
+        self._shape = frame.shape
+        self._box = self._region(frame, face)
+        self._reference = self._signature(frame)
+        self.streak = 0
+
+    def can_reuse(self, frame, face=None):
+        """Returns true if the frame is close enough to the reference frame
+        for the previous analysis result to be reused. Otherwise the frame
+        becomes the new reference and must be analyzed.
+
+        Arguments:
+            frame (numpy.ndarray): The new frame
+            face (dlib.rectangle): Last detected face, or None
+        """
+        if self._reference is None or frame.shape != self._shape or self.streak >= self.max_reuse:
+            self.reset(frame, face)
+            return False
+
+        signature = self._signature(frame)
+        self.last_difference = float(cv2.absdiff(signature, self._reference).mean())
+        if self.last_difference > self.threshold:
+            self.reset(frame, face)
+            return False
+
+        self.streak += 1
+        return True
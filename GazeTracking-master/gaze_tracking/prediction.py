@@ -0,0 +1,96 @@
+from __future__ import division
+import math
+
+
+class GazePredictor(object):
+    """
+    This class predicts the gaze ratios between two full analyses with a
+    constant-velocity Kalman filter. The horizontal and vertical ratios are
+    filtered independently, but as they are measured at the same moments
+    with the same noise they share a single covariance, so an update is a
+    handful of float operations.
+    """
+
+    def __init__(self, process_noise=1.0, measurement_noise=0.02, max_std=0.05, max_gap=0.5,
+                 initial_velocity_std=1.0):
+        """
+        Arguments:
+            process_noise (float): Standard deviation of the ratio acceleration, per second squared
+            measurement_noise (float): Standard deviation of a measured ratio
+            max_std (float): Prediction uncertainty above which a full analysis is required
+            max_gap (float): Seconds after the last measurement beyond which nothing is predicted
+            initial_velocity_std (float): Uncertainty of the velocity before it has been measured
+        """
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.max_std = max_std
+        self.max_gap = max_gap
+        self.initial_velocity_std = initial_velocity_std
+        self.reset()
+
+    def reset(self):
+        """Forgets the tracked state, e.g. after a blink or a lost face"""
+        self.time = None
+        self.horizontal = [0.0, 0.0]
+        self.vertical = [0.0, 0.0]
+        self._covariance = (0.0, 0.0, 0.0)
+
+    def _propagate(self, elapsed):
+        """Returns the covariance (position, cross, velocity) after elapsed seconds"""
+        p00, p01, p11 = self._covariance
+        q = self.process_noise ** 2
+        return (p00 + 2 * elapsed * p01 + elapsed ** 2 * p11 + q * elapsed ** 4 / 4,
+                p01 + elapsed * p11 + q * elapsed ** 3 / 2,
+                p11 + q * elapsed ** 2)
+
+    def update(self, horizontal, vertical, timestamp):
+        """Corrects the state with the ratios of a full analysis
+
+        Arguments:
+            horizontal (float): Measured horizontal ratio
+            vertical (float): Measured vertical ratio
+            timestamp (float): Time of the frame, in seconds
+        """
+        noise = self.measurement_noise ** 2
+        if self.time is None:
+            self.horizontal = [horizontal, 0.0]
+            self.vertical = [vertical, 0.0]
+            self._covariance = (noise, 0.0, self.initial_velocity_std ** 2)
+            self.time = timestamp
+            return
+
+        elapsed = timestamp - self.time
+        p00, p01, p11 = self._propagate(elapsed)
+        gain_position, gain_velocity = p00 / (p00 + noise), p01 / (p00 + noise)
+        for state, measured in ((self.horizontal, horizontal), (self.vertical, vertical)):
+            state[0] += elapsed * state[1]
+            error = measured - state[0]
+            state[0] += gain_position * error
+            state[1] += gain_velocity * error
+        self._covariance = ((1 - gain_position) * p00, (1 - gain_position) * p01, p11 - gain_velocity * p01)
+        self.time = timestamp
+
+    def std(self, timestamp):
+        """Returns the standard deviation of the predicted ratios at timestamp"""
+        return math.sqrt(self._propagate(timestamp - self.time)[0])
+
+    def confident(self, timestamp):
+        """Returns true if the ratios at timestamp can be predicted
+        instead of measured
+
+        Arguments:
+            timestamp (float): Time of the frame, in seconds
+        """
+        if self.time is None or not 0 <= timestamp - self.time <= self.max_gap:
+            return False
+        return self.std(timestamp) <= self.max_std
+
+    def predict(self, timestamp):
+        """Returns the predicted (horizontal, vertical) ratios at timestamp
+
+        Arguments:
+            timestamp (float): Time of the frame, in seconds
+        """
+        elapsed = timestamp - self.time
+        return (min(max(self.horizontal[0] + elapsed * self.horizontal[1], 0.0), 1.0),
+                min(max(self.vertical[0] + elapsed * self.vertical[1], 0.0), 1.0))
@@ -0,0 +1,165 @@
+"""
+Compact recording of what the expensive stages of GazeTracking produce:
+the 68 facial landmarks and the two isolated grayscale eye frames. Pupil
+detection, its calibration and everything after it can be re-run from a
+recording without the video, the face detector or the landmarks predictor.
+
+A recording is one file made of independent chunks, so a session that was
+interrupted keeps every chunk written before. Each chunk is a 4-byte length
+followed by a compressed NumPy archive holding, for chunk_size frames:
+time (float64), found (bool), landmarks (int16, 68 x 2 per frame),
+crop_shapes (uint16, height and width of both eyes) and crops (the eye
+frames concatenated as uint8).
+"""
+import io
+import struct
+import threading
+import time
+import zipfile
+import dlib
+import numpy as np
+
+MAGIC = b"GAZEREC1"
+_LENGTH = struct.Struct(">I")
+
+
+def landmarks_to_detection(landmarks, rect=None):
+    """Returns an array of 68 (x, y) landmarks as a dlib.full_object_detection
+
+    Arguments:
+        landmarks (numpy.ndarray): Landmarks, one row per point
+        rect (dlib.rectangle): Face box, the bounding box of the landmarks by default
+    """
+    points = dlib.points([dlib.point(int(x), int(y)) for x, y in landmarks])
+    if rect is None:
+        xs, ys = landmarks[:, 0], landmarks[:, 1]
+        rect = dlib.rectangle(int(xs.min()), int(ys.min()), int(xs.max()), int(ys.max()))
+    return dlib.full_object_detection(rect, points)
+
+
+class RecordedFrame(object):
+    """Landmarks and eye frames of one recorded frame (landmarks is None
+    when no face was found)"""
+
+    __slots__ = ("timestamp", "landmarks", "crops")
+
+    def __init__(self, timestamp, landmarks, crops):
+        self.timestamp = timestamp
+        self.landmarks = landmarks
+        self.crops = crops
+
+    def detection(self):
+        """Returns the landmarks as a dlib.full_object_detection, as produced by the predictor"""
+        return landmarks_to_detection(self.landmarks)
+
+
+class SessionRecorder(object):
+    """
+    This class appends the landmarks and eye frames of every analyzed
+    frame to a recording file, one compressed chunk per chunk_size frames.
+    """
+
+    def __init__(self, path, chunk_size=100):
+        """
+        Arguments:
+            path (str): Recording file, created or appended to
+            chunk_size (int): Number of frames per compressed chunk
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self.frames = 0
+        self.bytes_written = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+
+    def add(self, landmarks, eye_left, eye_right, timestamp=None):
+        """Records an analyzed frame
+
+        Arguments:
+            landmarks (dlib.full_object_detection): Facial landmarks, or None if no face was found
+            eye_left (Eye): Left eye of the frame, or None
+            eye_right (Eye): Right eye of the frame, or None
+            timestamp (float): Time of the frame, the current time by default
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        if landmarks is None or eye_left is None or eye_right is None:
+            record = (timestamp, None, None)
+        else:
+            points = np.array([(point.x, point.y) for point in landmarks.parts()], np.int16)
+            record = (timestamp, points, (eye_left.frame, eye_right.frame))
+        with self._lock:
+            self._pending.append(record)
+            self.frames += 1
+            if len(self._pending) >= self.chunk_size:
+                self._write_chunk()
+
+    def _write_chunk(self):
+        count = len(self._pending)
+        landmarks = np.zeros((count, 68, 2), np.int16)
+        shapes = np.zeros((count, 2, 2), np.uint16)
+        crops = []
+        for index, (_, points, eyes) in enumerate(self._pending):
+            if points is None:
+                continue
+            landmarks[index] = points
+            for side, crop in enumerate(eyes):
+                shapes[index, side] = crop.shape[:2]
+                crops.append(np.ascontiguousarray(crop, np.uint8).ravel())
+
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, time=np.array([record[0] for record in self._pending], np.float64),
+                            found=np.array([record[1] is not None for record in self._pending]),
+                            landmarks=landmarks, crop_shapes=shapes,
+                            crops=np.concatenate(crops) if crops else np.zeros(0, np.uint8))
+        payload = buffer.getvalue()
+        self._file.write(_LENGTH.pack(len(payload)) + payload)
+        self._file.flush()
+        self.bytes_written += _LENGTH.size + len(payload)
+        self._pending = []
+
+    def close(self):
+        """Writes the last incomplete chunk and closes the file"""
+        with self._lock:
+            if self._file.closed:
+                return
+            if self._pending:
+                self._write_chunk()
+            self._file.close()
+
+
+def read_recording(path):
+    """Yields the RecordedFrame objects of a recording in order. A chunk
+    truncated by an interrupted session ends the recording.
+
+    Arguments:
+        path (str): Recording file
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not a gaze recording: {}".format(path))
+        while True:
+            header = f.read(_LENGTH.size)
+            if len(header) < _LENGTH.size:
+                return
+            payload = f.read(_LENGTH.unpack(header)[0])
+            try:
+                chunk = np.load(io.BytesIO(payload))
+                times, found, landmarks = chunk["time"], chunk["found"], chunk["landmarks"]
+                shapes, crops = chunk["crop_shapes"], chunk["crops"]
+            except (ValueError, OSError, EOFError, zipfile.BadZipFile):
+                return
+
+            offset = 0
+            for index in range(len(times)):
+                if not found[index]:
+                    yield RecordedFrame(float(times[index]), None, None)
+                    continue
+                eyes = []
+                for height, width in shapes[index]:
+                    size = int(height) * int(width)
+                    eyes.append(crops[offset:offset + size].reshape(int(height), int(width)))
+                    offset += size
+                yield RecordedFrame(float(times[index]), landmarks[index], tuple(eyes))
@@ -0,0 +1,223 @@
+"""Сегментированное хранение логов с ротацией, сжатием и разреженным индексом по времени.
+
+Лог пишется в файлы-сегменты <имя>.<номер>.<расширение>, новый сегмент начинается
+по достижении размера или длительности. Закрытые сегменты сжимаются gzip в фоновом
+потоке. В файле <имя>.idx хранятся строки "сегмент, время, участник, смещение",
+которые добавляются при открытии сегмента, смене участника и не чаще чем раз
+в index_interval секунд. По ним читатель сразу переходит к нужному месту.
+"""
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator, List, NamedTuple, Optional
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_time(text: str) -> float:
+    """Время в формате логов в секундах эпохи (локальное время)."""
+    return time.mktime(time.strptime(text, TIME_FORMAT))
+
+
+def gaze_line_time(line: str) -> float:
+    """Время строки gaze_log.txt: '<время>: <сообщение>'."""
+    return parse_time(line[:19])
+
+
+def behavior_line_time(line: str) -> float:
+    """Время записи behavior_log в формате JSON Lines."""
+    return parse_time(json.loads(line)["timestamp"])
+
+
+class IndexEntry(NamedTuple):
+    segment: int
+    timestamp: float
+    participant: Optional[str]
+    offset: int
+
+
+class LogRecord(NamedTuple):
+    timestamp: float
+    participant: Optional[str]
+    line: str
+
+
+class SegmentedLogReader:
+    """Чтение сегментированного лога по интервалу времени и участнику, включая сжатые сегменты."""
+
+    def __init__(self, directory: str, name: str, extension: str, timestamp_of: Callable[[str], float]):
+        self.directory = Path(directory)
+        self.name = name
+        self.extension = extension
+        self.timestamp_of = timestamp_of
+        self.index_file = self.directory / f"{name}.idx"
+
+    def segment_path(self, segment: int) -> Path:
+        return self.directory / f"{self.name}.{segment:06d}{self.extension}"
+
+    def segments(self) -> List[int]:
+        pattern = re.compile(rf"{re.escape(self.name)}\.(\d{{6}}){re.escape(self.extension)}(\.gz)?$")
+        numbers = set()
+        for path in self.directory.glob(f"{self.name}.*"):
+            match = pattern.match(path.name)
+            if match:
+                numbers.add(int(match.group(1)))
+        return sorted(numbers)
+
+    def load_index(self) -> List[IndexEntry]:
+        entries = []
+        if not self.index_file.exists():
+            return entries
+        with open(self.index_file, "r", encoding="utf-8") as f:
+            for line in f:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) != 4:
+                    continue
+                segment, timestamp, participant, offset = fields
+                entries.append(IndexEntry(int(segment), float(timestamp), participant or None, int(offset)))
+        return entries
+
+    def _open(self, segment: int):
+        path = self.segment_path(segment)
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:
+            # Сегмент уже сжат фоновым потоком
+            return gzip.open(str(path) + ".gz", "rb")
+
+    def _start(self, index: List[IndexEntry], start: Optional[float]) -> IndexEntry:
+        """Последняя точка индекса не позже start."""
+        position = index[0]
+        for entry in index:
+            if start is None or entry.timestamp > start:
+                break
+            position = entry
+        return position
+
+    def read(self, start: Optional[float] = None, end: Optional[float] = None,
+             participant: Optional[str] = None) -> Iterator[LogRecord]:
+        """Записи за интервал [start, end] (секунды эпохи), при необходимости только одного участника."""
+        index = self.load_index()
+        if not index:
+            return
+        first = self._start(index, start)
+
+        by_segment = {}
+        for entry in index:
+            by_segment.setdefault(entry.segment, []).append(entry)
+
+        for segment in self.segments():
+            entries = by_segment.get(segment, [])
+            if segment < first.segment or not entries:
+                continue
+            if end is not None and entries[0].timestamp > end:
+                return
+            if participant is not None and all(entry.participant != participant for entry in entries):
+                continue
+
+            offset = first.offset if segment == first.segment else 0
+            current = None
+            changes = iter(entries)
+            change = next(changes, None)
+            with self._open(segment) as f:
+                f.seek(offset)
+                for raw in f:
+                    while change is not None and change.offset <= offset:
+                        current = change.participant
+                        change = next(changes, None)
+                    offset += len(raw)
+
+                    line = raw.decode("utf-8").rstrip("\n")
+                    timestamp = self.timestamp_of(line)
+                    if end is not None and timestamp > end:
+                        return
+                    if (start is None or timestamp >= start) and (participant is None or current == participant):
+                        yield LogRecord(timestamp, current, line)
+
+
+class SegmentedLog(SegmentedLogReader):
+    """Запись лога в сегменты с ротацией по размеру или длительности и фоновым сжатием."""
+
+    def __init__(self, directory: str, name: str, extension: str, timestamp_of: Callable[[str], float],
+                 max_bytes: int = 10 * 1024 * 1024, max_seconds: float = 3600, compress: bool = True,
+                 index_interval: float = 60):
+        super().__init__(directory, name, extension, timestamp_of)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.compress = compress
+        self.index_interval = index_interval
+        self.participant = None
+
+        self._lock = threading.Lock()
+        self._compressor = ThreadPoolExecutor(1, thread_name_prefix=f"compress-{name}") if compress else None
+        self._index = open(self.index_file, "a", encoding="utf-8")
+        self._file = None
+        self._segment = max(self.segments(), default=0)
+        self._segment_start = None
+        self._last_index_time = None
+
+        # Сегменты, оставшиеся несжатыми после прошлого запуска
+        for segment in self.segments():
+            self._schedule_compression(segment)
+
+    def _schedule_compression(self, segment: int) -> None:
+        if self._compressor is not None and self.segment_path(segment).exists():
+            self._compressor.submit(self._compress, self.segment_path(segment))
+
+    @staticmethod
+    def _compress(path: Path) -> None:
+        temporary = Path(str(path) + ".gz.tmp")
+        with open(path, "rb") as source, gzip.open(temporary, "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.replace(temporary, str(path) + ".gz")
+        path.unlink()
+
+    def _write_index(self, timestamp: float) -> None:
+        self._index.write(f"{self._segment}\t{timestamp:.3f}\t{self.participant or ''}\t{self._file.tell()}\n")
+        self._index.flush()
+        self._last_index_time = timestamp
+
+    def _rotate(self, timestamp: float) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._schedule_compression(self._segment)
+        self._segment += 1
+        self._file = open(self.segment_path(self._segment), "ab")
+        self._segment_start = timestamp
+        self._write_index(timestamp)
+
+    def append(self, line: str, timestamp: Optional[float] = None, participant: Optional[str] = None) -> None:
+        """Добавление строки. Время по умолчанию берется из самой строки."""
+        timestamp = self.timestamp_of(line) if timestamp is None else timestamp
+        with self._lock:
+            if (self._file is None or self._file.tell() >= self.max_bytes
+                    or timestamp - self._segment_start >= self.max_seconds):
+                self.participant = participant
+                self._rotate(timestamp)
+            elif participant != self.participant or timestamp - self._last_index_time >= self.index_interval:
+                self.participant = participant
+                self._write_index(timestamp)
+            self._file.write(line.encode("utf-8") + b"\n")
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self) -> None:
+        """Закрытие текущего сегмента и ожидание окончания сжатия."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._schedule_compression(self._segment)
+            self._index.close()
+        if self._compressor is not None:
+            self._compressor.shutdown(wait=True)
@@ -1,7 +1,20 @@
 import cv2
-from gaze_tracking import GazeTracking
+import numpy as np
+from gaze_tracking import (GazePredictor, GazeTracking, IdleBackoff, MotionGate, SessionRecorder, create_face_detector,
+                           direction, load_models)
+from behavior_rules import OffcenterRatioRule, Rule, RuleEngine, RuleEvent, SustainedOffcenterRule, create_rule
+from event_feed import EventFeed
+from evidence import EvidenceRecorder
+from frame_sources import EndOfStream, FrameSource, open_frame_source
+from metrics import MetricsRegistry, MetricsServer
+from log_storage import SegmentedLog, behavior_line_time, gaze_line_time
 import time
 import json
+import queue
+import re
+import socketserver
+import sys
+import threading
 from typing import Optional, Dict, List, Tuple
 from pathlib import Path
 
@@ -17,7 +30,65 @@ def load_config(config_path: str = "config.json") -> Dict:
         "behavior_log_file": "behavior_log.json",
         "calibration_time": 10,
         "analysis_window": 5,
-        "sleep_interval": 0.1
+        "sleep_interval": 0.1,
+        "motion_gating": False,
+        "motion_threshold": 4.0,
+        "motion_max_reuse": 5,
+        "adaptive": False,
+        "target_fps": 15,
+        "max_cpu_share": None,
+        "headless": False,
+        "control_socket": None,
+        "debug_render_fps": 5,
+        "parallel_eyes": False,
+        "face_detector": "dlib_hog",
+        "face_detector_options": {},
+        "calibration_min_samples": 15,
+        "calibration_tolerance": 0.005,
+        "log_segments": False,
+        "log_segment_max_bytes": 10 * 1024 * 1024,
+        "log_segment_max_seconds": 3600,
+        "log_compress": True,
+        "log_index_interval": 60,
+        "gaze_log_buffer_records": 1000,
+        "gaze_log_flush_interval": 5.0,
+        "gaze_log_max_memory_kb": 64,
+        "evidence_capture": False,
+        "evidence_fps": 5,
+        "evidence_pre_seconds": 5,
+        "evidence_post_seconds": 2,
+        "evidence_max_memory_mb": 32,
+        "evidence_width": 320,
+        "evidence_face_only": False,
+        "evidence_face_size": 160,
+        "evidence_format": "jpeg",
+        "evidence_jpeg_quality": 80,
+        "event_feed": None,
+        "event_feed_buffer": 1000,
+        "event_feed_gaze_rate": 5,
+        "metrics_address": None,
+        "idle_backoff": False,
+        "idle_after_frames": 30,
+        "idle_check_interval": 1.0,
+        "idle_detection_scale": 0.5,
+        "prediction": False,
+        "prediction_interval": 3,
+        "prediction_max_std": 0.05,
+        "prediction_process_noise": 1.0,
+        "prediction_measurement_noise": 0.02,
+        "camera_source": 0,
+        "camera_width": None,
+        "camera_height": None,
+        "camera_fps": None,
+        "camera_fourcc": "MJPG",
+        "camera_buffer_size": 1,
+        "video_realtime": True,
+        "session_recording": False,
+        "session_recording_chunk": 100,
+        "result_cache": "logs/cache/results.sqlite",
+        "result_cache_max_mb": 512,
+        "result_cache_max_entries": None,
+        "behavior_rules": [{"type": "sustained_offcenter"}, {"type": "offcenter_ratio"}]
     }
 
     try:
@@ -35,11 +106,310 @@ CONFIG = load_config()
 Path(CONFIG["logs_dir"]).mkdir(parents=True, exist_ok=True)
 
 
+def face_detector_from_config():
+    """Детектор лица, выбранный в конфигурации; для dlib используется общий экземпляр модели."""
+    options = dict(CONFIG["face_detector_options"])
+    if CONFIG["face_detector"] == "dlib_hog":
+        options.setdefault("detector", load_models()[0])
+    return create_face_detector(CONFIG["face_detector"], **options)
+
+
+def frame_source_from_config(source=None) -> FrameSource:
+    """Источник кадров с параметрами захвата из конфигурации; source заменяет camera_source."""
+    return open_frame_source(CONFIG["camera_source"] if source is None else source, CONFIG["camera_width"],
+                             CONFIG["camera_height"], CONFIG["camera_fps"], CONFIG["camera_fourcc"],
+                             CONFIG["camera_buffer_size"], CONFIG["video_realtime"])
+
+
+class OperatorCommands:
+    """Очередь команд оператора из отладочного окна, stdin и локального управляющего сокета."""
+
+    # 'c' запускает калибровку, пока она не начата, и останавливает приложение после ее завершения
+    KEYS = {ord('x'): "mark", ord('ч'): "mark", ord('c'): "confirm", ord('с'): "confirm",
+            ord('r'): "calibrate", ord('к'): "calibrate"}
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._server = None
+
+    @staticmethod
+    def parse(line: str) -> Optional[Tuple[str, Optional[str]]]:
+        """Разбор текстовой команды: 'participant <номер>', 'mark', 'calibrate', 'stop' или просто номер участника."""
+        parts = line.strip().split(maxsplit=1)
+        if not parts:
+            return None
+        command = parts[0].lower()
+        if command in ("participant", "p") and len(parts) == 2:
+            return "participant", parts[1]
+        if command in ("mark", "x"):
+            return "mark", None
+        if command in ("stop", "quit"):
+            return "stop", None
+        if command in ("calibrate", "r"):
+            return "calibrate", None
+        if command.isdigit() and len(parts) == 1:
+            return "participant", command
+        return None
+
+    def push(self, command: str, argument: Optional[str] = None) -> None:
+        self._queue.put((command, argument))
+
+    def push_key(self, key: int) -> None:
+        """Перевод нажатой клавиши отладочного окна в команду."""
+        if key in self.KEYS:
+            self.push(self.KEYS[key])
+
+    def push_line(self, line: str) -> None:
+        parsed = self.parse(line)
+        if parsed is not None:
+            self.push(*parsed)
+
+    def drain(self) -> List[Tuple[str, Optional[str]]]:
+        """Все накопленные команды без ожидания."""
+        commands = []
+        while True:
+            try:
+                commands.append(self._queue.get_nowait())
+            except queue.Empty:
+                return commands
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Tuple[str, Optional[str]]]:
+        """Ожидание следующей команды."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def start_stdin(self) -> None:
+        """Чтение команд из stdin в фоновом потоке."""
+        def read_stdin():
+            for line in sys.stdin:
+                self.push_line(line)
+
+        threading.Thread(target=read_stdin, name="stdin-commands", daemon=True).start()
+
+    def start_socket(self, address: str) -> None:
+        """Прием команд через локальный сокет: 'host:port' для TCP или путь для Unix-сокета."""
+        commands = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    commands.push_line(line.decode("utf-8", errors="ignore"))
+
+        host, _, port = address.rpartition(":")
+        if port.isdigit():
+            server_class = type("CommandServer", (socketserver.ThreadingMixIn, socketserver.TCPServer),
+                                {"daemon_threads": True, "allow_reuse_address": True})
+            self._server = server_class((host or "127.0.0.1", int(port)), Handler)
+        else:
+            server_class = type("CommandServer", (socketserver.ThreadingMixIn, socketserver.UnixStreamServer),
+                                {"daemon_threads": True})
+            Path(address).unlink(missing_ok=True)
+            self._server = server_class(address, Handler)
+        threading.Thread(target=self._server.serve_forever, name="socket-commands", daemon=True).start()
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class DebugRenderer:
+    """Отрисовка отладочного окна в отдельном потоке с собственной низкой частотой."""
+
+    def __init__(self, commands: OperatorCommands, window_size: Tuple[int, int], fps: float = 5,
+                 window_name: str = "Debug: Eye Tracking"):
+        self.commands = commands
+        self.window_size = window_size
+        self.period = 1.0 / fps
+        self.window_name = window_name
+        self.frames_rendered = 0
+        self._latest = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def submit(self, frame, pupils: Tuple, gaze_info: Dict[str, any]) -> None:
+        """Передача последнего кадра без копирования: поток отрисовки берет только самый свежий."""
+        self._latest = (frame, pupils, gaze_info)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="debug-renderer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def render(self, frame, pupils: Tuple, gaze_info: Dict[str, any]):
+        """Уменьшенный кадр с отмеченными зрачками и направлением взгляда."""
+        height, width = frame.shape[:2]
+        debug_frame = cv2.resize(frame, self.window_size)
+        scale_x, scale_y = self.window_size[0] / width, self.window_size[1] / height
+
+        color = (0, 255, 0)
+        for pupil in pupils:
+            if pupil is not None:
+                x, y = int(pupil[0] * scale_x), int(pupil[1] * scale_y)
+                cv2.line(debug_frame, (x - 5, y), (x + 5, y), color)
+                cv2.line(debug_frame, (x, y - 5), (x, y + 5), color)
+
+        cv2.putText(debug_frame, f"Direction: {gaze_info['direction']}", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+        cv2.putText(debug_frame, f"H: {gaze_info.get('horizontal_ratio', 0):.2f}", (10, 70),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+        cv2.putText(debug_frame, f"V: {gaze_info.get('vertical_ratio', 0):.2f}", (10, 110),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+        if "calibration" in gaze_info:
+            cv2.putText(debug_frame, gaze_info["calibration"], (10, 150),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+        return debug_frame
+
+    def _run(self) -> None:
+        rendered = None
+        while not self._stop.is_set():
+            latest = self._latest
+            if latest is not None and latest is not rendered:
+                cv2.imshow(self.window_name, self.render(*latest))
+                self.frames_rendered += 1
+                rendered = latest
+            self.commands.push_key(cv2.waitKey(1))
+            self._stop.wait(self.period)
+        cv2.destroyAllWindows()
+
+
+class RobustRunningStats:
+    """Потоковое среднее и дисперсия (алгоритм Уэлфорда) с отбрасыванием выбросов.
+
+    Первые warmup значений накапливаются, и по ним медиана и MAD задают начальную оценку,
+    дальше значение дальше k стандартных отклонений от среднего отбрасывается.
+    """
+
+    def __init__(self, k: float = 2.5, warmup: int = 5, min_std: float = 0.01):
+        self.k = k
+        self.warmup = warmup
+        self.min_std = min_std
+        self.count = 0
+        self.mean = 0.0
+        self.rejected = 0
+        self._m2 = 0.0
+        self._buffer = []
+
+    @property
+    def std(self) -> float:
+        return (self._m2 / (self.count - 1)) ** 0.5 if self.count > 1 else 0.0
+
+    @property
+    def stderr(self) -> float:
+        """Стандартная ошибка среднего."""
+        return self.std / self.count ** 0.5 if self.count > 1 else float("inf")
+
+    def _accept(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    def add(self, value: float) -> bool:
+        """Добавление значения. Возвращает False, если значение отброшено как выброс."""
+        if self._buffer is not None:
+            self._buffer.append(value)
+            if len(self._buffer) >= self.warmup:
+                buffer, self._buffer = sorted(self._buffer), None
+                median = buffer[len(buffer) // 2]
+                mad = sorted(abs(item - median) for item in buffer)[len(buffer) // 2] * 1.4826
+                limit = self.k * max(mad, self.min_std)
+                for item in buffer:
+                    if abs(item - median) <= limit:
+                        self._accept(item)
+                    else:
+                        self.rejected += 1
+            return True
+
+        if abs(value - self.mean) > self.k * max(self.std, self.min_std):
+            self.rejected += 1
+            return False
+        self._accept(value)
+        return True
+
+
+class CenterCalibrator:
+    """Неблокирующая калибровка центра взгляда, выполняемая в обычном цикле обработки кадров.
+
+    Калибровка завершается, как только стандартная ошибка оценки центра по обеим осям
+    становится меньше tolerance, или по истечении max_time, если собрано достаточно значений.
+    """
+
+    WAITING, SAMPLING, DONE = "waiting", "sampling", "done"
+
+    def __init__(self, max_time: float = 10, min_samples: int = 15, tolerance: float = 0.005):
+        self.max_time = max_time
+        self.min_samples = min_samples
+        self.tolerance = tolerance
+        self.state = self.WAITING
+        self.failures = 0
+        self.horizontal = RobustRunningStats()
+        self.vertical = RobustRunningStats()
+        self.start_time = None
+
+    @property
+    def sampling(self) -> bool:
+        return self.state == self.SAMPLING
+
+    def start(self) -> None:
+        """Начало (повторного) сбора значений."""
+        self.state = self.SAMPLING
+        self.horizontal = RobustRunningStats()
+        self.vertical = RobustRunningStats()
+        self.start_time = time.time()
+
+    def converged(self) -> bool:
+        samples = min(self.horizontal.count, self.vertical.count)
+        return samples >= self.min_samples and max(self.horizontal.stderr, self.vertical.stderr) < self.tolerance
+
+    def update(self, horizontal: Optional[float], vertical: Optional[float],
+               blinking: bool = False) -> Optional[Tuple[float, float]]:
+        """Учет очередного кадра. Возвращает центр (H, V), когда калибровка завершена."""
+        if not self.sampling:
+            return None
+        if horizontal is not None and vertical is not None and not blinking:
+            self.horizontal.add(horizontal)
+            self.vertical.add(vertical)
+
+        timed_out = time.time() - self.start_time >= self.max_time
+        if self.converged() or (timed_out and min(self.horizontal.count, self.vertical.count) >= self.min_samples):
+            self.state = self.DONE
+            return self.horizontal.mean, self.vertical.mean
+        if timed_out:
+            self.failures += 1
+            self.start()
+        return None
+
+    def status(self) -> str:
+        """Строка состояния для отладочного окна."""
+        if self.state == self.WAITING:
+            return "Calibration: Look straight and press 'c'"
+        if self.sampling:
+            return f"Calibrating: {min(self.horizontal.count, self.vertical.count)} samples"
+        return "Calibrated"
+
+
 class GazeTracker:
-    def __init__(self, debug: bool = True, calibration_threshold: float = 0.10):
-        self.gaze = GazeTracking()
+    def __init__(self, debug: bool = True, calibration_threshold: float = 0.10,
+                 gaze: Optional[GazeTracking] = None):
+        self.gaze = GazeTracking(face_detector_from_config(),
+                                 parallel_eyes=CONFIG["parallel_eyes"]) if gaze is None else gaze
         self.camera = None
-        self.debug = CONFIG["debug"] if debug is None else debug
+        self.headless = CONFIG["headless"]
+        self.debug = (CONFIG["debug"] if debug is None else debug) and not self.headless
+        self.commands = OperatorCommands()
+        self.renderer = DebugRenderer(self.commands, tuple(CONFIG["debug_window_size"]),
+                                      CONFIG["debug_render_fps"]) if self.debug else None
         self.debug_window_size = tuple(CONFIG["debug_window_size"])
         self.calibration_threshold = CONFIG[
             "calibration_threshold"] if calibration_threshold is None else calibration_threshold
@@ -47,40 +417,156 @@ class GazeTracker:
         self.vertical_center = 0.5
         self.calibrated = False
         self.calibration_time = CONFIG["calibration_time"]
+        self.calibrator = CenterCalibrator(self.calibration_time, CONFIG["calibration_min_samples"],
+                                           CONFIG["calibration_tolerance"])
+        self.motion_gate = MotionGate(CONFIG["motion_threshold"],
+                                      CONFIG["motion_max_reuse"]) if CONFIG["motion_gating"] else None
+        self.idle = IdleBackoff(CONFIG["idle_after_frames"], CONFIG["idle_check_interval"],
+                                CONFIG["idle_detection_scale"]) if CONFIG["idle_backoff"] else None
+        # Между полными анализами (не реже чем через prediction_interval кадров) отношения
+        # предсказываются фильтром; при движении в кадре анализ выполняется сразу. Если включен
+        # и motion_gating, анализ пропускает он, а фильтр заменяет результат пропущенных кадров
+        self.predictor = GazePredictor(CONFIG["prediction_process_noise"], CONFIG["prediction_measurement_noise"],
+                                       CONFIG["prediction_max_std"]) if CONFIG["prediction"] else None
+        self.prediction_gate = MotionGate(CONFIG["motion_threshold"],
+                                          CONFIG["prediction_interval"] - 1) if CONFIG["prediction"] else None
+        self.last_sample_predicted = False
+        self.frames_predicted = 0
+        # Интервалы (начало, конец) без лица в кадре, еще не записанные в лог поведения
+        self.absent_intervals = []
+        self.last_sample_reused = False
+        # Код направления последнего кадра (gaze_tracking.direction), его используют анализ и лог
+        self.direction = direction.NOT_CALIBRATED
+        # Время последнего кадра: от источника кадров или по часам в момент анализа
+        self.frame_time = None
+        self.frames_total = 0
+        self.frames_reused = 0
+        # Буфер кадров для доказательств подключается MainApp, которому известна папка логов
+        self.evidence = None
+        # Длительность этапов последнего кадра и результаты детекции лица для метрик
+        self.capture_time = 0.0
+        self.analysis_time = 0.0
+        self.faces_found = 0
+        self.faces_missed = 0
+
+    @property
+    def face_count(self) -> Optional[int]:
+        """Число лиц, найденных детектором на последнем кадре; None, если детектор на нем не запускался."""
+        return None if self.last_sample_reused else self.gaze.face_count
+
+    @property
+    def skip_rate(self) -> float:
+        """Доля кадров, для которых был переиспользован предыдущий результат."""
+        return self.frames_reused / self.frames_total if self.frames_total else 0.0
 
     def initialize_camera(self) -> None:
-        """Инициализация камеры с калибровкой."""
-        self.camera = cv2.VideoCapture(0)
-        self.calibrate()
+        """Инициализация источника кадров. Калибровка выполняется в цикле обработки кадров."""
+        self.camera = frame_source_from_config()
+        if hasattr(self.camera, "negotiated"):
+            print(f"Параметры камеры: {self.camera.negotiated()}")
+        if self.headless:
+            self.calibrate()
+        else:
+            print("Калибровка: направьте глаза в центр экрана и нажмите 'c'")
 
     def detect_gaze(self) -> Optional[str]:
         """Определение направления взгляда с отладочным выводом"""
         if self.camera is None:
             raise ValueError("Камера не инициализирована.")
 
-        _, frame = self.camera.read()
-        self.gaze.refresh(frame)
-        frame = self.gaze.annotated_frame()
-
-        gaze_info = self.get_gaze_direction()
-        direction = gaze_info["direction"]
-
-        # Отладочный вывод
-        if self.debug:
-            debug_frame = frame.copy()
-            debug_frame = cv2.resize(debug_frame, self.debug_window_size)
-
-            cv2.putText(debug_frame, f"Direction: {direction}", (10, 30),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            cv2.putText(debug_frame, f"H: {gaze_info.get('horizontal_ratio', 0):.2f}", (10, 70),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            cv2.putText(debug_frame, f"V: {gaze_info.get('vertical_ratio', 0):.2f}", (10, 110),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-
-            cv2.imshow("Debug: Eye Tracking", debug_frame)
-            cv2.waitKey(1)
-
-        return direction if direction != "not calibrated" else None
+        start = time.perf_counter()
+        ok, frame = self.camera.read()
+        self.capture_time = time.perf_counter() - start
+        if not ok:
+            raise EndOfStream("Источник кадров больше не выдает кадры")
+        return self.process_frame(frame, self.camera.wall_time if isinstance(self.camera, FrameSource) else None)
+
+    def process_frame(self, frame, timestamp: Optional[float] = None) -> Optional[str]:
+        """Анализ уже полученного кадра; timestamp - время кадра, по умолчанию текущее."""
+        captured = time.perf_counter()
+        self.frames_total += 1
+        timestamp = time.time() if timestamp is None else timestamp
+        self.frame_time = timestamp
+        if self.idle is not None and self.idle.idle and not self.check_presence(frame, timestamp):
+            # Никого нет: полный анализ не выполняется, кадр только показывается оператору
+            self.direction = direction.NO_FACE
+            self.last_sample_reused = False
+            self.analysis_time = time.perf_counter() - captured
+            if self.renderer is not None:
+                self.renderer.submit(frame, (None, None), {"direction": "no face (idle)"})
+            return None
+
+        if self.motion_gate is not None:
+            self.last_sample_reused = self.motion_gate.can_reuse(frame, self.gaze.face)
+            self.last_sample_predicted = (self.last_sample_reused and self.predictor is not None
+                                          and not self.calibrator.sampling and self.predictor.confident(timestamp))
+        elif self.predictor is not None:
+            self.last_sample_predicted = self.can_predict(frame, timestamp)
+            self.last_sample_reused = self.last_sample_predicted
+        else:
+            self.last_sample_reused = False
+        if self.last_sample_reused:
+            # Предсказанные кадры тоже не анализируются и учитываются как переиспользованные
+            self.frames_reused += 1
+            self.frames_predicted += self.last_sample_predicted
+        else:
+            self.gaze.refresh(frame)
+            if self.gaze.face is not None:
+                self.faces_found += 1
+            else:
+                self.faces_missed += 1
+            if self.idle is not None and self.idle.update(self.gaze.face is not None, timestamp):
+                print("Лицо не найдено, анализ приостановлен до появления лица")
+            if self.calibrator.sampling:
+                self.update_calibration()
+            if self.predictor is not None:
+                self.update_predictor(timestamp)
+        self.analysis_time = time.perf_counter() - captured
+        if self.evidence is not None:
+            self.evidence.add(frame, self.gaze.face)
+
+        gaze_info = self.get_gaze_direction(self.predictor.predict(timestamp) if self.last_sample_predicted else None)
+        name = gaze_info["direction"]
+        self.direction = gaze_info["code"] if "code" in gaze_info else direction.from_name(name)
+        if self.calibrator.state != CenterCalibrator.DONE:
+            gaze_info["calibration"] = self.calibrator.status()
+
+        # Отладочный вывод рисуется в отдельном потоке, здесь только передается ссылка на кадр
+        if self.renderer is not None:
+            self.renderer.submit(frame, self.get_eye_position(), gaze_info)
+
+        return name if self.direction != direction.NOT_CALIBRATED else None
+
+    def can_predict(self, frame, timestamp: float) -> bool:
+        """Можно ли предсказать отношения вместо анализа: фильтр уверен, сцена не изменилась,
+        с последнего анализа прошло меньше prediction_interval кадров и калибровка не идет."""
+        if (not self.calibrator.sampling and self.predictor.confident(timestamp)
+                and self.prediction_gate.can_reuse(frame, self.gaze.face)):
+            return True
+        self.prediction_gate.reset(frame, self.gaze.face)
+        return False
+
+    def update_predictor(self, timestamp: float) -> None:
+        """Коррекция фильтра по результату полного анализа; при моргании или без лица он сбрасывается."""
+        horizontal, vertical = self.gaze.horizontal_ratio(), self.gaze.vertical_ratio()
+        if horizontal is None or vertical is None:
+            self.predictor.reset()
+        else:
+            self.predictor.update(horizontal, vertical, timestamp)
+
+    def check_presence(self, frame, timestamp: float) -> bool:
+        """Проверка появления лица в режиме ожидания на уменьшенном кадре раз в idle_check_interval.
+
+        Возвращает True, если лицо найдено и кадр нужно проанализировать полностью.
+        """
+        if not self.idle.due(timestamp):
+            return False
+        interval = self.idle.checked(self.gaze.face_present(frame, self.idle.scale), timestamp)
+        if interval is None:
+            return False
+        self.absent_intervals.append(interval)
+        print(f"Лицо найдено, анализ возобновлен после {interval[1] - interval[0]:.0f} с ожидания")
+        return True
 
     def get_eye_position(self) -> Tuple[int, int]:
         """Получение координат глаз."""
@@ -88,126 +574,199 @@ class GazeTracker:
 
     def release_camera(self) -> None:
         """Освобождение камеры и закрытие окон"""
+        if self.renderer is not None:
+            self.renderer.stop()
         if self.camera is not None:
             self.camera.release()
+        self.gaze.close()
         if self.debug:
             cv2.destroyAllWindows()
 
     def calibrate(self) -> None:
-        """Калибровка центрального положения глаз."""
-        print("Калибровка: направьте глаза в центр экрана и нажмите 'c'")
-        while True:
-            _, frame = self.camera.read()
-            self.gaze.refresh(frame)
-            frame = self.gaze.annotated_frame()
-
-            debug_frame = frame.copy()
-            debug_frame = cv2.resize(debug_frame, self.debug_window_size)
-            cv2.putText(debug_frame, "Calibration: Look straight and press 'c'",
-                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            cv2.imshow("Calibration", debug_frame)
-
-            key = cv2.waitKey(1)
-            if key == ord('c') or key == ord('с'):
-                break
+        """Запуск калибровки центрального положения глаз; анализ при этом не останавливается."""
+        self.calibrator.start()
+        print("Калибровка... Смотрите в центр экрана и не двигайте глазами")
+
+    def update_calibration(self) -> None:
+        """Передача отношений текущего кадра в калибровку."""
+        failures = self.calibrator.failures
+        center = self.calibrator.update(self.gaze.horizontal_ratio(), self.gaze.vertical_ratio(),
+                                        bool(self.gaze.is_blinking()))
+        if center is not None:
+            self.horizontal_center, self.vertical_center = center
+            self.calibrated = True
+            print(f"Калибровка завершена. Центр: H={self.horizontal_center:.2f}, V={self.vertical_center:.2f}")
+        elif self.calibrator.failures > failures:
+            print("Ошибка калибровки: недостаточно данных, калибровка начата заново.")
 
-        print("Калибровка... Не двигайте глазами 10 секунд")
-        start_time = time.time()
-        horizontal_values = []
-        vertical_values = []
+    def get_gaze_direction(self, ratios: Optional[Tuple[float, float]] = None) -> Dict[str, any]:
+        """Определение направления взгляда относительно калиброванного центра.
 
-        while time.time() - start_time < self.calibration_time:
-            _, frame = self.camera.read()
-            self.gaze.refresh(frame)
+        ratios - предсказанные отношения (горизонтальное, вертикальное) вместо результата анализа.
+        """
+        if not self.calibrated:
+            return {"code": direction.NOT_CALIBRATED, "direction": "not calibrated"}
 
-            if self.gaze.horizontal_ratio() is not None:
-                horizontal_values.append(self.gaze.horizontal_ratio())
-            if self.gaze.vertical_ratio() is not None:
-                vertical_values.append(self.gaze.vertical_ratio())
+        if ratios is not None:
+            horizontal, vertical = ratios
+        else:
+            horizontal = self.gaze.horizontal_ratio()
+            vertical = self.gaze.vertical_ratio()
 
-            time.sleep(0.1)
+        if horizontal is None or vertical is None:
+            if self.gaze.face is None:
+                return {"code": direction.NO_FACE, "direction": "no face"}
+            return {"code": direction.BLINK, "direction": "blink"}
 
-        if horizontal_values and vertical_values:
-            self.horizontal_center = sum(horizontal_values) / len(horizontal_values)
-            self.vertical_center = sum(vertical_values) / len(vertical_values)
-            self.calibrated = True
-            print(f"Калибровка завершена. Центр: H={self.horizontal_center:.2f}, V={self.vertical_center:.2f}")
-        else:
-            print("Ошибка калибровки. Используются значения по умолчанию.")
-        cv2.destroyAllWindows()
+        code = direction.from_offsets(horizontal - self.horizontal_center, vertical - self.vertical_center,
+                                      self.calibration_threshold)
+        return {
+            "code": code,
+            "direction": direction.to_name(code),
+            "horizontal_ratio": horizontal,
+            "vertical_ratio": vertical
+        }
 
-    def get_gaze_direction(self) -> Dict[str, any]:
-        """Определение направления взгляда относительно калиброванного центра."""
+    def classify_directions(self, horizontal, vertical, face_found=None) -> np.ndarray:
+        """Коды направлений для массивов отношений (например, из GazeTracking.refresh_batch)
+        по тем же правилам, что get_gaze_direction, без цикла по кадрам."""
         if not self.calibrated:
-            return {"direction": "not calibrated"}
+            return np.full(np.shape(horizontal), direction.NOT_CALIBRATED, np.uint8)
+        return direction.classify(horizontal, vertical, self.horizontal_center, self.vertical_center,
+                                  self.calibration_threshold, face_found)
 
-        horizontal = self.gaze.horizontal_ratio()
-        vertical = self.gaze.vertical_ratio()
 
-        if horizontal is None or vertical is None:
-            return {"direction": "blink"}
+def run_length_encode(directions: List) -> List[list]:
+    """Сжатие последовательности направлений в серии [направление, начальный кадр, число кадров]."""
+    runs = []
+    for index, value in enumerate(directions):
+        if runs and runs[-1][0] == value:
+            runs[-1][2] += 1
+        else:
+            runs.append([value, index, 1])
+    return runs
 
-        h_diff = horizontal - self.horizontal_center
-        v_diff = vertical - self.vertical_center
 
-        direction = []
+def expand_gaze_history(report: Dict[str, any]) -> List[str]:
+    """История направлений отчета в виде списка по кадрам, как в прежнем формате gaze_history."""
+    if "gaze_history" in report:
+        return report["gaze_history"]
+    return [name for name, _, count in report.get("gaze_history_rle", []) for _ in range(count)]
 
-        if abs(h_diff) > self.calibration_threshold:
-            direction.append("right" if h_diff < 0 else "left")
-        if abs(v_diff) > self.calibration_threshold:
-            direction.append("up" if v_diff < 0 else "down")
 
-        if not direction:
-            direction.append("center")
+_SCALAR_LIST = re.compile(r"\[\s*\n\s*([^\[\]{}]*?)\s*\n\s*\]")
 
-        return {
-            "direction": " ".join(direction),
-            "horizontal_ratio": horizontal,
-            "vertical_ratio": vertical
-        }
+
+def dumps_behavior_log(logs: List[Dict[str, any]]) -> str:
+    """JSON с отступами, в котором списки из простых значений (серии истории взгляда) записаны в одну строку."""
+    text = json.dumps(logs, indent=2, ensure_ascii=False)
+    return _SCALAR_LIST.sub(lambda match: "[" + re.sub(r",\s*\n\s*", ", ", match.group(1)) + "]", text)
 
 
 class BehaviorAnalyzer:
-    def __init__(self, max_suspicious_actions: int = 1):
+    """Анализ поведения по кадрам: правила behavior_rules обновляются по общему окну кадров,
+    каждое срабатывание добавляет weight к suspicious_actions, кадр в центре уменьшает его на 1."""
+
+    def __init__(self, max_suspicious_actions: int = 1, analysis_window: Optional[float] = None,
+                 offcenter_threshold: float = 0.7, min_consecutive_offcenter: Optional[int] = None,
+                 rules: Optional[List[Dict]] = None):
         self.suspicious_actions = 0
         self.max_suspicious_actions = CONFIG[
             "max_suspicious_actions"] if max_suspicious_actions is None else max_suspicious_actions
-        self.gaze_history = []  
-        self.analysis_window = CONFIG["analysis_window"]  
-        self.window_size = int(self.analysis_window / CONFIG["sleep_interval"])  
-        self.min_consecutive_offcenter = int(2.0 / CONFIG["sleep_interval"]) 
-        self.offcenter_threshold = 0.7  
-        self.last_direction = "center"
-        self.consecutive_offcenter = 0
+        self.analysis_window = CONFIG["analysis_window"] if analysis_window is None else analysis_window
+        self.sample_interval = CONFIG["sleep_interval"]
+        # Заданное явно число кадров подряд не пересчитывается при смене интервала
+        self.fixed_consecutive_offcenter = min_consecutive_offcenter
+        # Правила прежних эвристик существуют всегда: их параметры доступны как атрибуты анализатора
+        self.sustained = SustainedOffcenterRule(int(2.0 / self.sample_interval) if min_consecutive_offcenter is None
+                                                else min_consecutive_offcenter)
+        self.ratio = OffcenterRatioRule(offcenter_threshold)
+        self.engine = RuleEngine([], int(self.analysis_window / self.sample_interval))
+        for spec in CONFIG["behavior_rules"] if rules is None else rules:
+            self.engine.add(self._rule(spec))
+        # События правил с последнего отчета
+        self.events = []
+        self.last_direction = direction.CENTER
         self.last_offcenter_time = None
 
-    def analyze_gaze_pattern(self, gaze_data: str) -> None:
-        """Анализ паттернов взгляда с учетом длительности и процента вне центра."""
-        timestamp = time.time()
-        self.gaze_history.append((timestamp, gaze_data))
-        if len(self.gaze_history) > self.window_size:
-            self.gaze_history = self.gaze_history[-self.window_size:]
-
-        if gaze_data not in ["center", "blink", "not calibrated"]:
-            self.consecutive_offcenter += 1
-        else:
-            self.consecutive_offcenter -= 1
-
-        self.last_direction = gaze_data
+    def _rule(self, spec: Dict) -> Rule:
+        legacy = {SustainedOffcenterRule.kind: self.sustained, OffcenterRatioRule.kind: self.ratio}
+        if spec.get("type") not in legacy:
+            return create_rule(spec)
+        rule = legacy[spec["type"]]
+        rule.name = spec.get("name", rule.name)
+        rule.weight = spec.get("weight", rule.weight)
+        return rule
+
+    @property
+    def gaze_history(self) -> List[Tuple[float, int]]:
+        """Кадры окна анализа: (время, код направления)."""
+        return [(sample.timestamp, sample.code) for sample in self.engine.window]
+
+    @property
+    def window_size(self) -> int:
+        return self.engine.window.size
+
+    @window_size.setter
+    def window_size(self, size: int) -> None:
+        self.engine.window.resize(size)
+
+    @property
+    def consecutive_offcenter(self) -> int:
+        return self.sustained.count
+
+    @consecutive_offcenter.setter
+    def consecutive_offcenter(self, count: int) -> None:
+        self.sustained.count = count
+
+    @property
+    def min_consecutive_offcenter(self) -> int:
+        return self.sustained.min_consecutive
+
+    @min_consecutive_offcenter.setter
+    def min_consecutive_offcenter(self, frames: int) -> None:
+        self.sustained.min_consecutive = frames
+
+    @property
+    def offcenter_threshold(self) -> float:
+        return self.ratio.threshold
+
+    @offcenter_threshold.setter
+    def offcenter_threshold(self, threshold: float) -> None:
+        self.ratio.threshold = threshold
+
+    def set_sample_interval(self, sample_interval: float) -> None:
+        """Пересчет размеров окон анализа под фактический интервал между кадрами."""
+        self.sample_interval = sample_interval
+        self.window_size = max(int(self.analysis_window / sample_interval), 1)
+        if self.fixed_consecutive_offcenter is None:
+            self.min_consecutive_offcenter = max(int(2.0 / sample_interval), 1)
+
+    def analyze_gaze_pattern(self, gaze_data, faces: Optional[int] = None,
+                             timestamp: Optional[float] = None) -> List[RuleEvent]:
+        """Анализ кадра всеми правилами. Возвращает события сработавших правил.
+
+        gaze_data - код направления из gaze_tracking.direction или его название,
+        faces - число лиц в кадре, если известно.
+        """
+        code = direction.to_code(gaze_data)
+        timestamp = time.time() if timestamp is None else timestamp
+        events = self._record(self.engine.update(timestamp, code, faces))
+        self.last_direction = code
+
+        if code == direction.CENTER and self.suspicious_actions > 0:
+            self.suspicious_actions -= 1
+        return events
 
-        if self.consecutive_offcenter >= self.min_consecutive_offcenter:
-            self.suspicious_actions += 1
-            self.consecutive_offcenter = 0  
+    def analyze_absence(self, start: float, now: float) -> List[RuleEvent]:
+        """Анализ интервала без лица, кадры которого не анализировались (режим ожидания idle_backoff)."""
+        return self._record(self.engine.absent(start, now))
 
-        offcenter_count = sum(1 for t, d in self.gaze_history if d not in ["center", "blink", "not calibrated"])
-        if len(self.gaze_history) >= self.window_size:
-            offcenter_ratio = offcenter_count / self.window_size
-            if offcenter_ratio > self.offcenter_threshold:
-                self.suspicious_actions += 1
-                self.gaze_history = self.gaze_history[-self.window_size//2:]
-
-        if gaze_data == "center" and self.suspicious_actions > 0:
-            self.suspicious_actions -= 1
+    def _record(self, events: List[RuleEvent]) -> List[RuleEvent]:
+        for event in events:
+            self.suspicious_actions += event.weight
+        self.events.extend(events)
+        return events
 
     def detect_cheating(self) -> bool:
         """Проверка на списывание с учетом нового анализа."""
@@ -215,12 +774,24 @@ class BehaviorAnalyzer:
 
     def generate_report(self) -> Dict[str, any]:
         """Генерация отчета."""
+        runs = run_length_encode([sample.code for sample in self.engine.window])
+        durations = {}
+        for code, _, count in runs:
+            durations[code] = durations.get(code, 0) + count
+        # Названия направлений появляются только в сериализуемом отчете
+        for run in runs:
+            run[0] = direction.to_name(run[0])
         report = {
             "suspicious_actions": self.suspicious_actions,
-            "gaze_history": [d for t, d in self.gaze_history],
-            "current_status": "cheating" if self.detect_cheating() else "normal"
+            "gaze_history_rle": runs,
+            "gaze_durations": {direction.to_name(code): round(count * self.sample_interval, 3)
+                               for code, count in durations.items()},
+            "sample_interval": self.sample_interval,
+            "current_status": "cheating" if self.detect_cheating() else "normal",
+            "rule_events": [event.to_dict() for event in self.events]
         }
         self.suspicious_actions = 0
+        self.events = []
         return report
 
 
@@ -242,18 +813,158 @@ class UIInterface:
         #print(json.dumps(report, indent=2))
 
 
+class GazeLogBuffer:
+    """Буфер лога взгляда фиксированной емкости с компактными записями.
+
+    Кадр хранится как (время, код направления из gaze_tracking.direction, флаги)
+    в заранее выделенном массиве, строки формируются только при записи в файл. Редкие текстовые сообщения
+    (номер участника, ручная отметка) хранятся отдельно. Если буфер заполнен
+    и сбросить его не удалось, самые старые записи перезаписываются.
+    """
+
+    RECORD = np.dtype([("time", "f8"), ("code", "u2"), ("flags", "u1")])
+    REUSED, MESSAGE = 1, 2
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = max(int(capacity), 1)
+        self.records = np.zeros(self.capacity, self.RECORD)
+        self.messages = {}
+        self.dropped = 0
+        self._start = 0
+        self._size = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.records.nbytes
+
+    def __len__(self) -> int:
+        return self._size
+
+    def full(self) -> bool:
+        return self._size == self.capacity
+
+    def _push(self, timestamp: float, code: int, flags: int) -> int:
+        if self.full():
+            self.messages.pop(self._start, None)
+            self._start = (self._start + 1) % self.capacity
+            self._size -= 1
+            self.dropped += 1
+        slot = (self._start + self._size) % self.capacity
+        self.records[slot] = (timestamp, code, flags)
+        self._size += 1
+        return slot
+
+    def record(self, gaze_data, reused: bool = False, timestamp: Optional[float] = None) -> None:
+        """Добавление кадра по коду направления или его названию."""
+        self._push(time.time() if timestamp is None else timestamp, direction.to_code(gaze_data),
+                   self.REUSED if reused else 0)
+
+    def append(self, line: str) -> None:
+        """Добавление готовой строки лога вида '<время>: <сообщение>'."""
+        timestamp, separator, message = line.partition(": ")
+        try:
+            when = time.mktime(time.strptime(timestamp, "%Y-%m-%d %H:%M:%S"))
+        except ValueError:
+            when, message = time.time(), line
+        self.messages[self._push(when, 0, self.MESSAGE)] = message
+
+    def extend(self, lines: List[str]) -> None:
+        for line in lines:
+            self.append(line)
+
+    def clear(self) -> None:
+        self.messages = {}
+        self._start = self._size = 0
+
+    def lines(self):
+        """Строки лога в порядке записи; время форматируется один раз на секунду."""
+        last_second, prefix = None, ""
+        for position in range(self._size):
+            slot = (self._start + position) % self.capacity
+            second = int(self.records[slot]["time"])
+            if second != last_second:
+                last_second, prefix = second, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+            yield self._format(slot, prefix)
+
+    def _format(self, slot: int, prefix: str) -> str:
+        _, code, flags = self.records[slot]
+        if flags & self.MESSAGE:
+            return f"{prefix}: {self.messages[slot]}"
+        if flags & self.REUSED:
+            return f"{prefix}: {direction.to_name(code)} [reused]"
+        return f"{prefix}: {direction.to_name(code)}"
+
+    def __iter__(self):
+        return self.lines()
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("GazeLogBuffer index out of range")
+        slot = (self._start + index) % self.capacity
+        prefix = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(int(self.records[slot]["time"])))
+        return self._format(slot, prefix)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, GazeLogBuffer)):
+            return list(self) == list(other)
+        return NotImplemented
+
+
 class DataLogger:
-    def __init__(self):
-        self.gaze_logs = []
+    def __init__(self, logs_dir: Optional[str] = None):
+        record_limit = CONFIG["gaze_log_max_memory_kb"] * 1024 // GazeLogBuffer.RECORD.itemsize
+        self._gaze_logs = GazeLogBuffer(min(CONFIG["gaze_log_buffer_records"], record_limit))
+        self.flush_interval = CONFIG["gaze_log_flush_interval"]
+        self.last_flush = time.monotonic()
         self.behavior_logs = []
-        self.logs_dir = CONFIG["logs_dir"]
+        self.logs_dir = CONFIG["logs_dir"] if logs_dir is None else logs_dir
+        Path(self.logs_dir).mkdir(parents=True, exist_ok=True)
         self.gaze_log_file = Path(self.logs_dir) / CONFIG["gaze_log_file"]
         self.behavior_log_file = Path(self.logs_dir) / CONFIG["behavior_log_file"]
-
-    def log_gaze_data(self, gaze_data: str) -> None:
-        """Логирование данных о взгляде в память."""
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-        self.gaze_logs.append(f"{timestamp}: {gaze_data}")
+        self.participant = None
+        self.gaze_store = self.behavior_store = None
+        if CONFIG["log_segments"]:
+            options = {"max_bytes": CONFIG["log_segment_max_bytes"], "max_seconds": CONFIG["log_segment_max_seconds"],
+                       "compress": CONFIG["log_compress"], "index_interval": CONFIG["log_index_interval"]}
+            self.gaze_store = SegmentedLog(self.logs_dir, self.gaze_log_file.stem, self.gaze_log_file.suffix,
+                                           gaze_line_time, **options)
+            self.behavior_store = SegmentedLog(self.logs_dir, self.behavior_log_file.stem, ".jsonl",
+                                               behavior_line_time, **options)
+
+    @property
+    def gaze_logs(self) -> GazeLogBuffer:
+        return self._gaze_logs
+
+    @gaze_logs.setter
+    def gaze_logs(self, lines: List[str]) -> None:
+        self._gaze_logs.clear()
+        self._gaze_logs.extend(lines)
+
+    def log_gaze_data(self, gaze_data, reused: bool = False, timestamp: Optional[float] = None) -> None:
+        """Логирование данных о взгляде в память со сбросом в файл по заполнению буфера или по времени."""
+        self._gaze_logs.record(gaze_data, reused, timestamp)
+        if self._gaze_logs.full() or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush_gaze_logs()
+
+    def flush_gaze_logs(self) -> None:
+        """Запись накопленного лога взгляда в файл. При ошибке записи буфер сохраняется."""
+        self.last_flush = time.monotonic()
+        if not len(self._gaze_logs):
+            return
+        try:
+            if self.gaze_store is not None:
+                for line in self._gaze_logs:
+                    self.gaze_store.append(line, participant=self.participant)
+                self.gaze_store.flush()
+            else:
+                with open(self.gaze_log_file, "a", encoding="utf-8") as f:
+                    f.write("\n".join(self._gaze_logs) + "\n")
+        except OSError as error:
+            print(f"Ошибка записи лога взгляда: {error}")
+            return
+        self._gaze_logs.clear()
 
     def log_behavior(self, behavior_data: Dict[str, any]) -> None:
         """Логирование данных о поведении в память."""
@@ -266,11 +977,11 @@ class DataLogger:
 
     def save_logs_to_file(self) -> None:
         """Сохранение логов из памяти в файлы."""
-        if self.gaze_logs:
-            with open(self.gaze_log_file, "a", encoding="utf-8") as f:
-                f.write("\n".join(self.gaze_logs) + "\n")
-            self.gaze_logs = []
+        if self.gaze_store is not None:
+            self.save_logs_to_segments()
+            return
 
+        self.flush_gaze_logs()
 
         if self.behavior_logs:
             try:
@@ -285,80 +996,405 @@ class DataLogger:
             existing_logs.extend(self.behavior_logs)
 
             with open(self.behavior_log_file, "w", encoding="utf-8") as f:
-                json.dump(existing_logs, f, indent=2, ensure_ascii=False)
+                f.write(dumps_behavior_log(existing_logs))
             self.behavior_logs = []
 
+    def save_logs_to_segments(self) -> None:
+        """Дозапись логов в сегменты; behavior_log хранится построчно в формате JSON Lines."""
+        self.flush_gaze_logs()
+        for entry in self.behavior_logs:
+            self.behavior_store.append(json.dumps(entry, ensure_ascii=False), participant=self.participant)
+        self.behavior_logs = []
+        self.behavior_store.flush()
+
+    def close(self) -> None:
+        """Закрытие сегментированных логов."""
+        for store in (self.gaze_store, self.behavior_store):
+            if store is not None:
+                store.close()
+
+
+
+class AdaptiveController:
+    """Подстройка частоты обработки и параметров детекции лица под заданный бюджет."""
+
+    # Уровни деградации: (масштаб кадра для детектора лица, интервал повторной детекции)
+    LEVELS = [(1.0, 1), (0.75, 1), (0.75, 2), (0.5, 3), (0.5, 5), (0.35, 8)]
+
+    def __init__(self, target_fps: float = 15, max_cpu_share: Optional[float] = None,
+                 smoothing: float = 0.2, cooldown: int = 10, recover_margin: float = 0.6):
+        self.target_period = 1.0 / target_fps
+        self.max_cpu_share = max_cpu_share
+        self.smoothing = smoothing
+        self.cooldown = cooldown
+        self.recover_margin = recover_margin
+        self.level = 0
+        self.processing_time = None
+        self.cpu_share = None
+        self.sample_interval = self.target_period
+        self._frames_since_change = 0
+        self._last_wall = None
+        self._last_cpu = None
+
+    @property
+    def detection_scale(self) -> float:
+        return self.LEVELS[self.level][0]
+
+    @property
+    def redetect_interval(self) -> int:
+        return self.LEVELS[self.level][1]
+
+    def _smooth(self, average: Optional[float], value: float) -> float:
+        return value if average is None else average + self.smoothing * (value - average)
+
+    def _measure_period(self) -> None:
+        """Замер фактического периода цикла и доли процессорного времени."""
+        now_wall, now_cpu = time.perf_counter(), time.process_time()
+        if self._last_wall is not None and now_wall > self._last_wall:
+            period = now_wall - self._last_wall
+            self.sample_interval = self._smooth(self.sample_interval, period)
+            self.cpu_share = self._smooth(self.cpu_share, (now_cpu - self._last_cpu) / period)
+        self._last_wall, self._last_cpu = now_wall, now_cpu
+
+    def load(self) -> float:
+        """Загрузка относительно бюджета: больше 1 означает перегрузку."""
+        budget = self.target_period * (self.max_cpu_share or 1.0)
+        load = self.processing_time / budget
+        if self.max_cpu_share and self.cpu_share is not None:
+            load = max(load, self.cpu_share / self.max_cpu_share)
+        return load
+
+    def update(self, processing_time: float) -> float:
+        """Учет времени обработки кадра. Возвращает паузу до следующего кадра."""
+        self._measure_period()
+        self.processing_time = self._smooth(self.processing_time, processing_time)
+
+        self._frames_since_change += 1
+        if self._frames_since_change >= self.cooldown:
+            load = self.load()
+            if load > 1.0 and self.level < len(self.LEVELS) - 1:
+                self.level += 1
+                self._frames_since_change = 0
+            elif load < self.recover_margin and self.level > 0:
+                self.level -= 1
+                self._frames_since_change = 0
+
+        # Если даже на минимальном качестве бюджет превышен, снижается частота кадров
+        period = max(self.target_period, self.processing_time / (self.max_cpu_share or 1.0))
+        return max(period - processing_time, 0.0)
+
+    def apply(self, gaze: GazeTracking) -> None:
+        """Применение текущего уровня к параметрам детекции лица."""
+        gaze.detection_scale = self.detection_scale
+        gaze.redetect_interval = self.redetect_interval
 
 
 class MainApp:
-    def __init__(self):
-        self.gaze_tracker = GazeTracker()
+    def __init__(self, gaze_tracker: Optional[GazeTracker] = None, logger: Optional[DataLogger] = None):
+        self.gaze_tracker = GazeTracker() if gaze_tracker is None else gaze_tracker
         self.behavior_analyzer = BehaviorAnalyzer()
         self.ui = UIInterface()
-        self.logger = DataLogger()
+        self.logger = DataLogger() if logger is None else logger
+        self.commands = self.gaze_tracker.commands
         self.sleep_interval = CONFIG["sleep_interval"]
+        self.controller = AdaptiveController(CONFIG["target_fps"],
+                                             CONFIG["max_cpu_share"]) if CONFIG["adaptive"] else None
+        if CONFIG["evidence_capture"] and self.gaze_tracker.evidence is None:
+            self.gaze_tracker.evidence = EvidenceRecorder(
+                self.logger.logs_dir, CONFIG["evidence_fps"], CONFIG["evidence_pre_seconds"],
+                CONFIG["evidence_post_seconds"], CONFIG["evidence_max_memory_mb"], CONFIG["evidence_width"],
+                CONFIG["evidence_face_only"], CONFIG["evidence_face_size"], CONFIG["evidence_format"],
+                CONFIG["evidence_jpeg_quality"])
+        self.feed = EventFeed(CONFIG["event_feed"], CONFIG["event_feed_buffer"],
+                              gaze_rate=CONFIG["event_feed_gaze_rate"]) if CONFIG["event_feed"] else None
+        self.participant = None
+        self.metrics = self.metrics_server = None
+        if CONFIG["metrics_address"]:
+            self.metrics = self.create_metrics()
+            self.metrics_server = MetricsServer(self.metrics, CONFIG["metrics_address"])
 
     def run(self) -> None:
         """Запуск приложения."""
         try:
-            participant_number = input("Введите номер участника: ")
-            timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-
-            gaze_log_entry = f"{timestamp}: Номер участника: {participant_number}"
-            self.logger.gaze_logs.append(gaze_log_entry)
-
-            behavior_log_entry = {
-                "timestamp": timestamp,
-                "data": {
-                    "participant_number": participant_number,
-                    "message": "Начало сеанса, номер участника записан"
-                }
-            }
-            self.logger.behavior_logs.append(behavior_log_entry)
-            self.logger.save_logs_to_file()
+            if self.gaze_tracker.headless:
+                self.start_command_sources()
+                participant_number = self.wait_participant()
+            else:
+                participant_number = input("Введите номер участника: ")
+            if self.feed is not None:
+                self.feed.start()
+            if self.metrics_server is not None:
+                self.metrics_server.start()
+            self.start_session(participant_number)
 
             self.gaze_tracker.initialize_camera()
-            print("Калибровка завершена. Приложение запущено. Нажмите C для остановки.")
+            if self.gaze_tracker.renderer is not None:
+                self.gaze_tracker.renderer.start()
+            print("Приложение запущено. После калибровки нажмите C для остановки, R для повторной калибровки.")
 
             while True:
-                gaze_data = self.gaze_tracker.detect_gaze()
-                if gaze_data and gaze_data != "not calibrated":
-                    self.ui.display_gaze_data(gaze_data)
-                    self.behavior_analyzer.analyze_gaze_pattern(gaze_data)
-                    self.logger.log_gaze_data(gaze_data)
-
-                    if self.behavior_analyzer.detect_cheating():
-                        self.ui.show_alert()
-                        report = self.behavior_analyzer.generate_report()
-                        self.logger.log_behavior(report)
-                        self.ui.display_report(report)
-
-                time.sleep(self.sleep_interval)
-
-                key = cv2.waitKey(1)
-                if key == ord('x') or key == ord('ч'):
-                    timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-                    self.logger.gaze_logs.append(f"{timestamp}: Отмечена попытка списывания (по нажатию X)")
-                    self.logger.behavior_logs.append({
-                        "timestamp": timestamp,
-                        "data": {
-                            "event_type": "manual_cheating_mark",
-                            "message": "Пользователь отметил попытку списывания по нажатию X"
-                        }
-                    })
-                    self.logger.save_logs_to_file()
-                    print("Попытка списывания отмечена в логах")
-
-                if key == ord('c') or key == ord('с'):
-                    raise KeyboardInterrupt
+                loop_start = time.perf_counter()
+                self.step()
+                time.sleep(self.next_sleep(time.perf_counter() - loop_start))
+                self.handle_commands()
 
+        except EndOfStream:
+            print("Источник кадров закончился.")
+            self.stop()
         except KeyboardInterrupt:
             self.stop()
 
+    def create_metrics(self) -> MetricsRegistry:
+        """Метрики конвейера; счетчики, которые уже ведутся в других объектах, читаются при запросе."""
+        tracker = self.gaze_tracker
+        metrics = MetricsRegistry()
+        metrics.callback_counter("gaze_frames_captured_total", "Кадров получено с камеры",
+                                 lambda: tracker.frames_total)
+        metrics.callback_counter("gaze_frames_processed_total", "Кадров обработано детектором",
+                                 lambda: tracker.frames_total - tracker.frames_reused)
+        metrics.callback_counter("gaze_frames_reused_total", "Кадров с переиспользованным результатом",
+                                 lambda: tracker.frames_reused)
+        metrics.callback_counter("gaze_frames_dropped_total", "Кадров пропущено",
+                                 lambda: getattr(tracker.camera, "frames_dropped", 0))
+        metrics.callback_counter("gaze_frames_predicted_total", "Кадров с предсказанным фильтром результатом",
+                                 lambda: tracker.frames_predicted if tracker.predictor is not None else None)
+        metrics.gauge("gaze_capture_fps", "Частота выдачи кадров источником",
+                      lambda: tracker.camera.fps if isinstance(tracker.camera, FrameSource) else None)
+        metrics.gauge("gaze_capture_wait_seconds", "Среднее ожидание кадра от источника",
+                      lambda: tracker.camera.latency if isinstance(tracker.camera, FrameSource) else None)
+        metrics.gauge("gaze_face_detection_hit_ratio", "Доля обработанных кадров с найденным лицом",
+                      lambda: tracker.faces_found / max(tracker.faces_found + tracker.faces_missed, 1))
+        metrics.gauge("gaze_idle", "Анализ приостановлен: лица нет в кадре",
+                      lambda: int(tracker.idle.idle) if tracker.idle is not None else None)
+        metrics.gauge("gaze_calibration_state", "Состояние калибровки",
+                      lambda: {state: int(tracker.calibrator.state == state) for state in
+                               (CenterCalibrator.WAITING, CenterCalibrator.SAMPLING, CenterCalibrator.DONE)},
+                      label="state")
+        metrics.gauge("gaze_logger_queue_depth", "Записей в памяти логгера, ожидающих записи в файл",
+                      lambda: {"gaze": len(self.logger.gaze_logs), "behavior": len(self.logger.behavior_logs)},
+                      label="log")
+        metrics.gauge("gaze_event_feed_subscribers", "Подписчиков трансляции событий",
+                      lambda: len(self.feed.subscribers) if self.feed is not None else None)
+        metrics.histogram("gaze_stage_latency_seconds", "Длительность этапов обработки кадра", label="stage")
+        metrics.counter("gaze_detections_total", "Срабатываний детектора списывания", labels=("participant",))
+        metrics.counter("gaze_manual_marks_total", "Ручных отметок списывания", labels=("participant",))
+        return metrics
+
+    def observe_step(self, start: float, analyzed: float) -> None:
+        """Запись длительностей этапов кадра в гистограмму."""
+        latency = self.metrics.metrics["gaze_stage_latency_seconds"]
+        latency.observe(self.gaze_tracker.capture_time, "capture")
+        latency.observe(self.gaze_tracker.analysis_time, "analysis")
+        end = time.perf_counter()
+        latency.observe(end - analyzed, "behavior")
+        latency.observe(end - start, "total")
+
+    def step(self) -> Optional[str]:
+        """Обработка одного кадра: определение взгляда, анализ поведения и запись в лог."""
+        start = time.perf_counter()
+        gaze_data = self.gaze_tracker.detect_gaze()
+        analyzed = time.perf_counter()
+        frame_time = self.gaze_tracker.frame_time
+        # В режиме ожидания кадры без лица не анализируются: правила получают интервалы отсутствия
+        events = []
+        for absent_start, absent_end in self.gaze_tracker.absent_intervals:
+            events += self.behavior_analyzer.analyze_absence(absent_start, absent_end)
+        if self.gaze_tracker.absent_intervals:
+            self.log_absences()
+        idle = self.gaze_tracker.idle
+        if idle is not None and idle.idle:
+            events += self.behavior_analyzer.analyze_absence(idle.absent_since, frame_time)
+
+        sampled = bool(gaze_data) and gaze_data != "not calibrated"
+        if sampled:
+            self.ui.display_gaze_data(gaze_data)
+            code = self.gaze_tracker.direction
+            self.behavior_analyzer.analyze_gaze_pattern(code, self.gaze_tracker.face_count, frame_time)
+            self.logger.log_gaze_data(code, self.gaze_tracker.last_sample_reused, frame_time)
+            if self.feed is not None:
+                self.feed.publish("gaze", {"participant": self.participant, "direction": gaze_data,
+                                           "reused": self.gaze_tracker.last_sample_reused})
+
+        if (sampled or events) and self.behavior_analyzer.detect_cheating():
+            self.ui.show_alert()
+            report = self.behavior_analyzer.generate_report()
+            if self.gaze_tracker.evidence is not None:
+                report["evidence"] = self.gaze_tracker.evidence.trigger("detection")
+            self.logger.log_behavior(report)
+            self.ui.display_report(report)
+            if self.feed is not None:
+                self.feed.publish("detection", {"participant": self.participant, "report": report})
+            if self.metrics is not None:
+                self.metrics.metrics["gaze_detections_total"].inc(self.participant)
+        if self.metrics is not None:
+            self.observe_step(start, analyzed)
+        return gaze_data
+
+    def log_absences(self) -> None:
+        """Запись завершившихся интервалов без лица в кадре как событий лога поведения."""
+        for start, end in self.gaze_tracker.absent_intervals:
+            event = {
+                "event_type": "face_absent",
+                "start": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start)),
+                "end": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(end)),
+                "duration": round(end - start, 1)
+            }
+            self.logger.log_behavior(event)
+            if self.feed is not None:
+                self.feed.publish("presence", {"participant": self.participant, **event})
+        self.gaze_tracker.absent_intervals = []
+
+    def start_command_sources(self) -> None:
+        """Подключение stdin и управляющего сокета как источников команд в режиме без окна."""
+        self.commands.start_stdin()
+        if CONFIG["control_socket"]:
+            self.commands.start_socket(CONFIG["control_socket"])
+        print("Режим без окна: команды 'participant <номер>', 'mark', 'calibrate', 'stop'")
+
+    def wait_participant(self) -> str:
+        """Ожидание номера участника из stdin или управляющего сокета."""
+        print("Введите номер участника: ")
+        while True:
+            command, argument = self.commands.wait()
+            if command == "participant":
+                return argument
+            if command == "stop":
+                raise KeyboardInterrupt
+
+    def start_session(self, participant_number: str) -> None:
+        """Запись начала сеанса участника в логи."""
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+        self.logger.save_logs_to_file()
+        self.logger.participant = self.participant = participant_number
+        if self.feed is not None:
+            self.feed.publish("session", {"participant": participant_number})
+
+        gaze_log_entry = f"{timestamp}: Номер участника: {participant_number}"
+        self.logger.gaze_logs.append(gaze_log_entry)
+
+        behavior_log_entry = {
+            "timestamp": timestamp,
+            "data": {
+                "participant_number": participant_number,
+                "message": "Начало сеанса, номер участника записан"
+            }
+        }
+        self.logger.behavior_logs.append(behavior_log_entry)
+        self.logger.save_logs_to_file()
+        if CONFIG["session_recording"]:
+            self.start_recording(participant_number)
+
+    def start_recording(self, participant_number: str) -> None:
+        """Запись ориентиров лица и кадров глаз сеанса для повторного анализа без видео."""
+        self.stop_recording()
+        recordings_dir = Path(self.logger.logs_dir) / "recordings"
+        recordings_dir.mkdir(parents=True, exist_ok=True)
+        name = f"{participant_number}_{time.strftime('%Y%m%d_%H%M%S', time.localtime())}.gazerec"
+        self.gaze_tracker.gaze.recorder = SessionRecorder(str(recordings_dir / name),
+                                                          CONFIG["session_recording_chunk"])
+
+    def stop_recording(self) -> None:
+        recorder = getattr(self.gaze_tracker.gaze, "recorder", None)
+        if isinstance(recorder, SessionRecorder):
+            recorder.close()
+            self.gaze_tracker.gaze.recorder = None
+            self.logger.log_behavior({
+                "event_type": "session_recording",
+                "file": recorder.path,
+                "frames": recorder.frames,
+                "bytes": recorder.bytes_written
+            })
+
+    def mark_cheating(self) -> None:
+        """Ручная отметка попытки списывания."""
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+        self.logger.gaze_logs.append(f"{timestamp}: Отмечена попытка списывания (по нажатию X)")
+        data = {
+            "event_type": "manual_cheating_mark",
+            "message": "Пользователь отметил попытку списывания по нажатию X"
+        }
+        if self.gaze_tracker.evidence is not None:
+            data["evidence"] = self.gaze_tracker.evidence.trigger("manual_mark")
+        self.logger.behavior_logs.append({
+            "timestamp": timestamp,
+            "data": data
+        })
+        if self.feed is not None:
+            self.feed.publish("mark", {"participant": self.participant, **data})
+        if self.metrics is not None:
+            self.metrics.metrics["gaze_manual_marks_total"].inc(self.participant)
+        self.logger.save_logs_to_file()
+        print("Попытка списывания отмечена в логах")
+
+    def handle_commands(self) -> None:
+        """Обработка накопленных команд оператора."""
+        for command, argument in self.commands.drain():
+            if command == "confirm":
+                state = self.gaze_tracker.calibrator.state
+                if state == CenterCalibrator.SAMPLING:
+                    # Повторное нажатие во время калибровки не завершает сеанс
+                    continue
+                command = "calibrate" if state == CenterCalibrator.WAITING else "stop"
+            if command == "mark":
+                self.mark_cheating()
+            elif command == "calibrate":
+                self.gaze_tracker.calibrate()
+            elif command == "participant":
+                self.behavior_analyzer = BehaviorAnalyzer()
+                if self.controller is not None:
+                    self.behavior_analyzer.set_sample_interval(self.controller.sample_interval)
+                self.start_session(argument)
+            elif command == "stop":
+                raise KeyboardInterrupt
+
+    def next_sleep(self, processing_time: float) -> float:
+        """Пауза до следующего кадра с учетом адаптивного контроллера и режима ожидания."""
+        idle = self.gaze_tracker.idle
+        if idle is not None and idle.idle:
+            # Без лица кадры нужны только для редких проверок; контроллер не подстраивается под них
+            return max(idle.check_interval - processing_time, self.sleep_interval)
+        if self.controller is None:
+            return self.sleep_interval
+
+        sleep = self.controller.update(processing_time)
+        self.controller.apply(self.gaze_tracker.gaze)
+
+        interval = self.controller.sample_interval
+        if abs(interval - self.behavior_analyzer.sample_interval) > 0.2 * self.behavior_analyzer.sample_interval:
+            self.behavior_analyzer.set_sample_interval(interval)
+        return sleep
+
     def stop(self) -> None:
         """Остановка приложения."""
+        if isinstance(self.gaze_tracker.camera, FrameSource):
+            stats = self.gaze_tracker.camera.stats()
+            print(f"Источник кадров: {stats['average_fps']:.1f} к/с, ожидание кадра {stats['latency_ms']:.1f} мс")
         self.gaze_tracker.release_camera()
+        if self.gaze_tracker.idle is not None and self.gaze_tracker.idle.idle:
+            self.gaze_tracker.absent_intervals.append(self.gaze_tracker.idle.wake(time.time()))
+        if self.gaze_tracker.absent_intervals:
+            self.log_absences()
+        self.commands.close()
+        if self.gaze_tracker.evidence is not None:
+            self.gaze_tracker.evidence.close()
+        self.stop_recording()
+        if self.feed is not None:
+            self.feed.close()
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+        if self.gaze_tracker.motion_gate is not None or self.gaze_tracker.predictor is not None:
+            stats = {
+                "event_type": "session_stats",
+                "frames_total": self.gaze_tracker.frames_total,
+                "frames_reused": self.gaze_tracker.frames_reused,
+                "skip_rate": round(self.gaze_tracker.skip_rate, 3)
+            }
+            if self.gaze_tracker.predictor is not None:
+                stats["frames_predicted"] = self.gaze_tracker.frames_predicted
+            self.logger.log_behavior(stats)
+            print(f"Пропущено кадров (результат переиспользован): {self.gaze_tracker.skip_rate:.1%}")
         self.logger.save_logs_to_file()
+        self.logger.close()
         print("Общий лог активности успешно сохранен!")
         print("Лог подозрительной активности успешно сохранен!")
         print("Приложение остановлено.")
@@ -0,0 +1,186 @@
+"""Метрики конвейера в текстовом формате Prometheus через встроенный HTTP-сервер.
+
+Обновление счетчика или гистограммы в цикле обработки - это сложение и поиск
+корзины без блокировок; формирование текста выполняется только в потоке
+HTTP-сервера при запросе /metrics. Значения, которые уже считаются в других
+объектах (счетчики кадров, длина очередей), подключаются как функции и читаются
+в момент запроса.
+"""
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _escape(value) -> str:
+    """Значение метки по правилам текстового формата: экранируются обратная косая черта, кавычка и перевод строки."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Монотонный счетчик, при необходимости с метками."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self.values = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+                for labels, value in list(self.values.items())]
+
+
+class Gauge:
+    """Значение, читаемое функцией в момент запроса. Функция может вернуть словарь {метка: значение}."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, function: Callable, label: Optional[str] = None):
+        self.name = name
+        self.help_text = help_text
+        self.function = function
+        self.label = label
+
+    def samples(self) -> List[str]:
+        value = self.function()
+        if value is None:
+            return []
+        if self.label is None:
+            return [f"{self.name} {_number(value)}"]
+        return [f"{self.name}{_labels((self.label,), (key,))} {_number(item)}" for key, item in value.items()]
+
+
+class CallbackCounter(Gauge):
+    """Монотонный счетчик, который ведется в другом объекте и читается функцией в момент запроса."""
+
+    kind = "counter"
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами, при необходимости с одной меткой (например, этапом)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                 label: Optional[str] = None):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label = label
+        self.series = {}
+
+    def observe(self, value: float, label: str = "") -> None:
+        series = self.series.get(label)
+        if series is None:
+            series = self.series[label] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        names = (self.label,) if self.label else ()
+        for label, (counts, total, count) in list(self.series.items()):
+            values = (label,) if self.label else ()
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), list(counts)):
+                cumulative += bucket_count
+                bucket = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(names, values, bucket)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(names, values)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(names, values)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Набор метрик приложения."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, function: Callable, label: Optional[str] = None) -> Gauge:
+        return self._register(Gauge(name, help_text, function, label))
+
+    def callback_counter(self, name: str, help_text: str, function: Callable,
+                         label: Optional[str] = None) -> CallbackCounter:
+        return self._register(CallbackCounter(name, help_text, function, label))
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                  label: Optional[str] = None) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets, label))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """HTTP-сервер /metrics в фоновом потоке."""
+
+    def __init__(self, registry: MetricsRegistry, address: str = "127.0.0.1:9100"):
+        self.registry = registry
+        host, _, port = address.rpartition(":")
+        self.address = (host or "127.0.0.1", int(port))
+        self._server = None
+
+    @property
+    def server_address(self) -> Tuple[str, int]:
+        return self._server.server_address
+
+    def start(self) -> None:
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(self.address, Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,369 @@
+"""Воспроизведение записанных логов взгляда и подбор параметров BehaviorAnalyzer.
+
+Логика BehaviorAnalyzer выполняется по кадрам лога одновременно для всей сетки
+параметров (состояние каждой конфигурации хранится в массивах NumPy), а сеансы
+распределяются по процессам. Оценка совпадает с ParserLogs: ручная отметка X
+считается замеченной, если в течение 10 секунд после нее было срабатывание.
+
+    python replay.py logs/gaze_log.txt --max-suspicious 1,2,3 --analysis-window 3,5,10 \\
+        --offcenter-threshold 0.5,0.7,0.9 --min-consecutive 10,20,30 --workers 4
+
+Записи сеансов (CONFIG["session_recording"]) содержат ориентиры лица и кадры глаз;
+по ним заново выполняются поиск зрачков, калибровка и BehaviorAnalyzer без видео
+и без моделей dlib:
+
+    python replay.py --recording logs/recordings/12_20240101_100000.gazerec
+
+Видеозаписи анализируются через кэш результатов этапов (result_cache.py): при
+повторном запуске с другими параметрами BehaviorAnalyzer кадры не анализируются заново.
+
+    python replay.py --video lecture.avi --cache logs/cache/results.sqlite
+"""
+import argparse
+import csv
+import itertools
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from gaze_tracking import LANDMARKS_MODEL, GazeTracking, direction, read_recording
+from main import CONFIG, BehaviorAnalyzer, GazeTracker
+from result_cache import ResultCache, analyze_video_batch
+
+PARAMETERS = ("max_suspicious_actions", "analysis_window", "offcenter_threshold", "min_consecutive_offcenter")
+MATCH_WINDOW = 10
+LINE = re.compile(r"(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d): (.*)")
+
+
+@dataclass
+class ReplaySession:
+    """Кадры одного сеанса участника: время в секундах и признаки направления взгляда."""
+    participant: Optional[str]
+    times: np.ndarray
+    offcenter: np.ndarray
+    center: np.ndarray
+    reused: np.ndarray
+    marks: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+
+def _to_seconds(timestamps: List[str]) -> np.ndarray:
+    return np.array(timestamps, dtype="datetime64[s]").astype(np.int64)
+
+
+def _build_session(participant: Optional[str], samples: List[tuple], marks: List[str]) -> ReplaySession:
+    timestamps = [timestamp for timestamp, _, _ in samples]
+    codes = np.array([code for _, code, _ in samples], dtype=np.uint8)
+    return ReplaySession(
+        participant=participant,
+        times=_to_seconds(timestamps),
+        offcenter=(codes & direction.OFFCENTER) != 0,
+        center=codes == direction.CENTER,
+        reused=np.array([reused for _, _, reused in samples], dtype=bool),
+        marks=np.sort(_to_seconds(marks))
+    )
+
+
+def parse_gaze_log(lines: Iterable[str]) -> List[ReplaySession]:
+    """Разбор строк gaze_log.txt на сеансы по строкам с номером участника."""
+    sessions = []
+    participant, samples, marks = None, [], []
+    for line in lines:
+        match = LINE.match(line.rstrip("\n"))
+        if match is None:
+            continue
+        timestamp, text = match.groups()
+
+        if text.startswith("Номер участника:"):
+            if samples or marks:
+                sessions.append(_build_session(participant, samples, marks))
+            participant, samples, marks = text.split(":", 1)[1].strip(), [], []
+        elif text.startswith("Отмечена попытка списывания"):
+            marks.append(timestamp)
+        else:
+            reused = text.endswith(" [reused]")
+            name = text[:-len(" [reused]")] if reused else text
+            if name in direction.NAMES:
+                samples.append((timestamp, direction.from_name(name), reused))
+
+    if samples or marks:
+        sessions.append(_build_session(participant, samples, marks))
+    return sessions
+
+
+def load_gaze_log(path: str) -> List[ReplaySession]:
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_gaze_log(f)
+
+
+def parameter_grid(**values: Iterable) -> Dict[str, np.ndarray]:
+    """Все сочетания значений параметров в виде массивов одинаковой длины."""
+    unknown = set(values) - set(PARAMETERS)
+    if unknown:
+        raise ValueError(f"Неизвестные параметры: {sorted(unknown)}")
+    names = list(values)
+    combinations = list(itertools.product(*(values[name] for name in names)))
+    return {name: np.array([combination[index] for combination in combinations])
+            for index, name in enumerate(names)}
+
+
+def _grid_size(grid: Dict[str, np.ndarray]) -> int:
+    return len(next(iter(grid.values()))) if grid else 1
+
+
+def replay_session(session: ReplaySession, grid: Dict[str, np.ndarray],
+                   sample_interval: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """Повтор логики BehaviorAnalyzer и MainApp.step для каждой конфигурации сетки.
+
+    Возвращает число срабатываний и число замеченных ручных отметок по конфигурациям.
+    """
+    sample_interval = CONFIG["sleep_interval"] if sample_interval is None else sample_interval
+    size = _grid_size(grid)
+
+    def parameter(name, default):
+        return np.broadcast_to(np.asarray(grid.get(name, default)), (size,))
+
+    max_suspicious = parameter("max_suspicious_actions", CONFIG["max_suspicious_actions"]).astype(np.int64)
+    threshold = parameter("offcenter_threshold", 0.7).astype(np.float64)
+    analysis_window = parameter("analysis_window", CONFIG["analysis_window"]).astype(np.float64)
+    window = np.maximum((analysis_window / sample_interval).astype(np.int64), 1)
+    min_consecutive = parameter("min_consecutive_offcenter", int(2.0 / sample_interval)).astype(np.int64)
+    # history[-window // 2:] оставляет ceil(window / 2) кадров, как OffcenterRatioRule
+    half = -(-window // 2)
+
+    count = len(session)
+    offcenter_prefix = np.concatenate(([0], np.cumsum(session.offcenter, dtype=np.int64)))
+    # Отметки, для которых кадр попадает в интервал [отметка, отметка + MATCH_WINDOW]
+    marks_low = np.searchsorted(session.marks, session.times - MATCH_WINDOW, side="left")
+    marks_high = np.searchsorted(session.marks, session.times, side="right")
+
+    suspicious = np.zeros(size, np.int64)
+    consecutive = np.zeros(size, np.int64)
+    history_start = np.zeros(size, np.int64)
+    detections = np.zeros(size, np.int64)
+    marks_hit = np.zeros((size, len(session.marks)), bool)
+
+    for index in range(count):
+        end = index + 1
+        np.maximum(history_start, end - window, out=history_start)
+
+        consecutive += 1 if session.offcenter[index] else -1
+        fired = consecutive >= min_consecutive
+        suspicious += fired
+        consecutive[fired] = 0
+
+        history_length = end - history_start
+        offcenter_count = offcenter_prefix[end] - offcenter_prefix[history_start]
+        fired = (history_length >= window) & (offcenter_count / window > threshold)
+        suspicious += fired
+        history_start[fired] = end - half[fired]
+
+        if session.center[index]:
+            suspicious -= suspicious > 0
+
+        detected = suspicious >= max_suspicious
+        if detected.any():
+            suspicious[detected] = 0
+            detections += detected
+            if marks_high[index] > marks_low[index]:
+                marks_hit[detected, marks_low[index]:marks_high[index]] = True
+
+    return {
+        "detections": detections,
+        "detected_marks": marks_hit.sum(axis=1),
+        "manual_marks": np.full(size, len(session.marks), np.int64)
+    }
+
+
+def _chunks(grid: Dict[str, np.ndarray], chunk_size: int) -> List[Dict[str, np.ndarray]]:
+    size = _grid_size(grid)
+    return [{name: values[start:start + chunk_size] for name, values in grid.items()}
+            for start in range(0, size, chunk_size)]
+
+
+def sweep(sessions: List[ReplaySession], grid: Dict[str, np.ndarray], sample_interval: Optional[float] = None,
+          workers: int = 1, chunk_size: int = 4096) -> Dict[str, np.ndarray]:
+    """Итоговая статистика (как ParserLogs.calculate_total_stats) для каждой конфигурации сетки.
+
+    Сеансы без номера участника не учитываются, как и в ParserLogs.
+    """
+    sessions = [session for session in sessions if session.participant is not None and len(session)]
+    chunks = _chunks(grid, chunk_size)
+    tasks = [(session, chunk, sample_interval) for chunk in chunks for session in sessions]
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(replay_session, *zip(*tasks)))
+    else:
+        results = [replay_session(*task) for task in tasks]
+
+    size = _grid_size(grid)
+    totals = {name: np.zeros(size, np.int64) for name in ("detections", "detected_marks", "manual_marks")}
+    offsets = {id(chunk): start for chunk, start in zip(chunks, range(0, size, chunk_size))}
+    for (_, chunk, _), result in zip(tasks, results):
+        start = offsets[id(chunk)]
+        for name, values in result.items():
+            totals[name][start:start + len(values)] += values
+
+    return {
+        "total_detected_attempts": totals["detections"],
+        "total_manual_marks": totals["manual_marks"],
+        "total_real_attempts": totals["detected_marks"],
+        "total_false_positives": totals["detections"] - totals["detected_marks"]
+    }
+
+
+def _models_not_needed(*args):
+    raise RuntimeError("Записанный кадр не требует детектора лица и модели ориентиров")
+
+
+def replay_recording(path: str, analyzer: Optional[BehaviorAnalyzer] = None,
+                     gaze_tracker: Optional[GazeTracker] = None) -> Dict[str, object]:
+    """Повторный анализ записи сеанса: поиск зрачков, калибровка центра и BehaviorAnalyzer
+    по записанным ориентирам и кадрам глаз. Калибровка центра выполняется по первым кадрам
+    записи, если у gaze_tracker ее еще нет."""
+    if gaze_tracker is None:
+        gaze_tracker = GazeTracker(debug=False, gaze=GazeTracking(_models_not_needed, _models_not_needed))
+    analyzer = BehaviorAnalyzer() if analyzer is None else analyzer
+    if not gaze_tracker.calibrated:
+        gaze_tracker.calibrate()
+
+    codes = []
+    times = []
+    for record in read_recording(path):
+        gaze_tracker.gaze.refresh_recorded(record)
+        if gaze_tracker.calibrator.sampling:
+            gaze_tracker.update_calibration()
+        codes.append(gaze_tracker.get_gaze_direction()["code"])
+        times.append(record.timestamp)
+    codes = np.array(codes, dtype=np.uint8)
+    return {"frames": len(codes), "codes": codes, "detections": _detections(codes, times, analyzer)}
+
+
+def _detections(codes: np.ndarray, times: Iterable, analyzer: BehaviorAnalyzer) -> List[tuple]:
+    detections = []
+    for code, timestamp in zip(codes, times):
+        if code == direction.NOT_CALIBRATED:
+            continue
+        analyzer.analyze_gaze_pattern(int(code))
+        if analyzer.detect_cheating():
+            detections.append((timestamp, analyzer.generate_report()))
+    return detections
+
+
+def stage_configs_from_config(gaze: GazeTracking, cache: ResultCache,
+                              model_path: str = LANDMARKS_MODEL) -> Dict[str, Dict]:
+    """Конфигурации этапов для ключей кэша результатов. version меняется вместе с кодом этапа,
+    модель ориентиров определяется хэшем ее файла."""
+    return {
+        "faces": {"version": 2, "face_detector": CONFIG["face_detector"],
+                  "options": CONFIG["face_detector_options"], "detection_scale": gaze.detection_scale},
+        "landmarks": {"version": 1, "model": cache.file_digest(model_path)},
+        "pupils": {"version": 1}
+    }
+
+
+def replay_video(path: str, cache: ResultCache, analyzer: Optional[BehaviorAnalyzer] = None,
+                 gaze_tracker: Optional[GazeTracker] = None) -> Dict[str, object]:
+    """Повторный анализ видеозаписи с кэшированием результатов этапов GazeTracking.
+    Центр калибруется по первым кадрам, затем направления передаются в BehaviorAnalyzer;
+    время срабатывания - номер кадра."""
+    gaze_tracker = GazeTracker(debug=False) if gaze_tracker is None else gaze_tracker
+    analyzer = BehaviorAnalyzer() if analyzer is None else analyzer
+    batch = analyze_video_batch(path, cache, gaze_tracker.gaze, stage_configs_from_config(gaze_tracker.gaze, cache))
+
+    calibrated_from = 0
+    if not gaze_tracker.calibrated:
+        gaze_tracker.calibrate()
+        calibrated_from = len(batch.face_found)
+        for index, (horizontal, vertical, blinking) in enumerate(zip(
+                batch.horizontal_ratio, batch.vertical_ratio, batch.blinking_ratio)):
+            located = not np.isnan(horizontal)
+            center = gaze_tracker.calibrator.update(horizontal if located else None,
+                                                    vertical if located else None, located and blinking > 3.8)
+            if center is not None:
+                gaze_tracker.horizontal_center, gaze_tracker.vertical_center = center
+                gaze_tracker.calibrated = True
+                calibrated_from = index + 1
+                break
+
+    codes = gaze_tracker.classify_directions(batch.horizontal_ratio, batch.vertical_ratio, batch.face_found)
+    codes[:calibrated_from] = direction.NOT_CALIBRATED
+    frames = np.arange(len(codes))
+    return {"frames": len(codes), "codes": codes, "detections": _detections(codes, frames, analyzer)}
+
+
+def _values(text: str, kind: type) -> List:
+    return [kind(value) for value in text.split(",")]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Подбор параметров BehaviorAnalyzer по записанным логам взгляда")
+    parser.add_argument("logs", nargs="*", help="файлы gaze_log.txt")
+    parser.add_argument("--recording", action="append", default=[],
+                        help="запись сеанса .gazerec для повторного анализа без видео")
+    parser.add_argument("--video", action="append", default=[], help="видеозапись для анализа через кэш")
+    parser.add_argument("--cache", default=CONFIG["result_cache"], help="файл кэша результатов SQLite")
+    parser.add_argument("--cache-max-mb", type=float, default=CONFIG["result_cache_max_mb"])
+    parser.add_argument("--max-suspicious", type=lambda text: _values(text, int), default=[1, 2, 3])
+    parser.add_argument("--analysis-window", type=lambda text: _values(text, float), default=[3.0, 5.0, 10.0])
+    parser.add_argument("--offcenter-threshold", type=lambda text: _values(text, float), default=[0.5, 0.7, 0.9])
+    parser.add_argument("--min-consecutive", type=lambda text: _values(text, int), default=[10, 20, 30])
+    parser.add_argument("--sample-interval", type=float, default=CONFIG["sleep_interval"])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", help="CSV со статистикой всех конфигураций")
+    args = parser.parse_args(argv)
+    if not args.logs and not args.recording and not args.video:
+        parser.error("нужен хотя бы один лог, --recording или --video")
+
+    cache = ResultCache(args.cache, int(args.cache_max_mb * 2 ** 20),
+                        CONFIG["result_cache_max_entries"]) if args.video else None
+    runs = [(path, replay_recording) for path in args.recording] + \
+        [(path, lambda path: replay_video(path, cache)) for path in args.video]
+    for path, run in runs:
+        start = time.perf_counter()
+        result = run(path)
+        names = direction.to_names(result["codes"])
+        counts = {name: names.count(name) for name in sorted(set(names))}
+        print(f"{path}: кадров {result['frames']}, срабатываний {len(result['detections'])},"
+              f" время {time.perf_counter() - start:.1f} с, направления {counts}")
+    if cache is not None:
+        print(cache.report())
+        cache.close()
+    if not args.logs:
+        return
+
+    start = time.perf_counter()
+    sessions = [session for path in args.logs for session in load_gaze_log(path)]
+    grid = parameter_grid(max_suspicious_actions=args.max_suspicious, analysis_window=args.analysis_window,
+                          offcenter_threshold=args.offcenter_threshold,
+                          min_consecutive_offcenter=args.min_consecutive)
+    totals = sweep(sessions, grid, args.sample_interval, args.workers)
+    elapsed = time.perf_counter() - start
+
+    samples = sum(len(session) for session in sessions)
+    size = _grid_size(grid)
+    print(f"Сеансов: {len(sessions)}, кадров: {samples}, конфигураций: {size}, время: {elapsed:.1f} с")
+
+    score = totals["total_real_attempts"] - totals["total_false_positives"]
+    for index in np.argsort(-score, kind="stable")[:args.top]:
+        parameters = ", ".join(f"{name}={grid[name][index]}" for name in grid)
+        print(f"{parameters}: замечено {totals['total_real_attempts'][index]}"
+              f" из {totals['total_manual_marks'][index]}, ложных {totals['total_false_positives'][index]}")
+
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(list(grid) + list(totals))
+            for index in range(size):
+                writer.writerow([grid[name][index] for name in grid] + [totals[name][index] for name in totals])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""Кэш результатов этапов GazeTracking для повторного анализа видеозаписей.
+
+Результат этапа кадра хранится по ключу (хэш содержимого видеофайла, номер кадра,
+этап, хэш конфигурации этапа). Хэш этапа включает хэш предыдущего этапа, поэтому
+изменение детектора лица пересчитывает и ориентиры, и зрачки, а изменение только
+параметров BehaviorAnalyzer не пересчитывает ничего. Этапы:
+
+    faces      прямоугольники лиц (int32, N x 4: left, top, right, bottom)
+    landmarks  68 ориентиров первого лица (int16, 68 x 2; 0 x 2 - лица нет)
+    pupils     строки глаз GazeTracking.eye_rows (float64, 2 x 7; 0 x 7 - лица нет)
+
+Индекс и данные лежат в одной базе SQLite. Размер кэша ограничен max_bytes
+и max_entries: при превышении удаляются записи, которые дольше всего не читались.
+
+    python result_cache.py logs/cache/results.sqlite
+    python result_cache.py logs/cache/results.sqlite --clear
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import dlib
+import numpy as np
+from gaze_tracking import GazeBatch, GazeTracking, batch_from_rows, landmarks_to_detection
+from gaze_tracking.eye import Eye
+from gaze_tracking.face_detector import detect_scaled
+
+STAGES = ("faces", "landmarks", "pupils")
+_EMPTY = {"faces": np.zeros((0, 4), np.int32), "landmarks": np.zeros((0, 2), np.int16),
+          "pupils": np.zeros((0, 7), np.float64)}
+_MISSING = np.full((2, 7), np.nan)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    file TEXT NOT NULL,
+    frame INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    config TEXT NOT NULL,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    used INTEGER NOT NULL,
+    PRIMARY KEY (file, frame, stage, config)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+"""
+
+
+def config_digest(config: Dict, parent: str = "") -> str:
+    """Хэш конфигурации этапа вместе с хэшем предыдущего этапа."""
+    text = parent + json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def stage_digests(configs: Dict[str, Dict]) -> Dict[str, str]:
+    """Хэши всех этапов по их конфигурациям; отсутствующая конфигурация считается пустой."""
+    digests = {}
+    parent = ""
+    for stage in STAGES:
+        parent = digests[stage] = config_digest(configs.get(stage, {}), parent)
+    return digests
+
+
+def _encode(array: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def _decode(data: bytes) -> np.ndarray:
+    return np.load(io.BytesIO(data), allow_pickle=False)
+
+
+class ResultCache:
+    """Постоянный кэш результатов этапов по кадрам с вытеснением давно не читавшихся записей."""
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024, max_entries: Optional[int] = None,
+                 commit_interval: int = 500):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.commit_interval = commit_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self.entries, self.bytes, last_used = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(MAX(used), 0) FROM results").fetchone()
+        # Счетчик обращений вместо времени: порядок LRU не зависит от часов
+        self._clock = last_used
+        self._pending = 0
+        self.hits = {stage: 0 for stage in STAGES}
+        self.misses = {stage: 0 for stage in STAGES}
+        self.stores = 0
+        self.evictions = 0
+
+    def file_digest(self, path: str) -> str:
+        """Хэш содержимого файла; повторно считается только при изменении размера или времени файла."""
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        with self._lock:
+            row = self._db.execute("SELECT size, mtime_ns, digest FROM files WHERE path = ?", (key,)).fetchone()
+        if row is not None and row[:2] == (stat.st_size, stat.st_mtime_ns):
+            return row[2]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        digest = digest.hexdigest()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                             (key, stat.st_size, stat.st_mtime_ns, digest))
+            self._db.commit()
+        return digest
+
+    def get(self, file: str, frame: int, stage: str, config: str) -> Optional[np.ndarray]:
+        """Результат этапа или None, если его нет в кэше."""
+        key = (file, frame, stage, config)
+        with self._lock:
+            row = self._db.execute("SELECT data FROM results WHERE file = ? AND frame = ? AND stage = ? "
+                                   "AND config = ?", key).fetchone()
+            if row is None:
+                self.misses[stage] += 1
+                return None
+            self.hits[stage] += 1
+            self._clock += 1
+            self._db.execute("UPDATE results SET used = ? WHERE file = ? AND frame = ? AND stage = ? "
+                             "AND config = ?", (self._clock,) + key)
+            self._written()
+        return _decode(row[0])
+
+    def put(self, file: str, frame: int, stage: str, config: str, value: np.ndarray) -> None:
+        data = _encode(value)
+        key = (file, frame, stage, config)
+        with self._lock:
+            previous = self._db.execute("SELECT size FROM results WHERE file = ? AND frame = ? AND stage = ? "
+                                        "AND config = ?", key).fetchone()
+            if previous is not None:
+                self.entries -= 1
+                self.bytes -= previous[0]
+            self._clock += 1
+            self._db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             key + (data, len(data), self._clock))
+            self.entries += 1
+            self.bytes += len(data)
+            self.stores += 1
+            self._evict()
+            self._written()
+
+    def _written(self) -> None:
+        self._pending += 1
+        if self._pending >= self.commit_interval:
+            self._db.commit()
+            self._pending = 0
+
+    def _evict(self) -> None:
+        while self.bytes > self.max_bytes or (self.max_entries is not None and self.entries > self.max_entries):
+            # Удаление пачкой: одна выборка по индексу used на несколько записей
+            excess = self.entries - self.max_entries if self.max_entries is not None else 0
+            rows = self._db.execute("SELECT file, frame, stage, config, size FROM results ORDER BY used LIMIT ?",
+                                    (max(excess, 16),)).fetchall()
+            if not rows:
+                break
+            removed = []
+            for *key, size in rows:
+                if self.bytes <= self.max_bytes and (self.max_entries is None or self.entries <= self.max_entries):
+                    break
+                removed.append(key)
+                self.entries -= 1
+                self.bytes -= size
+            self._db.executemany("DELETE FROM results WHERE file = ? AND frame = ? AND stage = ? AND config = ?",
+                                 removed)
+            self.evictions += len(removed)
+
+    def stats(self) -> Dict[str, object]:
+        """Статистика кэша: обращения текущего запуска и содержимое по этапам."""
+        with self._lock:
+            stages = {stage: {"entries": count, "bytes": size} for stage, count, size in self._db.execute(
+                "SELECT stage, COUNT(*), SUM(size) FROM results GROUP BY stage")}
+        hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        return {
+            "entries": self.entries,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "stages": {stage: dict(stages.get(stage, {"entries": 0, "bytes": 0}), hits=self.hits[stage],
+                                   misses=self.misses[stage]) for stage in STAGES}
+        }
+
+    def report(self) -> str:
+        stats = self.stats()
+        lines = [f"Кэш: {stats['entries']} записей, {stats['bytes'] / 2 ** 20:.1f} из "
+                 f"{stats['max_bytes'] / 2 ** 20:.0f} МБ; попаданий {stats['hits']}, промахов {stats['misses']} "
+                 f"({stats['hit_rate']:.1%}), вытеснено {stats['evictions']}"]
+        for stage, values in stats["stages"].items():
+            lines.append(f"  {stage}: {values['entries']} записей, {values['bytes'] / 1024:.0f} КБ, "
+                         f"попаданий {values['hits']}, промахов {values['misses']}")
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM results")
+            self._db.commit()
+            self.entries = self.bytes = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+
+def _rect(face: np.ndarray) -> dlib.rectangle:
+    return dlib.rectangle(*(int(value) for value in face))
+
+
+def analyze_video(path: str, cache: ResultCache, gaze: GazeTracking,
+                  configs: Dict[str, Dict]) -> Iterator[Tuple[int, bool, np.ndarray]]:
+    """Покадровый анализ видеофайла через кэш: (номер кадра, найдено ли лицо, строки глаз 2 x 7).
+
+    Этапы проверяются с последнего: если в кэше есть зрачки, кадр не декодируется,
+    если есть ориентиры - не запускаются детектор лица и модель ориентиров.
+    Порог зрачка (gaze.calibration) настраивается только на пересчитываемых кадрах,
+    поэтому кэш рассчитан на повторный анализ целых записей.
+    """
+    file = cache.file_digest(path)
+    digests = stage_digests(configs)
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Не удалось открыть видеофайл: {path}")
+    try:
+        index = -1
+        while capture.grab():
+            index += 1
+            pupils = cache.get(file, index, "pupils", digests["pupils"])
+            if pupils is None:
+                _, frame = capture.retrieve()
+                pupils = _analyze_frame(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), file, index, cache, gaze,
+                                        digests)
+            found = len(pupils) > 0
+            yield index, found, pupils if found else _MISSING
+    finally:
+        capture.release()
+
+
+def _analyze_frame(frame: np.ndarray, file: str, index: int, cache: ResultCache, gaze: GazeTracking,
+                   digests: Dict[str, str]) -> np.ndarray:
+    landmarks = cache.get(file, index, "landmarks", digests["landmarks"])
+    if landmarks is None:
+        faces = cache.get(file, index, "faces", digests["faces"])
+        if faces is None:
+            # Детектор запускается на каждом кадре без повторного использования рамки (redetect_interval),
+            # чтобы запись зависела только от кадра и конфигурации
+            faces = np.array([(face.left(), face.top(), face.right(), face.bottom())
+                              for face in detect_scaled(gaze._face_detector, frame, gaze.detection_scale)],
+                             np.int32).reshape(-1, 4)
+            cache.put(file, index, "faces", digests["faces"], faces)
+        gaze.face = _rect(faces[0]) if len(faces) else None
+        if gaze.face is None:
+            landmarks = _EMPTY["landmarks"]
+        else:
+            detection = gaze._predictor(frame, gaze.face)
+            landmarks = np.array([(point.x, point.y) for point in detection.parts()], np.int16)
+        cache.put(file, index, "landmarks", digests["landmarks"], landmarks)
+
+    if len(landmarks) == 0:
+        gaze.face = gaze.eye_left = gaze.eye_right = None
+        pupils = _EMPTY["pupils"]
+    else:
+        detection = landmarks_to_detection(landmarks)
+        gaze.face = detection.rect
+        gaze.eye_left = Eye(frame, detection, 0, gaze.calibration)
+        gaze.eye_right = Eye(frame, detection, 1, gaze.calibration)
+        pupils = np.array(gaze.eye_rows(), np.float64)
+    cache.put(file, index, "pupils", digests["pupils"], pupils)
+    return pupils
+
+
+def analyze_video_batch(path: str, cache: ResultCache, gaze: GazeTracking, configs: Dict[str, Dict]) -> GazeBatch:
+    """Результат analyze_video для всего файла в виде GazeBatch."""
+    face_found, rows = [], []
+    for _, found, pupils in analyze_video(path, cache, gaze, configs):
+        face_found.append(found)
+        rows.append(pupils)
+    return batch_from_rows(face_found, rows)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Статистика и очистка кэша результатов анализа")
+    parser.add_argument("cache", help="файл кэша SQLite")
+    parser.add_argument("--clear", action="store_true")
+    args = parser.parse_args(argv)
+
+    cache = ResultCache(args.cache)
+    if args.clear:
+        cache.clear()
+    print(cache.report())
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from gaze_tracking import GazeTracking, load_models
+from frame_sources import open_frame_source
+from main import CONFIG, DataLogger, GazeTracker, MainApp, face_detector_from_config, frame_source_from_config
+
+
+class LockedModel:
+    """Модель, общая для рабочих потоков: вызовы выполняются по одному под блокировкой.
+
+    Поиск лица и ориентиров всех камер поэтому идет на одном ядре: рабочие потоки
+    параллельно выполняют только захват, анализ зрачков в OpenCV и запись логов.
+    Рост пропускной способности с числом потоков показывает benchmark().
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._lock = threading.Lock()
+
+    def __call__(self, *args):
+        with self._lock:
+            return self.model(*args)
+
+
+def shared_models():
+    """Детектор лица из конфигурации и модель ориентиров для всех камер процесса.
+
+    Модели dlib не документированы как потокобезопасные, поэтому у каждой модели своя
+    блокировка: пока один поток ищет лицо, другой может вычислять ориентиры.
+    """
+    return LockedModel(face_detector_from_config()), LockedModel(load_models()[1])
+
+
+class CameraSession:
+    """Одна камера под управлением супервизора: захват, трекер, анализатор и логгер."""
+
+    def __init__(self, name: str, source, logs_dir: str, models=None):
+        self.name = name
+        self.source = int(source) if str(source).isdigit() else source
+        models = shared_models() if models is None else models
+        tracker = GazeTracker(debug=False, gaze=GazeTracking(*models, parallel_eyes=CONFIG["parallel_eyes"]))
+        tracker.camera = self
+        self.app = MainApp(gaze_tracker=tracker, logger=DataLogger(logs_dir))
+        self.capture = None
+        self.busy = False
+        self.last_served = 0.0
+        self.next_due = 0.0
+
+        self.frames_captured = 0
+        self.frames_processed = 0
+        # Кадры, замененные более свежими до обработки: счетчик не сбрасывается отчетами
+        self.frames_dropped = 0
+        self._dropped_reported = 0
+        self.total_lag = 0.0
+        self.finished = False
+        self._latest = None
+        self._current = None
+        self._processed_seq = 0
+        self._running = threading.Event()
+        self._thread = None
+
+    def open(self) -> None:
+        """Открытие камеры, запуск потока захвата и неинтерактивной калибровки."""
+        self.capture = frame_source_from_config(self.source)
+        self.app.gaze_tracker.calibrate()
+        self._running.set()
+        self._thread = threading.Thread(target=self._capture_loop, name=f"capture-{self.name}", daemon=True)
+        self._thread.start()
+
+    def _capture_loop(self) -> None:
+        seq = 0
+        while self._running.is_set():
+            ok, frame = self.capture.read()
+            if not ok:
+                # Видеофайл закончился или камера отключена: последний кадр еще может быть обработан
+                self.finished = True
+                return
+            seq += 1
+            self.frames_captured += 1
+            latest = self._latest
+            if latest is not None and latest[2] > self._processed_seq:
+                self.frames_dropped += 1
+            self._latest = (frame, time.perf_counter(), seq)
+
+    def has_new_frame(self) -> bool:
+        latest = self._latest
+        return latest is not None and latest[2] > self._processed_seq
+
+    def read(self):
+        """Последний захваченный кадр: интерфейс cv2.VideoCapture для GazeTracker."""
+        frame, timestamp, seq = self._latest
+        self._current = (timestamp, seq)
+        return True, frame
+
+    def release(self) -> None:
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+    def step(self) -> None:
+        """Обработка последнего кадра камеры в рабочем потоке."""
+        self.app.step()
+        timestamp, seq = self._current
+        self._processed_seq = seq
+        self.frames_processed += 1
+        self.total_lag += time.perf_counter() - timestamp
+
+    def stats(self, elapsed: float) -> Dict[str, float]:
+        """Статистика камеры за прошедший интервал, счетчики интервала обнуляются."""
+        dropped = self.frames_dropped
+        stats = {
+            "capture_fps": self.frames_captured / elapsed,
+            "processed_fps": self.frames_processed / elapsed,
+            "dropped": dropped - self._dropped_reported,
+            "lag_ms": 1000 * self.total_lag / self.frames_processed if self.frames_processed else 0.0
+        }
+        self._dropped_reported = dropped
+        self.frames_captured = self.frames_processed = 0
+        self.total_lag = 0.0
+        return stats
+
+
+class Supervisor:
+    """Обработка нескольких камер в одном процессе с общими моделями и пулом потоков.
+
+    Модели вызываются под блокировкой (см. LockedModel), поэтому число камер, которые
+    успевает обработать процесс, ограничено одним ядром на поиске лица. Если отчет
+    показывает перегрузку, камеры делятся между несколькими запусками супервизора.
+    """
+
+    def __init__(self, sources: Dict[str, str], workers: Optional[int] = None,
+                 logs_dir: Optional[str] = None, report_interval: float = 5.0):
+        logs_dir = CONFIG["logs_dir"] if logs_dir is None else logs_dir
+        models = shared_models()
+        self.sessions: List[CameraSession] = [
+            CameraSession(name, source, str(Path(logs_dir) / name), models) for name, source in sources.items()
+        ]
+        self.workers = workers or min(len(self.sessions), os.cpu_count() or 1)
+        self.sample_interval = CONFIG["sleep_interval"]
+        self.report_interval = report_interval
+        self._free_workers = threading.Semaphore(self.workers)
+        self._running = False
+
+    def next_session(self, now: float) -> Optional[CameraSession]:
+        """Выбор камеры для обработки: дольше всех ожидающая среди готовых."""
+        ready = [session for session in self.sessions
+                 if not session.busy and now >= session.next_due and session.has_new_frame()]
+        return min(ready, key=lambda session: session.last_served) if ready else None
+
+    def finished(self) -> bool:
+        """Все источники закончились, и их последние кадры обработаны."""
+        return all(session.finished and not session.busy and not session.has_new_frame()
+                   for session in self.sessions)
+
+    def _process(self, session: CameraSession) -> None:
+        try:
+            session.step()
+        except Exception as error:
+            print(f"[{session.name}] Ошибка обработки кадра: {error}")
+        finally:
+            session.busy = False
+            self._free_workers.release()
+
+    def report(self, elapsed: float) -> Dict[str, Dict[str, float]]:
+        """Частота кадров и задержка по каждой камере."""
+        return {session.name: session.stats(elapsed) for session in self.sessions}
+
+    def print_report(self, report: Dict[str, Dict[str, float]]) -> None:
+        target_fps = 1.0 / self.sample_interval
+        for name, stats in report.items():
+            overloaded = stats["processed_fps"] < 0.9 * min(target_fps, stats["capture_fps"])
+            print(f"[{name}] захват {stats['capture_fps']:.1f} к/с, обработка {stats['processed_fps']:.1f} к/с, "
+                  f"пропущено {stats['dropped']}, задержка {stats['lag_ms']:.0f} мс"
+                  + (" — ПЕРЕГРУЗКА" if overloaded else ""))
+
+    def run(self, duration: Optional[float] = None) -> None:
+        """Запуск обработки всех камер до остановки, окончания всех источников или истечения duration секунд."""
+        for session in self.sessions:
+            session.app.start_session(session.name)
+            session.open()
+
+        self._running = True
+        started = last_report = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(self.workers, thread_name_prefix="gaze-worker") as executor:
+                while self._running:
+                    now = time.perf_counter()
+                    if duration is not None and now - started >= duration or self.finished():
+                        break
+                    if now - last_report >= self.report_interval:
+                        self.print_report(self.report(now - last_report))
+                        last_report = now
+
+                    if not self._free_workers.acquire(timeout=0.1):
+                        continue
+                    session = self.next_session(time.perf_counter())
+                    if session is None:
+                        self._free_workers.release()
+                        time.sleep(0.002)
+                        continue
+                    session.busy = True
+                    session.last_served = session.next_due = time.perf_counter()
+                    session.next_due += self.sample_interval
+                    executor.submit(self._process, session)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        self._running = False
+        for session in self.sessions:
+            session.release()
+            # Закрытие логов, доказательств и записи сеанса, итоговая статистика
+            session.app.stop()
+        print("Супервизор остановлен, логи сохранены.")
+
+
+def benchmark(models, frames: List, workers: List[int]) -> Dict[int, float]:
+    """Кадров в секунду при анализе frames в каждом из workers потоков с общими моделями.
+
+    Если пропускная способность почти не растет с числом потоков, узкое место -
+    модели под блокировкой, и камеры нужно распределить между процессами.
+    """
+    results = {}
+    for count in workers:
+        trackers = [GazeTracking(*models) for _ in range(count)]
+
+        def analyze(gaze):
+            for frame in frames:
+                gaze.refresh(frame)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(count, thread_name_prefix="gaze-benchmark") as executor:
+            list(executor.map(analyze, trackers))
+        results[count] = count * len(frames) / (time.perf_counter() - start)
+    return results
+
+
+def parse_sources(specs: List[str]) -> Dict[str, str]:
+    """Разбор описаний камер вида 'имя=источник' (индекс камеры, файл или URL)."""
+    sources = {}
+    for index, spec in enumerate(specs):
+        name, separator, source = spec.partition("=")
+        if not separator:
+            name, source = f"camera{index}", spec
+        sources[name] = source
+    return sources
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Обработка нескольких камер в одном процессе")
+    parser.add_argument("sources", nargs="*", help="камеры в виде 'имя=источник', например booth1=0")
+    parser.add_argument("--workers", type=int, default=None, help="число рабочих потоков")
+    parser.add_argument("--report-interval", type=float, default=5.0, help="период отчета о нагрузке, с")
+    parser.add_argument("--duration", type=float, default=None, help="время работы, с")
+    parser.add_argument("--benchmark", default=None, metavar="N,N,...",
+                        help="замер пропускной способности для заданного числа потоков на кадрах первого "
+                             "источника (по умолчанию synthetic) вместо обработки камер")
+    parser.add_argument("--benchmark-frames", type=int, default=100, help="кадров на поток в замере")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        source = open_frame_source(next(iter(parse_sources(args.sources).values()), "synthetic"), realtime=False)
+        frames = []
+        while len(frames) < args.benchmark_frames:
+            ok, frame = source.read()
+            if not ok:
+                break
+            frames.append(frame)
+        source.release()
+        results = benchmark(shared_models(), frames, [int(count) for count in args.benchmark.split(",")])
+        for count, fps in results.items():
+            print(f"Потоков {count}: {fps:.1f} к/с, ускорение {fps / results[min(results)]:.2f}")
+        return
+    if not args.sources:
+        parser.error("не указаны камеры")
+
+    supervisor = Supervisor(parse_sources(args.sources), args.workers, report_interval=args.report_interval)
+    supervisor.run(args.duration)
+
+
+if __name__ == "__main__":
+    main()
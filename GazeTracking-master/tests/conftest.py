@@ -0,0 +1,31 @@
+import cv2
+import dlib
+import numpy as np
+import pytest
+
+
+def _eye_points(cx, cy):
+    return [(cx - 25, cy), (cx - 8, cy - 10), (cx + 8, cy - 10),
+            (cx + 25, cy), (cx + 8, cy + 10), (cx - 8, cy + 10)]
+
+
+def make_face_frame(offset=0):
+    """Синтетический кадр с двумя глазами, зрачки смещены по горизонтали на offset"""
+    frame = np.full((240, 320, 3), 120, np.uint8)
+    for cx in (110, 210):
+        cv2.ellipse(frame, (cx, 110), (25, 10), 0, 0, 360, (235, 235, 235), -1)
+        cv2.circle(frame, (cx + offset, 110), 7, (20, 20, 20), -1)
+    return frame
+
+
+def make_landmarks(rect):
+    """68 точек лица, из которых значимы только точки глаз"""
+    points = [(160, 170)] * 36 + _eye_points(110, 110) + _eye_points(210, 110) + [(160, 170)] * 20
+    return dlib.full_object_detection(rect, dlib.points([dlib.point(x, y) for x, y in points]))
+
+
+@pytest.fixture
+def synthetic_models():
+    """Детектор лица и предсказатель точек для синтетических кадров"""
+    face = dlib.rectangle(60, 60, 260, 200)
+    return (lambda frame, *args: dlib.rectangles([face])), (lambda frame, rect: make_landmarks(rect))
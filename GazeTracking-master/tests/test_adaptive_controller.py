@@ -0,0 +1,118 @@
+import pytest
+import numpy as np
+import dlib
+from unittest.mock import Mock
+from conftest import make_face_frame
+from main import AdaptiveController, BehaviorAnalyzer
+from gaze_tracking import GazeTracking
+
+
+class TestAdaptiveController:
+
+    def setup_method(self):
+        """Настройка перед каждым тестом"""
+        self.controller = AdaptiveController(target_fps=10, cooldown=3)
+
+    def test_initialization(self):
+        """Тест инициализации контроллера"""
+        assert self.controller.level == 0
+        assert self.controller.detection_scale == 1.0
+        assert self.controller.redetect_interval == 1
+        assert self.controller.target_period == pytest.approx(0.1)
+
+    def test_sleep_fills_target_period(self):
+        """Тест: пауза дополняет время обработки до целевого периода"""
+        sleep = self.controller.update(0.03)
+        assert sleep == pytest.approx(0.07)
+
+    def test_degrade_under_load(self):
+        """Тест снижения качества при перегрузке"""
+        for _ in range(self.controller.cooldown * 2):
+            self.controller.update(0.2)
+
+        assert self.controller.level == 2
+        assert self.controller.detection_scale < 1.0
+
+    def test_frame_rate_drops_at_max_degradation(self):
+        """Тест снижения частоты кадров при исчерпании уровней качества"""
+        self.controller.level = len(AdaptiveController.LEVELS) - 1
+        sleep = self.controller.update(0.2)
+
+        assert sleep == 0.0
+        assert self.controller.level == len(AdaptiveController.LEVELS) - 1
+
+    def test_recover_when_load_drops(self):
+        """Тест восстановления качества при снижении нагрузки"""
+        self.controller.level = 3
+        for _ in range(self.controller.cooldown * 10):
+            self.controller.update(0.01)
+
+        assert self.controller.level == 0
+
+    def test_cpu_share_budget(self):
+        """Тест бюджета по доле процессорного времени"""
+        controller = AdaptiveController(target_fps=10, max_cpu_share=0.5, cooldown=1)
+        sleep = controller.update(0.08)
+
+        assert sleep == pytest.approx(0.08)
+        assert controller.load() > 1.0
+
+    def test_apply(self):
+        """Тест применения уровня к параметрам детекции"""
+        gaze = Mock()
+        self.controller.level = 3
+        self.controller.apply(gaze)
+
+        assert gaze.detection_scale == AdaptiveController.LEVELS[3][0]
+        assert gaze.redetect_interval == AdaptiveController.LEVELS[3][1]
+
+
+class TestAdaptiveDetection:
+
+    def setup_method(self):
+        """Настройка перед каждым тестом"""
+        self.gaze = GazeTracking()
+        self.gaze._face_detector = Mock(return_value=[dlib.rectangle(10, 20, 60, 70)])
+        self.frame = np.zeros((200, 200), np.uint8)
+
+    def test_downscaled_detection(self):
+        """Тест пересчета координат лица при детекции на уменьшенном кадре"""
+        self.gaze.detection_scale = 0.5
+        faces = self.gaze._detect_faces(self.frame)
+
+        assert self.gaze._face_detector.call_args[0][0].shape == (100, 100)
+        assert faces[0] == dlib.rectangle(20, 40, 120, 140)
+
+    def test_redetect_interval(self):
+        """Тест повторного использования рамки лица между детекциями"""
+        self.gaze.redetect_interval = 3
+        for _ in range(6):
+            self.gaze.face = self.gaze._detect_faces(self.frame)[0]
+
+        assert self.gaze._face_detector.call_count == 2
+
+    def test_face_count_on_detection_frames(self, synthetic_models):
+        """Тест: число лиц известно только на кадрах, где запускался детектор"""
+        gaze = GazeTracking(*synthetic_models)
+        gaze.redetect_interval = 3
+        counts = []
+        for _ in range(4):
+            gaze.refresh(make_face_frame())
+            counts.append(gaze.face_count)
+
+        assert counts == [1, None, None, 1]
+
+
+class TestAnalyzerSampleInterval:
+
+    def test_set_sample_interval(self):
+        """Тест пересчета окон анализа под фактический интервал кадров"""
+        analyzer = BehaviorAnalyzer()
+        for _ in range(analyzer.window_size):
+            analyzer.analyze_gaze_pattern("center")
+
+        analyzer.set_sample_interval(0.5)
+
+        assert analyzer.window_size == int(analyzer.analysis_window / 0.5)
+        assert analyzer.min_consecutive_offcenter == 4
+        assert len(analyzer.gaze_history) == analyzer.window_size
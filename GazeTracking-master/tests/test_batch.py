@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from unittest.mock import Mock
+from conftest import make_face_frame
+from gaze_tracking import GazeTracking, direction
+from main import GazeTracker
+
+
+class TestRefreshBatch:
+
+    def test_matches_per_frame_results(self, synthetic_models):
+        """Тест: пакетный анализ совпадает с покадровым"""
+        frames = [make_face_frame(offset) for offset in (-8, -3, 0, 4, 9)]
+        single = GazeTracking(*synthetic_models)
+        expected = []
+        for frame in frames:
+            single.refresh(frame)
+            expected.append((single.pupil_left_coords(), single.pupil_right_coords(),
+                             single.horizontal_ratio(), single.vertical_ratio()))
+
+        batch = GazeTracking(*synthetic_models).refresh_batch(np.stack(frames))
+
+        assert batch.located.all()
+        assert batch.face_found.all()
+        for index, (left, right, horizontal, vertical) in enumerate(expected):
+            assert tuple(batch.pupil_left[index]) == left
+            assert tuple(batch.pupil_right[index]) == right
+            assert batch.horizontal_ratio[index] == pytest.approx(horizontal)
+            assert batch.vertical_ratio[index] == pytest.approx(vertical)
+        assert batch.blinking_ratio.shape == (5,)
+
+    def test_frames_without_face(self, synthetic_models):
+        """Тест: для кадров без лица значения равны NaN"""
+        gaze = GazeTracking(lambda frame, *args: [], synthetic_models[1])
+
+        batch = gaze.refresh_batch(make_face_frame() for _ in range(3))
+
+        assert not batch.face_found.any()
+        assert not batch.located.any()
+        assert np.isnan(batch.horizontal_ratio).all()
+        assert batch.pupil_left.shape == (3, 2)
+
+
+class TestClassifyDirections:
+
+    def setup_method(self):
+        """Настройка перед каждым тестом"""
+        self.gaze_tracker = GazeTracker(debug=False)
+        self.gaze_tracker.calibrated = True
+        self.gaze_tracker.horizontal_center = 0.52
+        self.gaze_tracker.vertical_center = 0.47
+
+    def test_matches_get_gaze_direction(self):
+        """Тест: векторная классификация совпадает с get_gaze_direction"""
+        rng = np.random.default_rng(0)
+        horizontal = rng.uniform(0.2, 0.8, 200)
+        vertical = rng.uniform(0.2, 0.8, 200)
+        horizontal[::17] = np.nan
+
+        codes = self.gaze_tracker.classify_directions(horizontal, vertical)
+
+        self.gaze_tracker.gaze = Mock()
+        for index in range(200):
+            value = None if np.isnan(horizontal[index]) else horizontal[index]
+            self.gaze_tracker.gaze.horizontal_ratio.return_value = value
+            self.gaze_tracker.gaze.vertical_ratio.return_value = vertical[index]
+            assert codes[index] == self.gaze_tracker.get_gaze_direction()["code"]
+
+    def test_no_face_and_not_calibrated(self):
+        """Тест кодов для кадров без лица и до калибровки"""
+        horizontal = np.array([np.nan, np.nan, 0.52])
+        vertical = np.array([np.nan, np.nan, 0.47])
+
+        codes = self.gaze_tracker.classify_directions(horizontal, vertical, np.array([True, False, True]))
+
+        assert direction.to_names(codes) == ["blink", "no face", "center"]
+        self.gaze_tracker.calibrated = False
+        assert (self.gaze_tracker.classify_directions(horizontal, vertical) == direction.NOT_CALIBRATED).all()
@@ -1,7 +1,9 @@
 import pytest
+import json
 import time
 from unittest.mock import Mock, patch
-from main import BehaviorAnalyzer, CONFIG
+from gaze_tracking import direction
+from main import BehaviorAnalyzer, CONFIG, dumps_behavior_log, expand_gaze_history
 
 
 class TestBehaviorAnalyzer:
@@ -15,21 +17,21 @@ class TestBehaviorAnalyzer:
         assert self.analyzer.suspicious_actions == 0
         assert self.analyzer.gaze_history == []
         assert self.analyzer.consecutive_offcenter == 0
-        assert self.analyzer.last_direction == "center"
+        assert self.analyzer.last_direction == direction.CENTER
     
     def test_analyze_gaze_pattern_center(self):
         """Тест анализа взгляда в центр"""
         self.analyzer.analyze_gaze_pattern("center")
         assert self.analyzer.consecutive_offcenter == -1
         assert len(self.analyzer.gaze_history) == 1
-        assert self.analyzer.gaze_history[0][1] == "center"
+        assert self.analyzer.gaze_history[0][1] == direction.CENTER
     
     def test_analyze_gaze_pattern_offcenter(self):
         """Тест анализа взгляда вне центра"""
         self.analyzer.analyze_gaze_pattern("left")
         assert self.analyzer.consecutive_offcenter == 1
         assert len(self.analyzer.gaze_history) == 1
-        assert self.analyzer.gaze_history[0][1] == "left"
+        assert self.analyzer.gaze_history[0][1] == direction.LEFT
     
     def test_consecutive_offcenter_threshold(self):
         """Тест превышения порога подряд идущих кадров вне центра"""
@@ -64,10 +66,23 @@ class TestBehaviorAnalyzer:
         report = self.analyzer.generate_report()
         
         assert "suspicious_actions" in report
-        assert "gaze_history" in report
+        assert "gaze_history_rle" in report
         assert "current_status" in report
-        assert len(report["gaze_history"]) == 2
+        assert len(expand_gaze_history(report)) == 2
         assert report["current_status"] in ["normal", "cheating"]
+
+    def test_report_run_length_encoding(self):
+        """Тест сжатия истории взгляда в отчете сериями"""
+        for name in ["center"] * 3 + ["left"] * 2 + ["center"]:
+            self.analyzer.analyze_gaze_pattern(name)
+
+        report = self.analyzer.generate_report()
+
+        assert report["gaze_history_rle"] == [["center", 0, 3], ["left", 3, 2], ["center", 5, 1]]
+        assert report["gaze_durations"] == {"center": round(4 * self.analyzer.sample_interval, 3),
+                                            "left": round(2 * self.analyzer.sample_interval, 3)}
+        assert expand_gaze_history(report) == ["center"] * 3 + ["left"] * 2 + ["center"]
+        assert expand_gaze_history({"gaze_history": ["left"]}) == ["left"]
     
     def test_window_size_calculation(self):
         """Тест расчета размера окна"""
@@ -121,4 +136,14 @@ class TestBehaviorAnalyzer:
         assert self.analyzer.consecutive_offcenter == -3
 
         self.analyzer.analyze_gaze_pattern("left")
-        assert self.analyzer.consecutive_offcenter == -2 
\ No newline at end of file
+        assert self.analyzer.consecutive_offcenter == -2 
+
+def test_dumps_behavior_log():
+    """Тест записи серий истории взгляда в одну строку"""
+    logs = [{"timestamp": "2023-01-01 12:00:00",
+             "data": {"gaze_history_rle": [["center", 0, 3], ["left", 3, 2]], "gaze_durations": {"center": 0.3}}}]
+
+    text = dumps_behavior_log(logs)
+
+    assert '["center", 0, 3],' in text
+    assert json.loads(text) == logs
@@ -0,0 +1,204 @@
+import random
+import pytest
+from behavior_rules import (AlternationRule, EyesClosedRule, FaceAbsentRule, FrequentGlancesRule, MultipleFacesRule,
+                            OffcenterRatioRule, RuleEngine, create_rule)
+from gaze_tracking import direction
+from main import BehaviorAnalyzer
+
+NAMES = ["center", "left", "right", "up", "down", "left up", "right down", "blink"]
+
+
+class LegacyAnalyzer:
+    """Прежняя реализация двух эвристик с полным проходом по истории"""
+
+    def __init__(self, window_size, min_consecutive, threshold):
+        self.window_size = window_size
+        self.min_consecutive = min_consecutive
+        self.threshold = threshold
+        self.history = []
+        self.consecutive = 0
+        self.suspicious_actions = 0
+
+    def analyze(self, code):
+        self.history.append(code)
+        self.history = self.history[-self.window_size:]
+        self.consecutive += 1 if code & direction.OFFCENTER else -1
+        if self.consecutive >= self.min_consecutive:
+            self.suspicious_actions += 1
+            self.consecutive = 0
+        offcenter = sum(1 for d in self.history if d & direction.OFFCENTER)
+        if len(self.history) >= self.window_size and offcenter / self.window_size > self.threshold:
+            self.suspicious_actions += 1
+            self.history = self.history[-self.window_size // 2:]
+        if code == direction.CENTER and self.suspicious_actions > 0:
+            self.suspicious_actions -= 1
+
+
+def window_count(codes, window, predicate):
+    """Число кадров среди последних window, вычисленное полным проходом"""
+    return sum(1 for code in codes[-window:] if predicate(code))
+
+
+class TestLegacyRules:
+
+    @pytest.mark.parametrize("seed, window", [(0, 1.0), (1, 1.1), (2, 0.1), (3, 2.5), (4, 0.7)])
+    def test_matches_previous_implementation(self, seed, window):
+        """Тест: правила по умолчанию повторяют прежние эвристики BehaviorAnalyzer"""
+        rng = random.Random(seed)
+        analyzer = BehaviorAnalyzer(analysis_window=window, min_consecutive_offcenter=4, offcenter_threshold=0.5)
+        legacy = LegacyAnalyzer(analyzer.window_size, 4, 0.5)
+        for _ in range(500):
+            code = direction.from_name(rng.choice(NAMES))
+            analyzer.analyze_gaze_pattern(code)
+            legacy.analyze(code)
+            assert analyzer.suspicious_actions == legacy.suspicious_actions
+            assert [d for _, d in analyzer.gaze_history] == legacy.history
+            assert analyzer.consecutive_offcenter == legacy.consecutive
+
+    def test_ratio_count_follows_window(self):
+        """Тест: счетчик доли кадров вне центра учитывает вытеснение и сокращение окна"""
+        rule = OffcenterRatioRule(0.6)
+        engine = RuleEngine([rule], 10)
+        rng = random.Random(1)
+        for _ in range(300):
+            engine.update(0.0, direction.from_name(rng.choice(NAMES)))
+            assert rule.count == sum(1 for sample in engine.window if sample.code & direction.OFFCENTER)
+
+    def test_events_in_report(self):
+        """Тест событий сработавших правил в отчете"""
+        analyzer = BehaviorAnalyzer(min_consecutive_offcenter=2)
+
+        events = [analyzer.analyze_gaze_pattern("left") for _ in range(2)]
+
+        assert events[0] == []
+        assert events[1][0].kind == "sustained_offcenter"
+        report = analyzer.generate_report()
+        assert report["rule_events"][0]["rule"] == "sustained_offcenter"
+        assert analyzer.events == []
+
+
+class TestWindowRules:
+
+    @pytest.mark.parametrize("seed", range(3))
+    def test_frequent_glances_matches_full_pass(self, seed):
+        """Тест: счетчик взглядов в сторону совпадает с полным проходом, в том числе после сокращения окна"""
+        rule = FrequentGlancesRule(window=8, min_count=100)
+        engine = RuleEngine([OffcenterRatioRule(0.5), rule], 12)
+        rng = random.Random(seed)
+        for _ in range(400):
+            engine.update(0.0, direction.from_name(rng.choice(NAMES)))
+            codes = [sample.code for sample in engine.window]
+            assert rule.count == window_count(codes, 8, lambda code: code & direction.HORIZONTAL)
+
+    def test_frequent_glances_repeat(self):
+        """Тест: с repeat правило срабатывает на каждом кадре, пока условие выполняется"""
+        rule = FrequentGlancesRule(window=4, min_count=2, repeat=True)
+        engine = RuleEngine([rule], 10)
+
+        triggered = [bool(engine.update(0.0, code)) for code in
+                     [direction.LEFT, direction.CENTER, direction.RIGHT, direction.CENTER, direction.CENTER,
+                      direction.CENTER]]
+
+        assert triggered == [False, False, True, True, False, False]
+
+    def test_alternation(self):
+        """Тест: частые переходы влево-вправо"""
+        engine = RuleEngine([AlternationRule(window=10, min_switches=3)], 20)
+        sequence = ["left", "center", "right", "left", "center", "right"]
+
+        events = [engine.update(0.0, direction.from_name(name)) for name in sequence]
+
+        assert [bool(event) for event in events] == [False] * 5 + [True]
+        assert events[-1][0].details["count"] == 3
+
+    def test_alternation_window(self):
+        """Тест: редкие переходы не считаются чередованием"""
+        engine = RuleEngine([AlternationRule(window=4, min_switches=3)], 20)
+        names = ["left"] + ["center"] * 3 + ["right"] + ["center"] * 3 + ["left"] + ["center"] * 3 + ["right"]
+
+        assert not any(engine.update(0.0, direction.from_name(name)) for name in names)
+
+
+class TestStateRules:
+
+    def test_face_absent(self):
+        """Тест: лица нет дольше заданного времени, одно событие на эпизод"""
+        engine = RuleEngine([FaceAbsentRule(seconds=2.0)], 10)
+
+        events = [engine.update(t * 0.5, direction.NO_FACE) for t in range(8)]
+        engine.update(4.0, direction.CENTER)
+        again = [engine.update(5.0 + t, direction.NO_FACE) for t in range(3)]
+
+        assert [bool(event) for event in events] == [False] * 4 + [True] + [False] * 3
+        assert events[4][0].details["duration"] == 2.0
+        assert [bool(event) for event in again] == [False, False, True]
+
+    def test_face_absent_while_idle(self):
+        """Тест: интервал без анализа кадров продолжает эпизод отсутствия лица"""
+        rule = FaceAbsentRule(seconds=2.0)
+        engine = RuleEngine([rule], 10)
+
+        engine.update(0.0, direction.NO_FACE)
+        assert not engine.absent(0.0, 1.5)
+        events = engine.absent(0.0, 2.5)
+        assert not engine.absent(0.0, 3.0)
+        assert events[0].details["duration"] == 2.5
+        assert len(engine.window) == 1
+
+        engine.update(4.0, direction.CENTER)
+        assert engine.absent(10.0, 13.0)[0].kind == "face_absent"
+
+    def test_eyes_closed(self):
+        """Тест: глаза закрыты дольше заданного времени"""
+        engine = RuleEngine([EyesClosedRule(seconds=1.0)], 10)
+
+        assert not engine.update(0.0, direction.BLINK)
+        assert not engine.update(0.5, direction.CENTER)
+        assert not engine.update(1.0, direction.BLINK)
+        assert engine.update(2.0, direction.BLINK)[0].kind == "eyes_closed"
+
+    def test_multiple_faces(self):
+        """Тест: несколько лиц в кадре несколько кадров подряд"""
+        engine = RuleEngine([MultipleFacesRule(min_frames=2)], 10)
+
+        faces = [2, 1, 2, 3, 3, None, 2]
+        triggered = [bool(engine.update(0.0, direction.CENTER, count)) for count in faces]
+
+        assert triggered == [False, False, False, True, False, False, False]
+
+    def test_multiple_faces_skips_frames_without_detection(self):
+        """Тест: кадры без запуска детектора не прерывают и не продолжают серию"""
+        engine = RuleEngine([MultipleFacesRule(min_frames=3)], 10)
+
+        faces = [2, None, None, 2, None, 2]
+        triggered = [bool(engine.update(0.0, direction.CENTER, count)) for count in faces]
+
+        assert triggered == [False] * 5 + [True]
+
+
+class TestConfiguredRules:
+
+    def test_rules_from_config(self):
+        """Тест набора правил из конфигурации с именами и весами"""
+        analyzer = BehaviorAnalyzer(max_suspicious_actions=3, rules=[
+            {"type": "multiple_faces", "min_frames": 1, "name": "second person", "weight": 3}])
+
+        events = analyzer.analyze_gaze_pattern("left", faces=2)
+
+        assert events[0].rule == "second person"
+        assert analyzer.detect_cheating()
+        assert analyzer.min_consecutive_offcenter > 0
+
+    def test_legacy_rules_disabled(self):
+        """Тест: без правил в конфигурации кадры вне центра не считаются подозрительными"""
+        analyzer = BehaviorAnalyzer(min_consecutive_offcenter=1, rules=[])
+
+        analyzer.analyze_gaze_pattern("left")
+
+        assert analyzer.suspicious_actions == 0
+        assert len(analyzer.gaze_history) == 1
+
+    def test_unknown_rule(self):
+        """Тест ошибки для неизвестного типа правила"""
+        with pytest.raises(ValueError):
+            create_rule({"type": "telepathy"})
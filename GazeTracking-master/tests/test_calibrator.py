@@ -0,0 +1,117 @@
+import pytest
+import numpy as np
+from unittest.mock import Mock, patch
+from main import RobustRunningStats, CenterCalibrator, GazeTracker
+
+
+class TestRobustRunningStats:
+
+    def test_mean_and_std(self):
+        """Тест потокового среднего и стандартного отклонения"""
+        values = [0.48, 0.5, 0.52, 0.49, 0.51, 0.5, 0.47, 0.53]
+        stats = RobustRunningStats()
+        for value in values:
+            stats.add(value)
+
+        assert stats.count == len(values)
+        assert stats.mean == pytest.approx(np.mean(values))
+        assert stats.std == pytest.approx(np.std(values, ddof=1))
+
+    def test_rejects_outliers(self):
+        """Тест отбрасывания выбросов при прогреве и после него"""
+        stats = RobustRunningStats()
+        for value in [0.5, 0.51, 0.9, 0.49, 0.5]:
+            stats.add(value)
+        assert stats.rejected == 1
+
+        assert stats.add(0.1) is False
+        assert stats.add(0.505) is True
+        assert stats.mean == pytest.approx(0.501, abs=1e-3)
+
+
+class TestCenterCalibrator:
+
+    def test_waits_until_started(self):
+        """Тест: до запуска значения не собираются"""
+        calibrator = CenterCalibrator()
+
+        assert calibrator.update(0.5, 0.5) is None
+        assert calibrator.state == CenterCalibrator.WAITING
+
+    def test_converges_early(self):
+        """Тест досрочного завершения при стабильных значениях"""
+        calibrator = CenterCalibrator(max_time=60, min_samples=10, tolerance=0.005)
+        calibrator.start()
+        rng = np.random.default_rng(0)
+
+        for step in range(100):
+            center = calibrator.update(0.6 + rng.normal(0, 0.01), 0.4 + rng.normal(0, 0.01))
+            if center is not None:
+                break
+
+        assert calibrator.state == CenterCalibrator.DONE
+        assert step < 99
+        assert center == pytest.approx((0.6, 0.4), abs=0.01)
+
+    def test_skips_blinks_and_missing_pupils(self):
+        """Тест: моргания и кадры без зрачков не учитываются"""
+        calibrator = CenterCalibrator(min_samples=1)
+        calibrator.start()
+
+        calibrator.update(None, 0.5)
+        calibrator.update(0.1, 0.1, blinking=True)
+
+        assert calibrator.horizontal.count == 0
+
+    def test_restart_on_timeout(self):
+        """Тест перезапуска калибровки, если данных недостаточно"""
+        calibrator = CenterCalibrator(max_time=10, min_samples=5)
+        with patch("main.time.time", return_value=100.0):
+            calibrator.start()
+        with patch("main.time.time", return_value=111.0):
+            assert calibrator.update(0.5, 0.5) is None
+
+        assert calibrator.failures == 1
+        assert calibrator.sampling
+
+
+class TestOnlineCalibration:
+
+    def setup_method(self):
+        """Настройка перед каждым тестом"""
+        self.gaze_tracker = GazeTracker(debug=False)
+        self.gaze_tracker.camera = Mock()
+        self.gaze_tracker.camera.read.return_value = (True, Mock())
+        self.gaze_tracker.gaze = Mock()
+        self.gaze_tracker.gaze.is_blinking.return_value = False
+        self.gaze_tracker.calibrator = CenterCalibrator(max_time=60, min_samples=5, tolerance=0.01)
+
+    def test_detect_gaze_calibrates(self):
+        """Тест калибровки в цикле обработки кадров без блокировки"""
+        self.gaze_tracker.gaze.horizontal_ratio.return_value = 0.6
+        self.gaze_tracker.gaze.vertical_ratio.return_value = 0.4
+        self.gaze_tracker.calibrate()
+
+        results = [self.gaze_tracker.detect_gaze() for _ in range(6)]
+
+        assert results[0] is None
+        assert results[-1] == "center"
+        assert self.gaze_tracker.horizontal_center == pytest.approx(0.6)
+        assert self.gaze_tracker.vertical_center == pytest.approx(0.4)
+
+    def test_recalibration_keeps_old_center(self):
+        """Тест: при повторной калибровке анализ продолжается со старым центром"""
+        self.gaze_tracker.calibrated = True
+        self.gaze_tracker.horizontal_center = 0.6
+        self.gaze_tracker.vertical_center = 0.5
+        self.gaze_tracker.gaze.horizontal_ratio.return_value = 0.75
+        self.gaze_tracker.gaze.vertical_ratio.return_value = 0.5
+        self.gaze_tracker.calibrate()
+
+        assert self.gaze_tracker.detect_gaze() == "left"
+        assert self.gaze_tracker.horizontal_center == 0.6
+
+        for _ in range(5):
+            self.gaze_tracker.detect_gaze()
+        assert self.gaze_tracker.horizontal_center == pytest.approx(0.75)
+        assert self.gaze_tracker.detect_gaze() == "center"
@@ -4,7 +4,7 @@ import tempfile
 import os
 from unittest.mock import Mock, patch, mock_open
 from pathlib import Path
-from main import DataLogger, CONFIG
+from main import DataLogger, GazeLogBuffer, CONFIG
 
 
 class TestDataLogger:
@@ -31,6 +31,12 @@ class TestDataLogger:
         assert len(self.logger.gaze_logs) == initial_length + 1
         assert self.logger.gaze_logs[-1].endswith(f": {gaze_data}")
     
+    def test_log_reused_gaze_data(self):
+        """Тест пометки переиспользованного результата в логе взгляда"""
+        self.logger.log_gaze_data("center", reused=True)
+
+        assert self.logger.gaze_logs[-1].endswith(": center [reused]")
+
     def test_log_behavior(self):
         """Тест логирования данных о поведении"""
         behavior_data = {"suspicious_actions": 5, "status": "normal"}
@@ -162,4 +168,73 @@ class TestDataLogger:
         log_entry = self.logger.behavior_logs[0]
         assert "timestamp" in log_entry
         assert "data" in log_entry
-        assert log_entry["data"] == behavior_data 
\ No newline at end of file
+        assert log_entry["data"] == behavior_data 
+
+class TestGazeLogBuffer:
+
+    def setup_method(self):
+        """Настройка перед каждым тестом"""
+        self.buffer = GazeLogBuffer(capacity=3)
+
+    def test_deferred_formatting(self):
+        """Тест: записи хранятся компактно и форматируются при чтении"""
+        self.buffer.record("left", timestamp=0.5)
+        self.buffer.record("left", reused=True, timestamp=1.0)
+        self.buffer.append("2023-01-01 12:00:00: Номер участника: 3")
+
+        lines = list(self.buffer)
+        assert lines[0].endswith(": left")
+        assert lines[1].endswith(": left [reused]")
+        assert lines[2] == "2023-01-01 12:00:00: Номер участника: 3"
+        assert self.buffer[-1] == lines[2]
+
+    def test_fixed_capacity(self):
+        """Тест: при переполнении вытесняются самые старые записи"""
+        for direction in ["center", "left", "right", "up"]:
+            self.buffer.record(direction)
+
+        assert len(self.buffer) == 3
+        assert self.buffer.dropped == 1
+        assert self.buffer[0].endswith(": left")
+        assert self.buffer.nbytes == 3 * GazeLogBuffer.RECORD.itemsize
+
+
+class TestGazeLogFlushing:
+
+    @patch.dict("main.CONFIG", {"gaze_log_buffer_records": 4})
+    def test_flush_when_full(self, tmp_path):
+        """Тест автоматического сброса заполненного буфера в файл"""
+        logger = DataLogger(str(tmp_path))
+        for _ in range(10):
+            logger.log_gaze_data("center")
+
+        assert len(logger.gaze_logs) == 2
+        assert len(logger.gaze_log_file.read_text(encoding="utf-8").splitlines()) == 8
+
+    def test_flush_by_time(self, tmp_path):
+        """Тест сброса буфера по времени"""
+        logger = DataLogger(str(tmp_path))
+        logger.log_gaze_data("center")
+        logger.last_flush -= CONFIG["gaze_log_flush_interval"]
+        logger.log_gaze_data("left")
+
+        assert logger.gaze_logs == []
+        assert logger.gaze_log_file.read_text(encoding="utf-8").endswith(": left\n")
+
+    @patch.dict("main.CONFIG", {"gaze_log_buffer_records": 100000, "gaze_log_max_memory_kb": 1})
+    def test_memory_ceiling(self, tmp_path):
+        """Тест ограничения памяти буфера"""
+        logger = DataLogger(str(tmp_path))
+
+        assert logger.gaze_logs.nbytes <= 1024
+
+    @patch.dict("main.CONFIG", {"gaze_log_buffer_records": 2})
+    def test_keeps_buffer_on_write_error(self, tmp_path):
+        """Тест: при ошибке записи память не растет, старые записи вытесняются"""
+        logger = DataLogger(str(tmp_path))
+        with patch("builtins.open", side_effect=OSError("disk full")):
+            for _ in range(5):
+                logger.log_gaze_data("center")
+
+        assert len(logger.gaze_logs) == 2
+        assert logger.gaze_logs.dropped == 3
@@ -0,0 +1,65 @@
+import pytest
+from unittest.mock import Mock
+from gaze_tracking import direction
+from main import BehaviorAnalyzer, GazeLogBuffer, GazeTracker
+
+
+class TestDirectionCodes:
+
+    def test_names_round_trip(self):
+        """Тест однозначного соответствия кодов и названий направлений"""
+        for name in ["center", "left", "right", "up", "down", "left up", "left down", "right up",
+                     "right down", "blink", "not calibrated"]:
+            assert direction.to_name(direction.from_name(name)) == name
+
+    def test_from_offsets(self):
+        """Тест кода направления по смещению от центра"""
+        assert direction.from_offsets(0.05, -0.05, 0.1) == direction.CENTER
+        assert direction.from_offsets(0.2, 0.0, 0.1) == direction.LEFT
+        assert direction.from_offsets(-0.2, -0.2, 0.1) == direction.RIGHT | direction.UP
+        assert direction.to_name(direction.from_offsets(-0.2, -0.2, 0.1)) == "right up"
+
+    def test_offcenter_mask(self):
+        """Тест проверки взгляда вне центра одной маской"""
+        assert direction.is_offcenter(direction.LEFT | direction.DOWN)
+        assert not direction.is_offcenter(direction.CENTER)
+        assert not direction.is_offcenter(direction.BLINK)
+        assert not direction.is_offcenter(direction.NOT_CALIBRATED)
+
+    def test_unknown_direction(self):
+        """Тест ошибки для неизвестного направления"""
+        with pytest.raises(ValueError):
+            direction.from_name("sideways")
+        with pytest.raises(ValueError):
+            direction.to_name(direction.LEFT | direction.RIGHT)
+
+    def test_tracker_produces_code(self):
+        """Тест: трекер возвращает код вместе с названием направления"""
+        tracker = GazeTracker(debug=False, gaze=Mock())
+        tracker.calibrated = True
+        tracker.gaze.horizontal_ratio.return_value = 0.8
+        tracker.gaze.vertical_ratio.return_value = 0.5
+
+        info = tracker.get_gaze_direction()
+
+        assert info["code"] == direction.LEFT
+        assert info["direction"] == "left"
+
+    def test_analyzer_accepts_codes_and_names(self):
+        """Тест: анализатор одинаково обрабатывает коды и названия"""
+        by_code, by_name = BehaviorAnalyzer(), BehaviorAnalyzer()
+        for name in ["left", "left up", "center", "blink", "right"]:
+            by_code.analyze_gaze_pattern(direction.from_name(name))
+            by_name.analyze_gaze_pattern(name)
+
+        assert by_code.consecutive_offcenter == by_name.consecutive_offcenter
+        assert [d for _, d in by_code.gaze_history] == [d for _, d in by_name.gaze_history]
+        assert by_code.generate_report()["gaze_history_rle"] == by_name.generate_report()["gaze_history_rle"]
+
+    def test_log_buffer_stores_codes(self):
+        """Тест: лог хранит код направления и пишет название только при форматировании"""
+        buffer = GazeLogBuffer(4)
+        buffer.record(direction.RIGHT | direction.DOWN, timestamp=0)
+
+        assert buffer.records[0]["code"] == direction.RIGHT | direction.DOWN
+        assert buffer[0].endswith(": right down")
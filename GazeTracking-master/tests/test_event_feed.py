@@ -0,0 +1,106 @@
+import time
+import pytest
+from unittest.mock import patch
+from event_feed import EventFeed, EventFeedClient, Subscriber, benchmark
+from main import MainApp, GazeTracker, DataLogger
+
+
+class TestEventFeed:
+
+    def setup_method(self):
+        """Настройка перед каждым тестом"""
+        self.feed = EventFeed("127.0.0.1:0", max_buffer=3, batch_interval=0.01, gaze_rate=10)
+        self.feed.start()
+        self.address = "{}:{}".format(*self.feed.server_address)
+
+    def teardown_method(self):
+        self.feed.close()
+
+    def _connect(self, channels=None):
+        client = EventFeedClient(self.address, channels, timeout=5)
+        while not self.feed.subscribers:
+            time.sleep(0.01)
+        return client
+
+    def test_channels(self):
+        """Тест доставки событий только подписанных каналов"""
+        client = self._connect(["mark"])
+        self.feed.publish("detection", {"value": 1})
+        self.feed.publish("mark", {"value": 2})
+
+        events = client.receive()
+        client.close()
+
+        assert [event["value"] for event in events] == [2]
+        assert events[0]["channel"] == "mark"
+
+    def test_gaze_downsampling(self):
+        """Тест прореживания канала взгляда"""
+        self.feed.subscribe()
+
+        published = [self.feed.publish("gaze", {"direction": "left"}, timestamp=index * 0.02)
+                     for index in range(10)]
+
+        assert sum(published) == 2
+
+    def test_no_subscribers(self):
+        """Тест: без подписчиков событие не формируется"""
+        assert not self.feed.publish("mark", {})
+
+    def test_unix_socket(self, tmp_path):
+        """Тест трансляции через Unix-сокет"""
+        path = str(tmp_path / "feed.sock")
+        feed = EventFeed(path, batch_interval=0.01)
+        feed.start()
+        client = EventFeedClient(path, timeout=5)
+        while not feed.subscribers:
+            time.sleep(0.01)
+        feed.publish("session", {"participant": "3"})
+
+        assert client.receive()[0]["participant"] == "3"
+        client.close()
+        feed.close()
+
+
+class TestSubscriber:
+
+    def test_bounded_buffer(self):
+        """Тест: медленный подписчик теряет старые события, а не задерживает публикацию"""
+        subscriber = Subscriber(None, max_buffer=3)
+        for index in range(5):
+            subscriber.offer({"index": index})
+
+        assert subscriber.dropped == 2
+        assert [event["index"] for event in subscriber.take(10, 0)] == [2, 3, 4]
+
+    def test_batching(self):
+        """Тест ограничения размера пакета"""
+        subscriber = Subscriber(None, max_buffer=10)
+        for index in range(5):
+            subscriber.offer({"index": index})
+
+        assert len(subscriber.take(2, 0)) == 2
+        assert len(subscriber.take(10, 0)) == 3
+        assert subscriber.take(10, 0, timeout=0.01) == []
+
+
+def test_benchmark():
+    """Тест замера трансляции с медленным подписчиком"""
+    results = benchmark(events=2000, subscribers=1, slow_subscribers=1)
+
+    assert results["received_share"] > 0
+    assert results["publish_us"] > 0
+
+
+@patch.dict("main.CONFIG", {"event_feed": "127.0.0.1:0"})
+def test_main_app_publishes_marks(tmp_path):
+    """Тест публикации ручной отметки из MainApp"""
+    app = MainApp(GazeTracker(debug=False), DataLogger(str(tmp_path)))
+    subscriber = app.feed.subscribe({"mark", "session"})
+    with patch.object(app.logger, "save_logs_to_file"):
+        app.start_session("5")
+        app.mark_cheating()
+
+    events = subscriber.take(10, 0)
+    assert [event["channel"] for event in events] == ["session", "mark"]
+    assert events[1]["participant"] == "5"
@@ -0,0 +1,101 @@
+import cv2
+import dlib
+import numpy as np
+import pytest
+from unittest.mock import Mock, patch
+from evidence import EvidenceRecorder
+from main import MainApp, GazeTracker, DataLogger
+
+
+class TestEvidenceRecorder:
+
+    @pytest.fixture(autouse=True)
+    def setup_recorder(self, tmp_path):
+        """Настройка перед каждым тестом"""
+        self.logs_dir = tmp_path
+        self.recorder = EvidenceRecorder(str(tmp_path), fps=10, pre_seconds=1, post_seconds=0.5, width=32)
+        yield
+        self.recorder.close()
+
+    def _frame(self, value):
+        return np.full((48, 64, 3), value, np.uint8)
+
+    def test_memory_cap(self):
+        """Тест: размер буфера ограничен настройкой памяти"""
+        recorder = EvidenceRecorder(str(self.logs_dir), fps=30, pre_seconds=60, max_memory_mb=0.01, width=32)
+        for index in range(100):
+            recorder.add(self._frame(index), timestamp=index)
+        recorder.close()
+
+        assert recorder.frames.nbytes <= 0.01 * 1024 * 1024
+        assert recorder.slots < 60 * 30
+
+    def test_sampling_rate(self):
+        """Тест: кадры сохраняются не чаще заданной частоты"""
+        for index in range(10):
+            self.recorder.add(self._frame(index), timestamp=index * 0.04)
+
+        assert self.recorder.count == 4
+        assert self.recorder.frames.shape[1:] == (24, 32, 3)
+
+    def test_event_window(self):
+        """Тест записи кадров до и после события в фоне"""
+        recorder = EvidenceRecorder(str(self.logs_dir), fps=1, pre_seconds=10, post_seconds=5, width=32)
+        for index in range(20):
+            recorder.add(self._frame(index), timestamp=index)
+        relative = recorder.trigger("detection", timestamp=19)
+        for index in range(20, 30):
+            recorder.add(self._frame(index), timestamp=index)
+        recorder._queue.join()
+        recorder.close()
+
+        files = sorted((self.logs_dir / relative).glob("*.jpg"))
+        assert relative.startswith("evidence/")
+        assert len(files) == recorder.slots == 15
+        assert cv2.imread(str(files[0]))[0, 0, 0] == pytest.approx(10, abs=2)
+        assert cv2.imread(str(files[-1]))[0, 0, 0] == pytest.approx(24, abs=2)
+
+    def test_face_crop(self):
+        """Тест сохранения только области лица"""
+        recorder = EvidenceRecorder(str(self.logs_dir), face_only=True, face_size=16)
+        frame = np.zeros((48, 64, 3), np.uint8)
+        frame[10:30, 20:40] = 255
+        recorder.add(frame, dlib.rectangle(20, 10, 40, 30), timestamp=0)
+        recorder.close()
+
+        assert recorder.frames.shape[1:] == (16, 16, 3)
+        assert recorder.frames[0].mean() > 100
+
+    def test_close_flushes_pending(self):
+        """Тест: незавершенные события записываются при остановке"""
+        self.recorder.add(self._frame(1), timestamp=0)
+        relative = self.recorder.trigger("manual_mark", timestamp=0)
+        self.recorder.close()
+
+        assert len(list((self.logs_dir / relative).glob("*.jpg"))) == 1
+
+    def test_video_format(self):
+        """Тест записи событий в видеофайл"""
+        recorder = EvidenceRecorder(str(self.logs_dir), output_format="video", width=32)
+        recorder.add(self._frame(1), timestamp=0)
+        relative = recorder.trigger("detection", timestamp=0)
+        recorder.close()
+
+        assert relative.endswith(".avi")
+        assert (self.logs_dir / relative).stat().st_size > 0
+
+    def test_unknown_format(self):
+        """Тест неизвестного формата записи"""
+        with pytest.raises(ValueError):
+            EvidenceRecorder(str(self.logs_dir), output_format="gif")
+
+
+@patch.dict("main.CONFIG", {"evidence_capture": True})
+def test_evidence_referenced_from_behavior_log(tmp_path):
+    """Тест ссылки на кадры в записи о ручной отметке"""
+    app = MainApp(GazeTracker(debug=False), DataLogger(str(tmp_path)))
+    with patch.object(app.logger, "save_logs_to_file"):
+        app.mark_cheating()
+    app.gaze_tracker.evidence.close()
+
+    assert app.logger.behavior_logs[-1]["data"]["evidence"].startswith("evidence/")
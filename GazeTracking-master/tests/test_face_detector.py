@@ -0,0 +1,83 @@
+import pytest
+import cv2
+import dlib
+import numpy as np
+from unittest.mock import Mock
+from gaze_tracking import DlibHogDetector, HaarCascadeDetector, create_face_detector
+from gaze_tracking.face_detector import detect_scaled
+from gaze_tracking.detector_benchmark import benchmark, load_frames
+
+
+class TestFaceDetectors:
+
+    def setup_method(self):
+        """Настройка перед каждым тестом"""
+        self.frame = np.zeros((200, 300), np.uint8)
+
+    def test_create_backends(self):
+        """Тест создания детекторов по имени бэкенда"""
+        assert isinstance(create_face_detector("dlib_hog", upsample=1), DlibHogDetector)
+        assert isinstance(create_face_detector("haar", min_neighbors=3), HaarCascadeDetector)
+
+    def test_unknown_backend(self):
+        """Тест неизвестного бэкенда"""
+        with pytest.raises(ValueError, match="Unknown face detector backend"):
+            create_face_detector("unknown")
+
+    def test_unknown_cascade(self):
+        """Тест несуществующего каскада Хаара"""
+        with pytest.raises(ValueError):
+            HaarCascadeDetector(cascade="missing.xml")
+
+    def test_detect_scaled(self):
+        """Тест пересчета координат после детекции на уменьшенном кадре"""
+        detector = Mock(return_value=[dlib.rectangle(5, 10, 25, 30)])
+
+        faces = detect_scaled(detector, self.frame, 0.5)
+
+        assert detector.call_args[0][0].shape == (100, 150)
+        assert isinstance(faces, dlib.rectangles)
+        assert faces[0] == dlib.rectangle(10, 20, 50, 60)
+
+    def test_dlib_hog_options(self):
+        """Тест передачи параметров детектору dlib"""
+        shared = Mock(return_value=dlib.rectangles())
+        shared.run.return_value = (dlib.rectangles(), [], [])
+
+        DlibHogDetector(upsample=2, detector=shared)(self.frame)
+        shared.assert_called_once_with(self.frame, 2)
+
+        DlibHogDetector(upsample=1, adjust_threshold=-0.5, detector=shared)(self.frame)
+        shared.run.assert_called_once_with(self.frame, 1, -0.5)
+
+    def test_empty_frame(self):
+        """Тест: на пустом кадре лица не находятся ни одним бэкендом"""
+        for backend in ("dlib_hog", "haar"):
+            assert len(create_face_detector(backend)(self.frame)) == 0
+
+    def test_haar_largest_first(self):
+        """Тест сортировки лиц каскада Хаара по площади"""
+        detector = HaarCascadeDetector()
+        detector._classifier = Mock()
+        detector._classifier.detectMultiScale.return_value = np.array([[0, 0, 10, 10], [50, 50, 40, 40]])
+
+        faces = detector(self.frame)
+
+        assert faces[0] == dlib.rectangle(50, 50, 90, 90)
+        assert len(faces) == 2
+
+
+def test_benchmark(tmp_path):
+    """Тест сравнения детекторов на папке кадров"""
+    for index in range(3):
+        cv2.imwrite(str(tmp_path / f"frame{index}.png"), np.zeros((50, 60), np.uint8))
+    frames = load_frames(str(tmp_path))
+
+    hits = Mock(return_value=dlib.rectangles([dlib.rectangle(0, 0, 10, 10)]))
+    misses = Mock(return_value=dlib.rectangles())
+    results = benchmark({"hits": hits, "misses": misses}, frames)
+
+    assert len(frames) == 3
+    assert results["hits"]["hit_rate"] == 1.0
+    assert results["misses"]["hit_rate"] == 0.0
+    assert results["hits"]["mean_ms"] >= 0.0
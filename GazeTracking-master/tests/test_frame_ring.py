@@ -0,0 +1,100 @@
+import pytest
+import multiprocessing
+import numpy as np
+from frame_ring import FrameRing, _ring_consumer
+
+
+class TestFrameRing:
+
+    def setup_method(self):
+        """Настройка перед каждым тестом"""
+        self.ring = FrameRing.create((4, 6, 3), slots=4, max_readers=2)
+
+    def teardown_method(self):
+        self.ring.close()
+
+    def _frame(self, value):
+        return np.full((4, 6, 3), value, np.uint8)
+
+    def test_write_read(self):
+        """Тест записи и чтения кадра с номером и временем"""
+        seq = self.ring.write(self._frame(7), timestamp=123.0)
+
+        read_seq, timestamp, frame = self.ring.read(0, timeout=0)
+        assert read_seq == seq == 1
+        assert timestamp == 123.0
+        assert (frame == 7).all()
+
+    def test_read_in_place(self):
+        """Тест: прочитанный кадр не копируется"""
+        self.ring.write(self._frame(1))
+
+        _, _, frame = self.ring.read(0, timeout=0)
+        assert not frame.flags.owndata
+
+    def test_read_timeout(self):
+        """Тест ожидания кадра с ограничением по времени"""
+        assert self.ring.read(0, timeout=0.01) is None
+
+    def test_shape_mismatch(self):
+        """Тест записи кадра неподходящего размера"""
+        with pytest.raises(ValueError):
+            self.ring.write(np.zeros((2, 2, 3), np.uint8))
+
+    def test_overwrite_skips_to_oldest_available(self):
+        """Тест: отставший читатель получает самый старый сохранившийся кадр"""
+        for value in range(1, 11):
+            self.ring.write(self._frame(value))
+
+        seq, _, frame = self.ring.read(0, timeout=0)
+        assert seq == 7
+        assert (frame == 7).all()
+        assert self.ring.read(seq, timeout=0, latest=True)[0] == 10
+
+    def test_is_valid_after_overwrite(self):
+        """Тест обнаружения перезаписи слота во время обработки"""
+        self.ring.write(self._frame(1))
+        seq, _, _ = self.ring.read(0, timeout=0)
+        assert self.ring.is_valid(seq)
+
+        for value in range(4):
+            self.ring.write(self._frame(value))
+        assert not self.ring.is_valid(seq)
+
+    def test_backpressure(self):
+        """Тест: без overwrite запись ждет освобождения слота читателем"""
+        ring = FrameRing.create((4, 6, 3), slots=2, max_readers=1, overwrite=False)
+        try:
+            ring.open_reader(0)
+            assert ring.write(self._frame(1), timeout=0) == 1
+            assert ring.write(self._frame(2), timeout=0) == 2
+            assert ring.write(self._frame(3), timeout=0.01) is None
+
+            ring.release(0, 1)
+            assert ring.write(self._frame(3), timeout=0) == 3
+        finally:
+            ring.close()
+
+    def test_attach(self):
+        """Тест подключения к буферу по имени"""
+        self.ring.write(self._frame(5))
+
+        other = FrameRing.attach(self.ring.name)
+        seq, _, frame = other.read(0, timeout=0)
+        assert seq == 1 and (frame == 5).all()
+        del frame
+        other.close()
+
+    def test_other_process(self):
+        """Тест передачи кадров в другой процесс"""
+        ring = FrameRing.create((4, 6, 3), slots=2, max_readers=1, overwrite=False)
+        ring.open_reader(0)
+        done = multiprocessing.Queue()
+        consumer = multiprocessing.Process(target=_ring_consumer, args=(ring.name, 5, done))
+        consumer.start()
+        for value in range(1, 6):
+            assert ring.write(self._frame(value), timeout=10) is not None
+
+        assert done.get(timeout=10) == 15
+        consumer.join()
+        ring.close()
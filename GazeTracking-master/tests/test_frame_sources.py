@@ -0,0 +1,156 @@
+import time
+import cv2
+import numpy as np
+import pytest
+from unittest.mock import patch
+from frame_sources import CameraSource, EndOfStream, SyntheticSource, VideoFileSource, open_frame_source
+from gaze_tracking import GazeTracking
+from main import CONFIG, DataLogger, GazeTracker, MainApp
+
+
+def write_video(path, count=10, fps=25):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (64, 48))
+    for index in range(count):
+        writer.write(np.full((48, 64, 3), index * 20, np.uint8))
+    writer.release()
+    return str(path)
+
+
+class TestSyntheticSource:
+
+    def test_deterministic(self):
+        """Тест: синтетический источник выдает одинаковые кадры и время"""
+        first, second = SyntheticSource(count=5), SyntheticSource(count=5)
+        for _ in range(5):
+            ok, frame = first.read()
+            _, same = second.read()
+            assert ok
+            assert np.array_equal(frame, same)
+            assert first.timestamp == second.timestamp
+
+        assert first.read() == (False, None)
+        assert first.timestamp == pytest.approx(4 / 30)
+        assert first.failures == 1
+
+    def test_pupils_move(self):
+        """Тест: зрачки смещаются между кадрами"""
+        source = SyntheticSource(period=8)
+        assert not np.array_equal(source.frame(0), source.frame(2))
+
+    def test_stats(self):
+        """Тест статистики частоты и ожидания кадра"""
+        source = SyntheticSource(count=20, fps=200, realtime=True)
+        while source.read()[0]:
+            pass
+
+        stats = source.stats()
+        assert stats["frames"] == 20
+        assert 100 < source.fps < 400
+        assert stats["latency_ms"] < 20
+
+    def test_dropped_frames(self):
+        """Тест: пропуски во времени кадров учитываются по частоте источника, счетчик не сбрасывается"""
+        source = SyntheticSource(count=10, fps=30)
+        for _ in range(2):
+            source.read()
+        source.frame_index += 3
+        source.read()
+        source.stats()
+        source.read()
+
+        assert source.frames_dropped == 3
+        assert source.stats()["dropped"] == 3
+
+
+class TestVideoFileSource:
+
+    def test_timestamps_from_file(self, tmp_path):
+        """Тест времени кадров по позиции в видеофайле"""
+        source = VideoFileSource(write_video(tmp_path / "video.avi"), realtime=False)
+        timestamps = []
+        while True:
+            ok, frame = source.read()
+            if not ok:
+                break
+            timestamps.append(source.timestamp)
+
+        assert timestamps == pytest.approx([index / 25 for index in range(10)])
+
+    def test_realtime_pacing(self, tmp_path):
+        """Тест: в реальном времени кадры выдаются с частотой файла"""
+        source = VideoFileSource(write_video(tmp_path / "video.avi", count=6, fps=50), realtime=True)
+        start = time.perf_counter()
+        while source.read()[0]:
+            pass
+
+        assert time.perf_counter() - start >= 5 / 50 - 0.01
+
+    def test_loop_keeps_time_monotonic(self, tmp_path):
+        """Тест: при повторе файла время кадров продолжает расти"""
+        source = VideoFileSource(write_video(tmp_path / "video.avi", count=3), realtime=False, loop=True)
+        timestamps = []
+        for _ in range(7):
+            assert source.read()[0]
+            timestamps.append(source.timestamp)
+
+        assert timestamps == sorted(timestamps)
+        assert timestamps[3] == pytest.approx(3 / 25)
+
+    def test_missing_file(self, tmp_path):
+        """Тест ошибки для несуществующего файла"""
+        with pytest.raises(ValueError):
+            VideoFileSource(str(tmp_path / "missing.avi"))
+
+
+@patch("cv2.VideoCapture")
+def test_camera_settings(mock_video_capture):
+    """Тест: формат задается до разрешения, буфер драйвера уменьшается до одного кадра"""
+    capture = mock_video_capture.return_value
+    CameraSource(1, width=640, height=480, fps=30)
+
+    calls = [call.args for call in capture.set.call_args_list]
+    assert calls[0] == (cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+    assert (cv2.CAP_PROP_FRAME_WIDTH, 640) in calls
+    assert (cv2.CAP_PROP_FPS, 30) in calls
+    assert (cv2.CAP_PROP_BUFFERSIZE, 1) in calls
+
+
+def test_open_frame_source(tmp_path):
+    """Тест выбора источника по описанию"""
+    assert isinstance(open_frame_source("synthetic:3"), SyntheticSource)
+    assert open_frame_source("synthetic:3").count == 3
+    assert isinstance(open_frame_source(write_video(tmp_path / "video.avi")), VideoFileSource)
+    with patch("cv2.VideoCapture") as mock_video_capture:
+        assert isinstance(open_frame_source("0"), CameraSource)
+        mock_video_capture.assert_called_once_with(0)
+
+
+class TestTrackerSource:
+
+    def test_frame_time_from_source(self, synthetic_models):
+        """Тест: время кадра берется из источника, для синтетического - от момента открытия"""
+        gaze_tracker = GazeTracker(debug=False, gaze=GazeTracking(*synthetic_models))
+        gaze_tracker.camera = SyntheticSource(count=3)
+
+        times = []
+        for _ in range(3):
+            gaze_tracker.detect_gaze()
+            times.append(gaze_tracker.frame_time)
+
+        assert times[-1] == gaze_tracker.camera.wall_time
+        assert [later - earlier for earlier, later in zip(times, times[1:])] == pytest.approx([1 / 30] * 2)
+        with pytest.raises(EndOfStream):
+            gaze_tracker.detect_gaze()
+
+    def test_end_of_stream_stops_app(self, tmp_path, synthetic_models, monkeypatch):
+        """Тест: по окончании видео приложение останавливается и сохраняет логи"""
+        monkeypatch.setitem(CONFIG, "camera_source", "synthetic:3")
+        monkeypatch.setitem(CONFIG, "video_realtime", False)
+        monkeypatch.setattr("builtins.input", lambda prompt: "7")
+        app = MainApp(GazeTracker(debug=False, gaze=GazeTracking(*synthetic_models)), DataLogger(str(tmp_path)))
+        app.sleep_interval = 0
+
+        app.run()
+
+        assert app.gaze_tracker.frames_total == 3
+        assert "Номер участника: 7" in (tmp_path / "gaze_log.txt").read_text(encoding="utf-8")
@@ -0,0 +1,176 @@
+import asyncio
+import time
+import pytest
+from conftest import make_face_frame
+from frame_sources import FrameSource
+from gaze_stream import LATEST, QUEUE, DetectionEvent, GazeSample, GazeStream
+from gaze_tracking import GazeTracking, direction
+from main import BehaviorAnalyzer, GazeTracker
+
+
+class FaceSource(FrameSource):
+    """Кадры с лицом; read() может ждать, как камера"""
+
+    def __init__(self, offsets, delay=0.0):
+        super().__init__()
+        self.offsets = list(offsets)
+        self.delay = delay
+        self.index = -1
+        self.released = False
+
+    def _read(self):
+        if self.released:
+            raise RuntimeError("Источник уже освобожден")
+        time.sleep(self.delay)
+        self.index += 1
+        if self.offsets and self.index >= len(self.offsets):
+            return False, None, None
+        offset = self.offsets[self.index % len(self.offsets)] if self.offsets else 0
+        return True, make_face_frame(offset), self.index / 30
+
+    def release(self):
+        self.released = True
+
+
+class SlowTracker(GazeTracker):
+
+    def process_frame(self, frame, timestamp=None):
+        time.sleep(0.02)
+        return super().process_frame(frame, timestamp)
+
+
+def make_tracker(models, tracker_class=GazeTracker):
+    gaze_tracker = tracker_class(debug=False, gaze=GazeTracking(*models))
+    gaze = GazeTracking(*models)
+    gaze.refresh(make_face_frame())
+    gaze_tracker.horizontal_center, gaze_tracker.vertical_center = gaze.horizontal_ratio(), gaze.vertical_ratio()
+    gaze_tracker.calibrated = True
+    return gaze_tracker
+
+
+async def collect(stream):
+    events = []
+    async with stream:
+        async for event in stream:
+            events.append(event)
+    return events
+
+
+class TestGazeStream:
+
+    def test_queue_processes_every_frame(self, synthetic_models):
+        """Тест: в режиме очереди анализируется каждый кадр, источник освобождается"""
+        source = FaceSource([0] * 10)
+        stream = GazeStream(source, make_tracker(synthetic_models), backpressure=QUEUE, queue_size=2)
+
+        events = asyncio.run(collect(stream))
+
+        samples = [event for event in events if isinstance(event, GazeSample)]
+        assert len(samples) == 10
+        assert all(sample.direction == "center" and sample.dropped == 0 for sample in samples)
+        assert source.released
+
+    def test_latest_drops_stale_frames(self, synthetic_models):
+        """Тест: при медленном анализе в режиме latest старые кадры отбрасываются"""
+        source = FaceSource([0] * 40, delay=0.002)
+        stream = GazeStream(source, make_tracker(synthetic_models, SlowTracker), backpressure=LATEST)
+
+        samples = [event for event in asyncio.run(collect(stream)) if isinstance(event, GazeSample)]
+
+        assert stream.dropped > 0
+        assert len(samples) + stream.dropped == 40
+        assert sum(sample.dropped for sample in samples) == stream.dropped
+
+    def test_detection_events(self, synthetic_models):
+        """Тест событий срабатывания анализатора"""
+        analyzer = BehaviorAnalyzer(max_suspicious_actions=1, min_consecutive_offcenter=3)
+        stream = GazeStream(FaceSource([-9] * 8), make_tracker(synthetic_models), analyzer, backpressure=QUEUE)
+
+        events = asyncio.run(collect(stream))
+
+        detections = [event for event in events if isinstance(event, DetectionEvent)]
+        assert detections
+        assert "suspicious_actions" in detections[0].report
+
+    def test_relative_source_wall_time(self, synthetic_models):
+        """Тест: для источника с временем от начала видео события получают время по часам системы"""
+        source = FaceSource([-9] * 8)
+        source.relative_time = True
+        analyzer = BehaviorAnalyzer(max_suspicious_actions=1, min_consecutive_offcenter=3)
+        stream = GazeStream(source, make_tracker(synthetic_models), analyzer, backpressure=QUEUE)
+
+        events = asyncio.run(collect(stream))
+
+        detections = [event for event in events if isinstance(event, DetectionEvent)]
+        assert detections
+        assert all(abs(event.timestamp - time.time()) < 60 for event in events)
+        assert events[1].timestamp - events[0].timestamp == pytest.approx(1 / 30)
+
+    def test_calibration_samples(self, synthetic_models):
+        """Тест: до калибровки кадры не передаются анализатору"""
+        gaze_tracker = GazeTracker(debug=False, gaze=GazeTracking(*synthetic_models))
+        analyzer = BehaviorAnalyzer()
+        stream = GazeStream(FaceSource([0] * 3), gaze_tracker, analyzer, backpressure=QUEUE)
+
+        events = asyncio.run(collect(stream))
+
+        assert gaze_tracker.calibrator.sampling
+        assert all(event.code == direction.NOT_CALIBRATED for event in events)
+        assert analyzer.gaze_history == []
+
+    def test_cancel_releases_source(self, synthetic_models):
+        """Тест: отмена задачи останавливает чтение и освобождает источник"""
+        source = FaceSource([], delay=0.01)
+
+        async def consume():
+            async for _ in GazeStream(source, make_tracker(synthetic_models)):
+                pass
+
+        async def run():
+            task = asyncio.ensure_future(consume())
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        assert source.released
+
+    def test_break_releases_source(self, synthetic_models):
+        """Тест: выход из цикла освобождает источник"""
+        source = FaceSource([])
+
+        async def run():
+            async with GazeStream(source, make_tracker(synthetic_models)) as stream:
+                async for event in stream:
+                    break
+            return stream
+
+        assert asyncio.run(run()).closed
+        assert source.released
+
+    def test_event_loop_stays_responsive(self, synthetic_models):
+        """Тест: чтение и анализ не блокируют цикл событий"""
+        source = FaceSource([0] * 10, delay=0.01)
+        stream = GazeStream(source, make_tracker(synthetic_models, SlowTracker), backpressure=QUEUE)
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.005)
+
+        async def run():
+            task = asyncio.ensure_future(ticker())
+            await collect(stream)
+            task.cancel()
+
+        asyncio.run(run())
+        gaps = [later - earlier for earlier, later in zip(ticks, ticks[1:])]
+        assert len(ticks) > 20
+        assert max(gaps) < 0.05
+
+    def test_unknown_backpressure(self, synthetic_models):
+        """Тест ошибки для неизвестного режима"""
+        with pytest.raises(ValueError):
+            GazeStream(FaceSource([0]), make_tracker(synthetic_models), backpressure="drop")
@@ -22,13 +22,15 @@ class TestGazeTracker:
     def test_initialize_camera(self, mock_video_capture):
         """Тест инициализации камеры"""
         mock_camera = Mock()
+        mock_camera.get.return_value = 0.0
         mock_video_capture.return_value = mock_camera
         
         with patch.object(self.gaze_tracker, 'calibrate'):
             self.gaze_tracker.initialize_camera()
         
         mock_video_capture.assert_called_once_with(0)
-        assert self.gaze_tracker.camera == mock_camera
+        assert self.gaze_tracker.camera.capture == mock_camera
+        mock_camera.set.assert_any_call(cv2.CAP_PROP_BUFFERSIZE, 1)
     
     @patch('cv2.VideoCapture')
     def test_detect_gaze_without_camera(self, mock_video_capture):
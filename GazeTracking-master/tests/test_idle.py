@@ -0,0 +1,151 @@
+import json
+import dlib
+import numpy as np
+import pytest
+from unittest.mock import Mock
+from gaze_tracking import GazeTracking, IdleBackoff, direction
+from frame_sources import SyntheticSource
+from main import BehaviorAnalyzer, DataLogger, GazeTracker, MainApp
+
+
+class TestIdleBackoff:
+
+    def setup_method(self):
+        """Настройка перед каждым тестом"""
+        self.idle = IdleBackoff(absent_frames=3, check_interval=1.0)
+
+    def test_goes_idle_after_absent_frames(self):
+        """Тест перехода в режим ожидания после нескольких кадров без лица подряд"""
+        assert not self.idle.update(False, 10.0)
+        assert not self.idle.update(False, 10.1)
+        assert self.idle.update(False, 10.2)
+        assert self.idle.idle
+        assert self.idle.absent_since == 10.0
+
+    def test_face_resets_counter(self):
+        """Тест: найденное лицо сбрасывает счетчик кадров без лица"""
+        self.idle.update(False, 0.0)
+        self.idle.update(False, 0.1)
+        self.idle.update(True, 0.2)
+        self.idle.update(False, 0.3)
+
+        assert not self.idle.idle
+        assert self.idle.absent_since == 0.3
+
+    def test_checks_are_rate_limited(self):
+        """Тест: в режиме ожидания проверки выполняются не чаще check_interval"""
+        for timestamp in (0.0, 0.1, 0.2):
+            self.idle.update(False, timestamp)
+
+        assert not self.idle.due(0.5)
+        assert self.idle.due(1.2)
+        assert self.idle.checked(False, 1.2) is None
+        assert not self.idle.due(1.5)
+
+    def test_face_found_returns_interval(self):
+        """Тест: найденное лицо завершает ожидание и возвращает интервал без лица"""
+        for timestamp in (5.0, 5.1, 5.2):
+            self.idle.update(False, timestamp)
+
+        assert self.idle.checked(True, 9.0) == (5.0, 9.0)
+        assert not self.idle.idle
+        assert self.idle.checks == 1
+
+
+def test_face_present(synthetic_models):
+    """Тест проверки наличия лица без изменения результатов анализа"""
+    detector, predictor = synthetic_models
+    frame = np.full((240, 320, 3), 120, np.uint8)
+
+    assert GazeTracking(detector, predictor).face_present(frame, 0.5)
+    gaze = GazeTracking(lambda frame, *args: dlib.rectangles(), predictor)
+    assert not gaze.face_present(frame, 0.5)
+    assert gaze.face is None
+
+
+class TestGazeTrackerIdle:
+
+    def setup_method(self):
+        """Настройка перед каждым тестом"""
+        self.gaze_tracker = GazeTracker(debug=False)
+        self.gaze_tracker.idle = IdleBackoff(absent_frames=2, check_interval=0.0, scale=0.25)
+        self.gaze_tracker.calibrated = True
+        self.gaze_tracker.gaze = Mock(face=None)
+        self.gaze_tracker.gaze.horizontal_ratio.return_value = None
+        self.gaze_tracker.gaze.vertical_ratio.return_value = None
+        self.gaze_tracker.gaze.face_present.return_value = False
+        self.gaze_tracker.camera = Mock()
+        self.gaze_tracker.camera.read.return_value = (True, np.zeros((120, 160, 3), np.uint8))
+
+    def test_idle_skips_full_analysis(self):
+        """Тест: без лица полный анализ заменяется проверкой на уменьшенном кадре"""
+        assert self.gaze_tracker.detect_gaze() == "no face"
+        assert self.gaze_tracker.detect_gaze() == "no face"
+        for _ in range(5):
+            assert self.gaze_tracker.detect_gaze() is None
+
+        assert self.gaze_tracker.gaze.refresh.call_count == 2
+        assert self.gaze_tracker.gaze.face_present.call_count == 5
+        assert self.gaze_tracker.gaze.face_present.call_args[0][1] == 0.25
+        assert self.gaze_tracker.direction == direction.NO_FACE
+
+    def test_face_wakes_up_analysis(self):
+        """Тест возврата к полному анализу на кадре, где лицо найдено"""
+        self.gaze_tracker.detect_gaze()
+        self.gaze_tracker.detect_gaze()
+        self.gaze_tracker.gaze.face_present.return_value = True
+        self.gaze_tracker.gaze.face = Mock()
+        self.gaze_tracker.gaze.horizontal_ratio.return_value = 0.5
+        self.gaze_tracker.gaze.vertical_ratio.return_value = 0.5
+
+        assert self.gaze_tracker.detect_gaze() == "center"
+        assert self.gaze_tracker.gaze.refresh.call_count == 3
+        assert not self.gaze_tracker.idle.idle
+        assert len(self.gaze_tracker.absent_intervals) == 1
+
+
+def test_absence_logged_as_behavior_event(tmp_path):
+    """Тест записи интервала без лица в лог поведения и паузы между проверками"""
+    app = MainApp(GazeTracker(debug=False), DataLogger(str(tmp_path)))
+    tracker = app.gaze_tracker
+    tracker.idle = IdleBackoff(absent_frames=1, check_interval=2.0)
+    tracker.camera = Mock()
+    tracker.camera.read.return_value = (True, np.zeros((120, 160, 3), np.uint8))
+    tracker.calibrated = True
+    tracker.gaze = Mock(face=None)
+    tracker.gaze.horizontal_ratio.return_value = None
+    tracker.gaze.vertical_ratio.return_value = None
+
+    app.step()
+    assert tracker.idle.idle
+    assert app.next_sleep(0.01) == pytest.approx(1.99)
+
+    app.stop()
+
+    logs = json.loads((tmp_path / "behavior_log.json").read_text(encoding="utf-8"))
+    events = [entry["data"] for entry in logs if entry["data"].get("event_type") == "face_absent"]
+    assert len(events) == 1
+    assert events[0]["duration"] >= 0
+    assert not tracker.idle.idle
+
+
+def test_face_absent_rule_while_idle(tmp_path):
+    """Тест: правило отсутствия лица срабатывает, когда кадры без лица уже не анализируются"""
+    app = MainApp(GazeTracker(debug=False), DataLogger(str(tmp_path)))
+    app.behavior_analyzer = BehaviorAnalyzer(rules=[{"type": "face_absent", "seconds": 1.0}])
+    tracker = app.gaze_tracker
+    tracker.idle = IdleBackoff(absent_frames=2, check_interval=0.0)
+    tracker.camera = SyntheticSource()
+    tracker.calibrated = True
+    tracker.gaze = Mock(face=None, face_count=0)
+    tracker.gaze.horizontal_ratio.return_value = None
+    tracker.gaze.vertical_ratio.return_value = None
+    tracker.gaze.face_present.return_value = False
+
+    results = [app.step() for _ in range(45)]
+
+    assert results[2:] == [None] * 43
+    reports = [entry["data"] for entry in app.logger.behavior_logs if "rule_events" in entry["data"]]
+    assert len(reports) == 1
+    assert reports[0]["rule_events"][0]["kind"] == "face_absent"
+    assert reports[0]["rule_events"][0]["duration"] == pytest.approx(1.0, abs=0.05)
@@ -0,0 +1,109 @@
+import gzip
+import json
+import time
+import pytest
+from unittest.mock import patch
+from log_storage import SegmentedLog, SegmentedLogReader, gaze_line_time, parse_time
+from main import DataLogger
+
+
+def line(seconds, text):
+    return f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(BASE + seconds))}: {text}"
+
+
+BASE = parse_time("2025-06-30 10:00:00")
+
+
+class TestSegmentedLog:
+
+    @pytest.fixture(autouse=True)
+    def setup_log(self, tmp_path):
+        """Настройка перед каждым тестом"""
+        self.directory = tmp_path
+        self.log = SegmentedLog(str(tmp_path), "gaze_log", ".txt", gaze_line_time,
+                                max_bytes=200, max_seconds=60, index_interval=10)
+
+    def _write_session(self):
+        for participant in ("1", "2"):
+            for second in range(60):
+                offset = 60 * int(participant) + second
+                self.log.append(line(offset, "center"), participant=participant)
+        self.log.close()
+
+    def test_rotation_and_compression(self):
+        """Тест ротации по размеру и сжатия закрытых сегментов"""
+        self._write_session()
+
+        assert len(self.log.segments()) > 1
+        assert not list(self.directory.glob("gaze_log.*.txt"))
+        with gzip.open(self.directory / "gaze_log.000001.txt.gz", "rt", encoding="utf-8") as f:
+            assert f.readline().rstrip("\n") == line(60, "center")
+
+    def test_rotation_by_duration(self):
+        """Тест ротации по длительности сегмента"""
+        log = SegmentedLog(str(self.directory), "other", ".txt", gaze_line_time, max_seconds=60, compress=False)
+        log.append(line(0, "center"))
+        log.append(line(59, "center"))
+        log.append(line(60, "center"))
+        log.close()
+
+        assert log.segments() == [1, 2]
+
+    def test_read_range_across_segments(self):
+        """Тест чтения интервала времени через границы сжатых сегментов"""
+        self._write_session()
+        reader = SegmentedLogReader(str(self.directory), "gaze_log", ".txt", gaze_line_time)
+
+        records = list(reader.read(BASE + 70, BASE + 100))
+
+        assert [record.timestamp - BASE for record in records] == list(range(70, 101))
+        assert all(record.participant == "1" for record in records)
+
+    def test_read_participant(self):
+        """Тест выборки записей одного участника"""
+        self._write_session()
+
+        records = list(self.log.read(participant="2"))
+
+        assert len(records) == 60
+        assert records[0].line == line(120, "center")
+
+    def test_read_seeks_by_index(self):
+        """Тест: чтение начинается с ближайшей точки индекса, а не с начала лога"""
+        self._write_session()
+        calls = []
+        timestamp_of = lambda text: calls.append(text) or gaze_line_time(text)
+        reader = SegmentedLogReader(str(self.directory), "gaze_log", ".txt", timestamp_of)
+
+        list(reader.read(BASE + 170, BASE + 175))
+
+        assert len(calls) < 20
+
+    def test_continue_numbering_after_restart(self):
+        """Тест продолжения нумерации сегментов после перезапуска"""
+        self._write_session()
+        count = len(self.log.segments())
+
+        log = SegmentedLog(str(self.directory), "gaze_log", ".txt", gaze_line_time)
+        log.append(line(200, "left"), participant="3")
+        log.close()
+
+        assert log.segments()[-1] == count + 1
+        assert [record.line for record in log.read(participant="3")] == [line(200, "left")]
+
+
+@patch.dict("main.CONFIG", {"log_segments": True, "log_compress": False})
+def test_data_logger_segments(tmp_path):
+    """Тест записи логов DataLogger в сегменты"""
+    logger = DataLogger(str(tmp_path))
+    logger.participant = "12"
+    logger.log_gaze_data("left")
+    logger.log_behavior({"suspicious_actions": 1})
+    logger.save_logs_to_file()
+    logger.close()
+
+    gaze = list(logger.gaze_store.read(participant="12"))
+    behavior = list(logger.behavior_store.read())
+    assert gaze[0].line.endswith(": left")
+    assert json.loads(behavior[0].line)["data"] == {"suspicious_actions": 1}
+    assert not (tmp_path / "gaze_log.txt").exists()
@@ -0,0 +1,125 @@
+import time
+import urllib.request
+import pytest
+from unittest.mock import Mock, patch
+from frame_sources import SyntheticSource
+from metrics import MetricsRegistry, MetricsServer
+from main import MainApp, GazeTracker, DataLogger
+
+
+class TestMetricsRegistry:
+
+    def setup_method(self):
+        """Настройка перед каждым тестом"""
+        self.registry = MetricsRegistry()
+
+    def test_counter_with_labels(self):
+        """Тест счетчика с метками"""
+        counter = self.registry.counter("detections_total", "Срабатывания", labels=("participant",))
+        counter.inc("12")
+        counter.inc("12")
+        counter.inc("7", amount=3)
+
+        text = self.registry.render()
+        assert "# TYPE detections_total counter" in text
+        assert 'detections_total{participant="12"} 2' in text
+        assert 'detections_total{participant="7"} 3' in text
+
+    def test_label_escaping(self):
+        """Тест экранирования обратной косой черты, кавычек и переводов строки в значениях меток"""
+        self.registry.counter("marks_total", "Отметки", labels=("participant",)).inc('a"b\\c\nd')
+
+        assert 'marks_total{participant="a\\"b\\\\c\\nd"} 1' in self.registry.render()
+
+    def test_callback_counter(self):
+        """Тест счетчика, который читается функцией в момент запроса"""
+        values = {"frames": 1}
+        self.registry.callback_counter("frames_total", "Кадры", lambda: values["frames"])
+        values["frames"] = 5
+
+        text = self.registry.render()
+        assert "# TYPE frames_total counter" in text
+        assert "frames_total 5" in text
+
+    def test_histogram(self):
+        """Тест накопительных корзин гистограммы"""
+        histogram = self.registry.histogram("latency_seconds", "Задержка", buckets=(0.01, 0.1), label="stage")
+        for value in (0.005, 0.05, 0.5):
+            histogram.observe(value, "capture")
+
+        text = self.registry.render()
+        assert 'latency_seconds_bucket{stage="capture",le="0.01"} 1' in text
+        assert 'latency_seconds_bucket{stage="capture",le="0.1"} 2' in text
+        assert 'latency_seconds_bucket{stage="capture",le="+Inf"} 3' in text
+        assert 'latency_seconds_count{stage="capture"} 3' in text
+
+    def test_gauge_reads_on_render(self):
+        """Тест: значение показателя читается в момент запроса"""
+        values = {"frames": 1}
+        self.registry.gauge("frames_total", "Кадры", lambda: values["frames"])
+        values["frames"] = 5
+
+        assert "frames_total 5" in self.registry.render()
+
+    def test_http_endpoint(self):
+        """Тест отдачи метрик по HTTP"""
+        self.registry.counter("requests_total", "Запросы").inc()
+        server = MetricsServer(self.registry, "127.0.0.1:0")
+        server.start()
+        try:
+            url = "http://{}:{}/metrics".format(*server.server_address)
+            with urllib.request.urlopen(url, timeout=5) as response:
+                assert response.headers["Content-Type"].startswith("text/plain")
+                assert "requests_total 1" in response.read().decode("utf-8")
+        finally:
+            server.close()
+
+
+@patch.dict("main.CONFIG", {"metrics_address": "127.0.0.1:0"})
+def test_main_app_metrics(tmp_path):
+    """Тест метрик MainApp: этапы кадра, доля найденных лиц и срабатывания по участникам"""
+    app = MainApp(GazeTracker(debug=False), DataLogger(str(tmp_path)))
+    app.participant = "4"
+    app.gaze_tracker.camera = Mock()
+    app.gaze_tracker.camera.read.return_value = (True, Mock())
+    app.gaze_tracker.gaze = Mock(face=None)
+    app.gaze_tracker.calibrated = True
+    app.gaze_tracker.horizontal_center = app.gaze_tracker.vertical_center = 0.5
+    app.gaze_tracker.gaze.horizontal_ratio.return_value = 0.9
+    app.gaze_tracker.gaze.vertical_ratio.return_value = 0.5
+    app.behavior_analyzer.min_consecutive_offcenter = 1
+
+    app.step()
+    text = app.metrics.render()
+
+    assert 'gaze_stage_latency_seconds_count{stage="total"} 1' in text
+    assert "gaze_face_detection_hit_ratio 0.0" in text
+    assert 'gaze_detections_total{participant="4"} 1' in text
+    assert "# TYPE gaze_frames_captured_total counter" in text
+    assert "gaze_frames_captured_total 1" in text
+    assert 'gaze_calibration_state{state="waiting"} 1' in text
+    assert 'gaze_logger_queue_depth{log="gaze"} 1' in text
+
+
+@patch.dict("main.CONFIG", {"metrics_address": "127.0.0.1:0"})
+def test_dropped_frames_metric(tmp_path):
+    """Тест: счетчик пропущенных кадров берется из источника и не убывает после статистики"""
+    app = MainApp(GazeTracker(debug=False), DataLogger(str(tmp_path)))
+    app.gaze_tracker.camera = SyntheticSource(count=10, fps=30)
+    app.gaze_tracker.camera.read()
+    app.gaze_tracker.camera.frame_index += 2
+    app.gaze_tracker.camera.read()
+    app.gaze_tracker.camera.stats()
+
+    assert "gaze_frames_dropped_total 2" in app.metrics.render()
+
+
+def test_observe_overhead():
+    """Тест: учет метрик кадра занимает микросекунды"""
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Задержка", label="stage")
+
+    start = time.perf_counter()
+    for _ in range(10000):
+        histogram.observe(0.003, "capture")
+    assert (time.perf_counter() - start) / 10000 < 50e-6
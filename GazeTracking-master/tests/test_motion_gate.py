@@ -0,0 +1,92 @@
+import pytest
+import numpy as np
+import dlib
+from unittest.mock import Mock
+from gaze_tracking import MotionGate
+from main import GazeTracker
+
+
+class TestMotionGate:
+
+    def setup_method(self):
+        """Настройка перед каждым тестом"""
+        self.gate = MotionGate(threshold=4.0, max_reuse=3)
+        self.frame = np.full((120, 160, 3), 100, np.uint8)
+
+    def test_first_frame_not_reused(self):
+        """Тест: первый кадр всегда анализируется"""
+        assert not self.gate.can_reuse(self.frame)
+        assert self.gate.streak == 0
+
+    def test_static_scene_reused(self):
+        """Тест переиспользования результата для неизменной сцены"""
+        self.gate.can_reuse(self.frame)
+
+        assert self.gate.can_reuse(self.frame.copy())
+        assert self.gate.streak == 1
+
+    def test_changed_scene_not_reused(self):
+        """Тест: изменение сцены требует полного анализа"""
+        self.gate.can_reuse(self.frame)
+
+        changed = self.frame.copy()
+        changed[:, :80] = 200
+        assert not self.gate.can_reuse(changed)
+        assert self.gate.streak == 0
+
+    def test_max_reuse_streak(self):
+        """Тест ограничения длины серии переиспользований"""
+        self.gate.can_reuse(self.frame)
+        for _ in range(self.gate.max_reuse):
+            assert self.gate.can_reuse(self.frame)
+
+        assert not self.gate.can_reuse(self.frame)
+        assert self.gate.streak == 0
+
+    def test_change_outside_face_ignored(self):
+        """Тест: изменения вне области лица не учитываются"""
+        face = dlib.rectangle(10, 10, 50, 50)
+        self.gate.can_reuse(self.frame, face)
+
+        changed = self.frame.copy()
+        changed[:, 100:] = 255
+        assert self.gate.can_reuse(changed, face)
+
+    def test_frame_size_change_resets(self):
+        """Тест сброса эталона при изменении размера кадра"""
+        self.gate.can_reuse(self.frame)
+
+        assert not self.gate.can_reuse(np.full((240, 320, 3), 100, np.uint8))
+
+
+class TestGazeTrackerMotionGating:
+
+    def setup_method(self):
+        """Настройка перед каждым тестом"""
+        self.gaze_tracker = GazeTracker(debug=False)
+        self.gaze_tracker.motion_gate = MotionGate(threshold=4.0, max_reuse=2)
+        self.gaze_tracker.calibrated = True
+        self.gaze_tracker.gaze = Mock(face=None)
+        self.gaze_tracker.gaze.horizontal_ratio.return_value = 0.5
+        self.gaze_tracker.gaze.vertical_ratio.return_value = 0.5
+        self.gaze_tracker.camera = Mock()
+        self.gaze_tracker.camera.read.return_value = (True, np.full((120, 160, 3), 100, np.uint8))
+
+    def test_reused_samples_skip_refresh(self):
+        """Тест: при неизменной сцене анализ кадра не выполняется"""
+        for _ in range(3):
+            assert self.gaze_tracker.detect_gaze() == "center"
+
+        assert self.gaze_tracker.gaze.refresh.call_count == 1
+        assert self.gaze_tracker.last_sample_reused
+        assert self.gaze_tracker.frames_reused == 2
+
+    def test_skip_rate(self):
+        """Тест расчета доли пропущенных кадров"""
+        assert self.gaze_tracker.skip_rate == 0.0
+
+        for _ in range(6):
+            self.gaze_tracker.detect_gaze()
+
+        assert self.gaze_tracker.frames_total == 6
+        assert self.gaze_tracker.skip_rate == pytest.approx(4 / 6)
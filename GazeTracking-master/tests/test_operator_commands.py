@@ -0,0 +1,125 @@
+import pytest
+import socket
+import time
+import numpy as np
+from unittest.mock import Mock, patch
+from main import CenterCalibrator, OperatorCommands, DebugRenderer, GazeTracker, MainApp
+
+
+class TestOperatorCommands:
+
+    def setup_method(self):
+        """Настройка перед каждым тестом"""
+        self.commands = OperatorCommands()
+
+    def teardown_method(self):
+        self.commands.close()
+
+    @pytest.mark.parametrize("line, expected", [
+        ("participant 12", ("participant", "12")),
+        ("12\n", ("participant", "12")),
+        ("mark", ("mark", None)),
+        ("X", ("mark", None)),
+        ("stop", ("stop", None)),
+        ("calibrate", ("calibrate", None)),
+        ("", None),
+        ("unknown command", None),
+    ])
+    def test_parse(self, line, expected):
+        """Тест разбора текстовых команд"""
+        assert OperatorCommands.parse(line) == expected
+
+    def test_push_key(self):
+        """Тест перевода клавиш отладочного окна в команды"""
+        self.commands.push_key(ord('x'))
+        self.commands.push_key(-1)
+        self.commands.push_key(ord('c'))
+        self.commands.push_key(ord('r'))
+
+        assert self.commands.drain() == [("mark", None), ("confirm", None), ("calibrate", None)]
+        assert self.commands.drain() == []
+
+    def test_socket_commands(self):
+        """Тест приема команд через локальный TCP-сокет"""
+        self.commands.start_socket("127.0.0.1:0")
+        port = self.commands._server.server_address[1]
+
+        with socket.create_connection(("127.0.0.1", port)) as client:
+            client.sendall(b"participant 7\nmark\n")
+
+        assert self.commands.wait(timeout=2) == ("participant", "7")
+        assert self.commands.wait(timeout=2) == ("mark", None)
+
+
+class TestDebugRenderer:
+
+    def test_render(self):
+        """Тест отрисовки уменьшенного отладочного кадра"""
+        renderer = DebugRenderer(OperatorCommands(), (80, 60))
+        frame = np.zeros((120, 160, 3), np.uint8)
+
+        debug_frame = renderer.render(frame, ((40, 40), None), {"direction": "center"})
+
+        assert debug_frame.shape == (60, 80, 3)
+        assert debug_frame[20, 20, 1] == 255
+
+    def test_submit_keeps_reference(self):
+        """Тест: передача кадра в отрисовку не копирует его"""
+        renderer = DebugRenderer(OperatorCommands(), (80, 60))
+        frame = np.zeros((120, 160, 3), np.uint8)
+
+        renderer.submit(frame, (None, None), {"direction": "center"})
+
+        assert renderer._latest[0] is frame
+
+
+class TestHeadlessMode:
+
+    @patch.dict("main.CONFIG", {"headless": True})
+    def test_headless_tracker_has_no_window(self):
+        """Тест: в режиме без окна отладочный вывод отключен"""
+        gaze_tracker = GazeTracker()
+
+        assert gaze_tracker.renderer is None
+        assert not gaze_tracker.debug
+
+    @patch.dict("main.CONFIG", {"headless": True})
+    def test_headless_detect_gaze_skips_annotation(self):
+        """Тест: в режиме без окна кадр не аннотируется и не копируется"""
+        gaze_tracker = GazeTracker()
+        gaze_tracker.camera = Mock()
+        gaze_tracker.camera.read.return_value = (True, Mock())
+        gaze_tracker.gaze = Mock()
+
+        with patch("cv2.waitKey") as mock_wait_key:
+            gaze_tracker.detect_gaze()
+            mock_wait_key.assert_not_called()
+
+        gaze_tracker.gaze.annotated_frame.assert_not_called()
+
+    def test_handle_commands(self):
+        """Тест обработки команд оператора в основном цикле"""
+        app = MainApp()
+        app.commands.push("mark")
+        app.commands.push("stop")
+
+        with patch.object(app, "mark_cheating") as mock_mark:
+            with pytest.raises(KeyboardInterrupt):
+                app.handle_commands()
+            mock_mark.assert_called_once()
+
+    def test_confirm_starts_calibration_then_stops(self):
+        """Тест: 'c' запускает калибровку, во время нее игнорируется, а после завершения останавливает приложение"""
+        app = MainApp()
+        app.commands.push_key(ord('c'))
+        app.handle_commands()
+        assert app.gaze_tracker.calibrator.sampling
+
+        app.commands.push_key(ord('c'))
+        app.handle_commands()
+        assert app.gaze_tracker.calibrator.sampling
+
+        app.gaze_tracker.calibrator.state = CenterCalibrator.DONE
+        app.commands.push_key(ord('c'))
+        with pytest.raises(KeyboardInterrupt):
+            app.handle_commands()
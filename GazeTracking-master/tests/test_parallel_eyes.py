@@ -0,0 +1,79 @@
+import threading
+import numpy as np
+from gaze_tracking import GazeTracking
+from gaze_tracking.calibration import Calibration
+from conftest import make_face_frame
+from main import GazeTracker
+
+
+class TestParallelEyes:
+
+    def test_same_results_as_sequential(self, synthetic_models):
+        """Тест: параллельная обработка глаз дает те же результаты"""
+        sequential = GazeTracking(*synthetic_models)
+        parallel = GazeTracking(*synthetic_models, parallel_eyes=True)
+
+        for offset in [-6, -3, 0, 3, 6] * 5:
+            frame = make_face_frame(offset)
+            sequential.refresh(frame)
+            parallel.refresh(frame)
+
+            assert parallel.pupils_located == sequential.pupils_located
+            assert parallel.pupil_left_coords() == sequential.pupil_left_coords()
+            assert parallel.pupil_right_coords() == sequential.pupil_right_coords()
+            assert parallel.horizontal_ratio() == sequential.horizontal_ratio()
+
+        assert parallel.calibration.thresholds_left == sequential.calibration.thresholds_left
+        assert parallel.calibration.thresholds_right == sequential.calibration.thresholds_right
+
+    def test_no_face(self, synthetic_models):
+        """Тест параллельного режима без лица в кадре"""
+        gaze = GazeTracking(lambda frame: [], synthetic_models[1], parallel_eyes=True)
+        gaze.refresh(make_face_frame())
+
+        assert gaze.eye_left is None
+        assert gaze.eye_right is None
+
+    def test_close_stops_worker(self, synthetic_models):
+        """Тест: close() останавливает поток глаза, дальнейший анализ идет последовательно"""
+        gaze = GazeTracking(*synthetic_models, parallel_eyes=True)
+        gaze.refresh(make_face_frame())
+        executor = gaze._eye_executor
+
+        gaze.close()
+        gaze.refresh(make_face_frame(3))
+
+        assert executor._shutdown
+        assert not any(thread.is_alive() for thread in executor._threads)
+        assert gaze.pupils_located
+        gaze.close()
+
+    def test_release_camera_closes_gaze(self, synthetic_models):
+        """Тест: освобождение камеры трекера закрывает поток глаза"""
+        gaze_tracker = GazeTracker(debug=False, gaze=GazeTracking(*synthetic_models, parallel_eyes=True))
+        executor = gaze_tracker.gaze._eye_executor
+
+        gaze_tracker.release_camera()
+
+        assert executor._shutdown
+        assert gaze_tracker.gaze._eye_executor is None
+
+
+def test_calibration_concurrent_evaluate():
+    """Тест одновременной калибровки обоих глаз из разных потоков"""
+    calibration = Calibration()
+    eye_frame = np.full((30, 60), 200, np.uint8)
+    eye_frame[10:20, 25:35] = 10
+
+    def evaluate(side):
+        for _ in range(calibration.nb_frames):
+            calibration.evaluate(eye_frame, side)
+
+    threads = [threading.Thread(target=evaluate, args=(side,)) for side in (0, 1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calibration.is_complete()
+    assert calibration.threshold(0) == calibration.threshold(1)
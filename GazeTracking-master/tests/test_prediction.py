@@ -0,0 +1,124 @@
+import itertools
+import dlib
+import numpy as np
+import pytest
+from unittest.mock import Mock, patch
+from gaze_tracking import GazePredictor, MotionGate
+from main import GazeTracker
+
+
+class TestGazePredictor:
+
+    def setup_method(self):
+        """Настройка перед каждым тестом"""
+        self.predictor = GazePredictor(max_std=0.05)
+
+    def test_not_confident_without_measurements(self):
+        """Тест: без измерений предсказание не выполняется"""
+        assert not self.predictor.confident(0.0)
+
+    def test_velocity_needs_second_measurement(self):
+        """Тест: после первого измерения скорость неизвестна и неопределенность велика"""
+        self.predictor.update(0.5, 0.5, 0.0)
+
+        assert not self.predictor.confident(0.1)
+        self.predictor.update(0.52, 0.5, 0.1)
+        assert self.predictor.confident(0.2)
+
+    def test_constant_velocity_prediction(self):
+        """Тест предсказания равномерного движения взгляда"""
+        for step in range(10):
+            self.predictor.update(0.4 + 0.01 * step, 0.6 - 0.01 * step, 0.1 * step)
+
+        horizontal, vertical = self.predictor.predict(1.0)
+        assert horizontal == pytest.approx(0.5, abs=0.005)
+        assert vertical == pytest.approx(0.5, abs=0.005)
+
+    def test_uncertainty_grows_with_gap(self):
+        """Тест роста неопределенности и ограничения на время без измерений"""
+        for step in range(5):
+            self.predictor.update(0.5, 0.5, 0.1 * step)
+
+        assert self.predictor.std(0.5) < self.predictor.std(1.5)
+        assert not self.predictor.confident(0.4 + self.predictor.max_gap + 0.1)
+
+    def test_reset(self):
+        """Тест сброса состояния фильтра"""
+        self.predictor.update(0.5, 0.5, 0.0)
+        self.predictor.reset()
+
+        assert self.predictor.time is None
+        assert not self.predictor.confident(0.0)
+
+
+class TestGazeTrackerPrediction:
+
+    def setup_method(self):
+        """Настройка перед каждым тестом"""
+        self.gaze_tracker = GazeTracker(debug=False)
+        self.gaze_tracker.predictor = GazePredictor(max_std=0.05)
+        self.gaze_tracker.prediction_gate = MotionGate(threshold=4.0, max_reuse=2)
+        self.gaze_tracker.calibrated = True
+        self.gaze_tracker.gaze = Mock(face=None)
+        self.gaze_tracker.gaze.horizontal_ratio.return_value = 0.5
+        self.gaze_tracker.gaze.vertical_ratio.return_value = 0.5
+        self.gaze_tracker.camera = Mock()
+        self.frame = np.full((120, 160, 3), 100, np.uint8)
+        self.gaze_tracker.camera.read.return_value = (True, self.frame)
+
+    def run(self, frames):
+        with patch("time.time", side_effect=itertools.count(100.0, 0.1).__next__):
+            return [self.gaze_tracker.detect_gaze() for _ in range(frames)]
+
+    def test_full_analysis_every_kth_frame(self):
+        """Тест: при неизменной сцене полный анализ выполняется раз в prediction_interval кадров"""
+        results = self.run(11)
+
+        assert results == ["center"] * 11
+        # Первые два кадра нужны для оценки скорости, дальше анализируется каждый третий
+        assert self.gaze_tracker.gaze.refresh.call_count == 5
+        assert self.gaze_tracker.frames_predicted == 6
+        assert self.gaze_tracker.frames_reused == 6
+
+    def test_motion_forces_analysis(self):
+        """Тест: изменение сцены требует полного анализа"""
+        frames = itertools.cycle([self.frame, np.full((120, 160, 3), 200, np.uint8)])
+        self.gaze_tracker.camera.read.side_effect = lambda: (True, next(frames))
+
+        self.run(6)
+
+        assert self.gaze_tracker.gaze.refresh.call_count == 6
+        assert self.gaze_tracker.frames_predicted == 0
+
+    def test_motion_gate_decides_analysis(self):
+        """Тест: с детектором движения анализ пропускает он, предсказание заменяет пропущенные кадры"""
+        self.gaze_tracker.motion_gate = MotionGate(threshold=4.0, max_reuse=4)
+
+        results = self.run(12)
+
+        assert results == ["center"] * 12
+        assert self.gaze_tracker.gaze.refresh.call_count == 3
+        assert self.gaze_tracker.frames_reused == 9
+        assert 0 < self.gaze_tracker.frames_predicted < 9
+
+    def test_renderer_gets_current_frame(self):
+        """Тест: на пропущенном кадре оператору показывается текущий кадр, а не последний проанализированный"""
+        frames = [self.frame.copy() for _ in range(4)]
+        self.gaze_tracker.camera.read.side_effect = [(True, frame) for frame in frames]
+        self.gaze_tracker.renderer = Mock()
+
+        self.run(4)
+
+        assert self.gaze_tracker.frames_reused > 0
+        assert [call.args[0] for call in self.gaze_tracker.renderer.submit.call_args_list] == frames
+
+    def test_blink_resets_predictor(self):
+        """Тест: при моргании предсказание прекращается до новых измерений"""
+        self.run(3)
+        self.gaze_tracker.gaze.face = dlib.rectangle(40, 30, 120, 100)
+        self.gaze_tracker.gaze.horizontal_ratio.return_value = None
+        self.gaze_tracker.gaze.vertical_ratio.return_value = None
+        self.gaze_tracker.prediction_gate.streak = self.gaze_tracker.prediction_gate.max_reuse
+
+        assert self.run(1) == ["blink"]
+        assert self.gaze_tracker.predictor.time is None
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+from conftest import make_face_frame
+from gaze_tracking import GazeTracking, SessionRecorder, direction, read_recording
+from main import GazeTracker
+from replay import replay_recording
+
+OFFSETS = [0, 0, 0, -9, -6, 0, 5, 9, 9, 0]
+
+
+def record_session(path, models, offsets=OFFSETS, chunk_size=4):
+    gaze = GazeTracking(*models)
+    gaze.recorder = SessionRecorder(str(path), chunk_size)
+    ratios = []
+    for offset in offsets:
+        gaze.refresh(make_face_frame(offset))
+        ratios.append((gaze.horizontal_ratio(), gaze.vertical_ratio(), gaze.pupil_left_coords()))
+    gaze.recorder.close()
+    return gaze.recorder, ratios
+
+
+class TestSessionRecorder:
+
+    def test_round_trip(self, tmp_path, synthetic_models):
+        """Тест: из записи читаются все кадры с ориентирами и кадрами глаз"""
+        recorder, _ = record_session(tmp_path / "session.gazerec", synthetic_models)
+
+        frames = list(read_recording(recorder.path))
+
+        assert len(frames) == recorder.frames == len(OFFSETS)
+        assert frames[0].landmarks.shape == (68, 2)
+        assert len(frames[0].crops) == 2
+        assert frames[0].crops[0].dtype == np.uint8
+        assert [frame.timestamp for frame in frames] == sorted(frame.timestamp for frame in frames)
+
+    def test_frames_without_face(self, tmp_path, synthetic_models):
+        """Тест записи кадров без лица"""
+        gaze = GazeTracking(lambda frame, *args: [], synthetic_models[1])
+        gaze.recorder = SessionRecorder(str(tmp_path / "session.gazerec"))
+        gaze.refresh(make_face_frame())
+        gaze.recorder.close()
+
+        frames = list(read_recording(gaze.recorder.path))
+        assert len(frames) == 1
+        assert frames[0].landmarks is None
+
+    def test_truncated_file(self, tmp_path, synthetic_models):
+        """Тест: прерванная запись читается до последнего целого блока"""
+        recorder, _ = record_session(tmp_path / "session.gazerec", synthetic_models)
+        with open(recorder.path, "r+b") as f:
+            f.truncate(recorder.bytes_written - 20)
+
+        assert len(list(read_recording(recorder.path))) == 8
+
+    def test_not_a_recording(self, tmp_path):
+        """Тест ошибки для файла другого формата"""
+        path = tmp_path / "log.txt"
+        path.write_text("2024-01-01 10:00:00: center")
+        with pytest.raises(ValueError):
+            list(read_recording(str(path)))
+
+    def test_smaller_than_frames(self, tmp_path, synthetic_models):
+        """Тест: запись много меньше исходных кадров"""
+        recorder, _ = record_session(tmp_path / "session.gazerec", synthetic_models)
+
+        assert recorder.bytes_written < make_face_frame().nbytes * len(OFFSETS) / 20
+
+
+class TestRecordedReplay:
+
+    def test_reproduces_live_ratios(self, tmp_path, synthetic_models):
+        """Тест: анализ записи дает те же зрачки и отношения, что и анализ кадров"""
+        recorder, expected = record_session(tmp_path / "session.gazerec", synthetic_models)
+        gaze = GazeTracking(*synthetic_models)
+
+        for record, (horizontal, vertical, left) in zip(read_recording(recorder.path), expected):
+            gaze.refresh_recorded(record)
+            assert gaze.horizontal_ratio() == pytest.approx(horizontal)
+            assert gaze.vertical_ratio() == pytest.approx(vertical)
+            assert gaze.pupil_left_coords() == left
+
+    def test_replay_recording(self, tmp_path, synthetic_models):
+        """Тест: повторный анализ записи выполняется без моделей и находит направления"""
+        offsets = [0] * 20 + [-9] * 5 + [9] * 5
+        recorder, _ = record_session(tmp_path / "session.gazerec", synthetic_models, offsets)
+
+        result = replay_recording(recorder.path)
+
+        assert result["frames"] == 30
+        names = set(direction.to_names(result["codes"][20:]))
+        assert "center" not in names
+        assert direction.to_name(result["codes"][-1]) in ("left", "right")
+
+    def test_replay_with_calibrated_tracker(self, tmp_path, synthetic_models):
+        """Тест: откалиброванный трекер не калибруется заново"""
+        recorder, _ = record_session(tmp_path / "session.gazerec", synthetic_models, [0] * 5)
+        gaze_tracker = GazeTracker(debug=False, gaze=GazeTracking(*synthetic_models))
+        gaze_tracker.calibrated = True
+
+        result = replay_recording(recorder.path, gaze_tracker=gaze_tracker)
+
+        assert not gaze_tracker.calibrator.sampling
+        assert (result["codes"] != direction.NOT_CALIBRATED).all()
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from main import BehaviorAnalyzer
+from replay import parse_gaze_log, parameter_grid, replay_session, sweep
+
+LOG = """2025-06-30 03:03:43: Номер участника: 7
+2025-06-30 03:03:49: center
+2025-06-30 03:03:49: left [reused]
+2025-06-30 03:03:50: Отмечена попытка списывания (по нажатию X)
+2025-06-30 03:03:50: left down
+2025-06-30 03:03:51: blink
+2025-06-30 03:04:10: Номер участника: 8
+2025-06-30 03:04:11: right
+"""
+
+
+def reference_detections(directions, **parameters):
+    """Срабатывания исходного BehaviorAnalyzer, как в MainApp.step"""
+    analyzer = BehaviorAnalyzer(**parameters)
+    detections = []
+    for index, direction in enumerate(directions):
+        analyzer.analyze_gaze_pattern(direction)
+        if analyzer.detect_cheating():
+            analyzer.generate_report()
+            detections.append(index)
+    return detections
+
+
+class TestReplay:
+
+    def test_parse_gaze_log(self):
+        """Тест разбора лога на сеансы участников"""
+        first, second = parse_gaze_log(LOG.splitlines())
+
+        assert first.participant == "7"
+        assert first.offcenter.tolist() == [False, True, True, False]
+        assert first.center.tolist() == [True, False, False, False]
+        assert first.reused.tolist() == [False, True, False, False]
+        assert first.marks.tolist() == [first.times[2]]
+        assert second.participant == "8" and len(second) == 1
+
+    def test_matches_behavior_analyzer(self):
+        """Тест: результаты для каждой конфигурации совпадают с BehaviorAnalyzer"""
+        rng = np.random.default_rng(1)
+        directions = list(rng.choice(["center", "left", "right down", "blink"], 400, p=[0.5, 0.3, 0.15, 0.05]))
+        lines = ["2025-01-01 10:00:00: Номер участника: 1"]
+        lines += [f"2025-01-01 10:{index // 600:02d}:{index // 10 % 60:02d}: {direction}"
+                  for index, direction in enumerate(directions)]
+        session = parse_gaze_log(lines)[0]
+        grid = parameter_grid(max_suspicious_actions=[1, 2, 3], analysis_window=[0.1, 0.7, 1.0, 1.5, 3.0],
+                              offcenter_threshold=[0.3, 0.7], min_consecutive_offcenter=[2, 5])
+
+        result = replay_session(session, grid, sample_interval=0.1)
+
+        for index in range(len(grid["max_suspicious_actions"])):
+            parameters = {name: values[index].item() for name, values in grid.items()}
+            assert result["detections"][index] == len(reference_detections(directions, **parameters)), parameters
+
+    def test_scoring_like_parser_logs(self):
+        """Тест: отметка замечена, если срабатывание было в течение 10 секунд после нее"""
+        lines = ["2025-01-01 10:00:00: Номер участника: 1",
+                 "2025-01-01 10:00:01: Отмечена попытка списывания (по нажатию X)",
+                 "2025-01-01 10:00:30: Отмечена попытка списывания (по нажатию X)"]
+        lines += [f"2025-01-01 10:00:{second:02d}: left" for second in range(2, 20)]
+        grid = parameter_grid(max_suspicious_actions=[1, 100], min_consecutive_offcenter=[1])
+
+        totals = sweep(parse_gaze_log(lines), grid, sample_interval=0.1)
+
+        assert totals["total_manual_marks"].tolist() == [2, 2]
+        assert totals["total_real_attempts"].tolist() == [1, 0]
+        assert totals["total_detected_attempts"].tolist() == [18, 0]
+        assert totals["total_false_positives"].tolist() == [17, 0]
+
+    def test_parallel_sweep(self):
+        """Тест: результат не зависит от числа процессов и размера блоков сетки"""
+        sessions = parse_gaze_log(LOG.splitlines())
+        grid = parameter_grid(max_suspicious_actions=[1, 2], min_consecutive_offcenter=[1, 2, 3])
+
+        sequential = sweep(sessions, grid, sample_interval=0.1)
+        parallel = sweep(sessions, grid, sample_interval=0.1, workers=2, chunk_size=4)
+
+        for name in sequential:
+            assert sequential[name].tolist() == parallel[name].tolist()
+
+    def test_unknown_parameter(self):
+        """Тест неизвестного параметра сетки"""
+        with pytest.raises(ValueError):
+            parameter_grid(window=[1])
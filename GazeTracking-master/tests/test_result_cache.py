@@ -0,0 +1,199 @@
+import cv2
+import numpy as np
+from conftest import make_face_frame
+from gaze_tracking import GazeTracking
+from main import BehaviorAnalyzer, GazeTracker
+from replay import replay_video, stage_configs_from_config
+from result_cache import ResultCache, analyze_video_batch, stage_digests
+
+OFFSETS = [0] * 20 + [-9] * 5 + [9] * 5
+CONFIGS = {"faces": {"scale": 1.0}, "landmarks": {}, "pupils": {}}
+
+
+def write_video(path, offsets=OFFSETS):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 25, (320, 240))
+    for offset in offsets:
+        writer.write(make_face_frame(offset))
+    writer.release()
+    return str(path)
+
+
+class CountingModels:
+    """Синтетические модели с подсчетом вызовов"""
+
+    def __init__(self, models):
+        self.models = models
+        self.detections = 0
+        self.predictions = 0
+
+    def detector(self, frame, *args):
+        self.detections += 1
+        return self.models[0](frame, *args)
+
+    def predictor(self, frame, rect):
+        self.predictions += 1
+        return self.models[1](frame, rect)
+
+    def gaze(self):
+        return GazeTracking(self.detector, self.predictor)
+
+
+class TestResultCache:
+
+    def setup_method(self):
+        """Настройка перед каждым тестом"""
+        self.value = np.arange(14, dtype=np.float64).reshape(2, 7)
+
+    def test_get_put(self, tmp_path):
+        """Тест сохранения и чтения результата этапа"""
+        cache = ResultCache(str(tmp_path / "cache.sqlite"))
+
+        assert cache.get("file", 0, "pupils", "config") is None
+        cache.put("file", 0, "pupils", "config", self.value)
+
+        assert np.array_equal(cache.get("file", 0, "pupils", "config"), self.value)
+        assert cache.get("file", 0, "pupils", "other") is None
+        assert cache.stats()["stages"]["pupils"]["hits"] == 1
+        assert cache.stats()["misses"] == 2
+
+    def test_persistent(self, tmp_path):
+        """Тест: записи сохраняются между запусками"""
+        cache = ResultCache(str(tmp_path / "cache.sqlite"))
+        cache.put("file", 3, "faces", "config", self.value)
+        cache.close()
+
+        cache = ResultCache(str(tmp_path / "cache.sqlite"))
+        assert cache.entries == 1
+        assert np.array_equal(cache.get("file", 3, "faces", "config"), self.value)
+
+    def test_lru_eviction(self, tmp_path):
+        """Тест: при превышении лимита удаляются давно не читавшиеся записи"""
+        cache = ResultCache(str(tmp_path / "cache.sqlite"), max_entries=3)
+        for frame in range(3):
+            cache.put("file", frame, "pupils", "config", self.value)
+        cache.get("file", 0, "pupils", "config")
+        cache.put("file", 3, "pupils", "config", self.value)
+
+        assert cache.entries == 3
+        assert cache.evictions == 1
+        assert cache.get("file", 1, "pupils", "config") is None
+        assert cache.get("file", 0, "pupils", "config") is not None
+
+    def test_size_limit(self, tmp_path):
+        """Тест ограничения размера кэша в байтах"""
+        cache = ResultCache(str(tmp_path / "cache.sqlite"), max_bytes=1000)
+        for frame in range(10):
+            cache.put("file", frame, "pupils", "config", self.value)
+
+        assert 0 < cache.bytes <= 1000
+        assert cache.entries < 10
+        assert cache.bytes == sum(stage["bytes"] for stage in cache.stats()["stages"].values())
+
+    def test_file_digest(self, tmp_path):
+        """Тест: хэш зависит от содержимого файла, а не от имени"""
+        cache = ResultCache(str(tmp_path / "cache.sqlite"))
+        first, second = tmp_path / "a.avi", tmp_path / "b.avi"
+        first.write_bytes(b"video")
+        second.write_bytes(b"video")
+
+        assert cache.file_digest(str(first)) == cache.file_digest(str(second))
+        first.write_bytes(b"other video")
+        assert cache.file_digest(str(first)) != cache.file_digest(str(second))
+
+    def test_stage_digests_chain(self):
+        """Тест: изменение конфигурации этапа меняет хэши следующих этапов"""
+        digests = stage_digests(CONFIGS)
+        changed = stage_digests(dict(CONFIGS, faces={"scale": 0.5}))
+        pupils_only = stage_digests(dict(CONFIGS, pupils={"version": 2}))
+
+        assert all(digests[stage] != changed[stage] for stage in digests)
+        assert pupils_only["faces"] == digests["faces"]
+        assert pupils_only["landmarks"] == digests["landmarks"]
+        assert pupils_only["pupils"] != digests["pupils"]
+
+
+class TestCachedAnalysis:
+
+    def test_matches_uncached_analysis(self, tmp_path, synthetic_models):
+        """Тест: результат из кэша совпадает с анализом кадров"""
+        path = write_video(tmp_path / "video.avi")
+        capture = cv2.VideoCapture(path)
+        frames = [capture.read()[1] for _ in OFFSETS]
+        expected = GazeTracking(*synthetic_models).refresh_batch(frames)
+        cache = ResultCache(str(tmp_path / "cache.sqlite"))
+
+        first = analyze_video_batch(path, cache, GazeTracking(*synthetic_models), CONFIGS)
+        second = analyze_video_batch(path, cache, GazeTracking(*synthetic_models), CONFIGS)
+
+        for batch in (first, second):
+            assert np.array_equal(batch.face_found, expected.face_found)
+            assert np.allclose(batch.horizontal_ratio, expected.horizontal_ratio, equal_nan=True)
+        assert cache.stats()["stages"]["pupils"]["hits"] == len(OFFSETS)
+
+    def test_only_changed_stages_recomputed(self, tmp_path, synthetic_models):
+        """Тест: при изменении конфигурации зрачков детектор и модель ориентиров не запускаются"""
+        path = write_video(tmp_path / "video.avi")
+        cache = ResultCache(str(tmp_path / "cache.sqlite"))
+        models = CountingModels(synthetic_models)
+        analyze_video_batch(path, cache, models.gaze(), CONFIGS)
+        assert models.detections == models.predictions == len(OFFSETS)
+
+        analyze_video_batch(path, cache, models.gaze(), CONFIGS)
+        analyze_video_batch(path, cache, models.gaze(), dict(CONFIGS, pupils={"version": 2}))
+        assert models.detections == models.predictions == len(OFFSETS)
+
+        analyze_video_batch(path, cache, models.gaze(), dict(CONFIGS, faces={"scale": 0.5}))
+        assert models.detections == models.predictions == 2 * len(OFFSETS)
+
+    def test_faces_ignore_redetect_interval(self, tmp_path, synthetic_models):
+        """Тест: результат кадра не зависит от рамки лица, найденной на другом кадре"""
+        path = write_video(tmp_path / "video.avi")
+        cache = ResultCache(str(tmp_path / "cache.sqlite"))
+        models = CountingModels(synthetic_models)
+        gaze = models.gaze()
+        gaze.redetect_interval = 5
+
+        analyze_video_batch(path, cache, gaze, CONFIGS)
+
+        assert models.detections == len(OFFSETS)
+
+    def test_model_digest_in_config(self, tmp_path, synthetic_models):
+        """Тест: ключ этапа ориентиров зависит от содержимого файла модели"""
+        cache = ResultCache(str(tmp_path / "cache.sqlite"))
+        model = tmp_path / "model.dat"
+        model.write_bytes(b"model")
+        gaze = GazeTracking(*synthetic_models)
+
+        first = stage_configs_from_config(gaze, cache, str(model))
+        model.write_bytes(b"retrained model")
+        second = stage_configs_from_config(gaze, cache, str(model))
+
+        assert first["landmarks"]["model"] != second["landmarks"]["model"]
+        assert second["landmarks"]["model"] == cache.file_digest(str(model))
+        assert first["faces"] == second["faces"]
+
+    def test_frames_without_face(self, tmp_path, synthetic_models):
+        """Тест кэширования кадров без лица"""
+        path = write_video(tmp_path / "video.avi", [0] * 3)
+        cache = ResultCache(str(tmp_path / "cache.sqlite"))
+        gaze = GazeTracking(lambda frame, *args: [], synthetic_models[1])
+
+        for _ in range(2):
+            batch = analyze_video_batch(path, cache, gaze, CONFIGS)
+            assert not batch.face_found.any()
+            assert np.isnan(batch.horizontal_ratio).all()
+
+    def test_replay_video(self, tmp_path, synthetic_models):
+        """Тест: повторный анализ видео с другими параметрами BehaviorAnalyzer берет кадры из кэша"""
+        path = write_video(tmp_path / "video.avi")
+        cache = ResultCache(str(tmp_path / "cache.sqlite"))
+        models = CountingModels(synthetic_models)
+
+        for window in (1, 2):
+            gaze_tracker = GazeTracker(debug=False, gaze=models.gaze())
+            result = replay_video(path, cache, BehaviorAnalyzer(analysis_window=window), gaze_tracker)
+            assert result["frames"] == len(OFFSETS)
+            assert gaze_tracker.calibrated
+
+        assert models.detections == len(OFFSETS)
+        assert "Кэш" in cache.report()
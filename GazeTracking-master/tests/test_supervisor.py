@@ -0,0 +1,151 @@
+import pytest
+import time
+import numpy as np
+from unittest.mock import Mock
+from gaze_tracking.face_detector import HaarCascadeDetector
+from conftest import make_face_frame
+from frame_sources import SyntheticSource
+from main import CONFIG
+from supervisor import LockedModel, Supervisor, benchmark, parse_sources
+
+
+class TestSupervisor:
+
+    @pytest.fixture(autouse=True)
+    def setup_supervisor(self, tmp_path):
+        """Настройка перед каждым тестом"""
+        self.supervisor = Supervisor({"booth1": "0", "booth2": "1"}, workers=2, logs_dir=str(tmp_path))
+
+    def _feed(self, session, seq=1):
+        session._latest = (np.zeros((10, 10, 3), np.uint8), time.perf_counter(), seq)
+
+    def test_shared_models(self):
+        """Тест: все камеры используют общие модели"""
+        first, second = [session.app.gaze_tracker.gaze for session in self.supervisor.sessions]
+
+        assert first._face_detector is second._face_detector
+        assert first._predictor is second._predictor
+        assert first.calibration is not second.calibration
+
+    def test_detector_from_config(self, tmp_path, monkeypatch):
+        """Тест: детектор лица выбирается по конфигурации, вызовы моделей защищены блокировкой"""
+        monkeypatch.setitem(CONFIG, "face_detector", "haar")
+        monkeypatch.setitem(CONFIG, "face_detector_options", {})
+        supervisor = Supervisor({"booth1": "0"}, logs_dir=str(tmp_path))
+        gaze = supervisor.sessions[0].app.gaze_tracker.gaze
+
+        assert isinstance(gaze._face_detector, LockedModel)
+        assert isinstance(gaze._face_detector.model, HaarCascadeDetector)
+        assert isinstance(gaze._predictor, LockedModel)
+
+    def test_stop_stops_apps(self):
+        """Тест: при остановке каждая камера освобождается и ее приложение останавливается"""
+        for session in self.supervisor.sessions:
+            session.release = Mock()
+            session.app.stop = Mock()
+
+        self.supervisor.stop()
+
+        for session in self.supervisor.sessions:
+            session.release.assert_called_once_with()
+            session.app.stop.assert_called_once_with()
+
+    def test_isolated_state(self):
+        """Тест: анализатор и логгер у каждой камеры свои"""
+        first, second = self.supervisor.sessions
+
+        assert first.app.behavior_analyzer is not second.app.behavior_analyzer
+        assert first.app.logger.logs_dir != second.app.logger.logs_dir
+
+    def test_next_session_requires_new_frame(self):
+        """Тест: камера без нового кадра не планируется"""
+        assert self.supervisor.next_session(time.perf_counter()) is None
+
+        self._feed(self.supervisor.sessions[1])
+        assert self.supervisor.next_session(time.perf_counter()) is self.supervisor.sessions[1]
+
+    def test_next_session_fairness(self):
+        """Тест: выбирается камера, дольше всех ожидающая обработки"""
+        first, second = self.supervisor.sessions
+        self._feed(first)
+        self._feed(second)
+        first.last_served = 10.0
+        second.last_served = 5.0
+
+        assert self.supervisor.next_session(time.perf_counter()) is second
+
+        second.busy = True
+        assert self.supervisor.next_session(time.perf_counter()) is first
+
+    def test_next_session_respects_cadence(self):
+        """Тест: камера не обрабатывается чаще интервала анализа"""
+        session = self.supervisor.sessions[0]
+        self._feed(session)
+        session.next_due = time.perf_counter() + 10
+
+        assert self.supervisor.next_session(time.perf_counter()) is None
+
+    def test_step_updates_stats(self):
+        """Тест учета обработанных кадров и задержки"""
+        session = self.supervisor.sessions[0]
+        self._feed(session, seq=3)
+        session.app.gaze_tracker.calibrated = True
+        session.app.gaze_tracker.gaze = Mock()
+        session.app.gaze_tracker.gaze.horizontal_ratio.return_value = 0.5
+        session.app.gaze_tracker.gaze.vertical_ratio.return_value = 0.5
+
+        session.step()
+
+        assert not session.has_new_frame()
+        stats = session.stats(1.0)
+        assert stats["processed_fps"] == 1.0
+        assert stats["lag_ms"] >= 0.0
+        assert session.frames_processed == 0
+
+    def test_dropped_total(self):
+        """Тест: отчет показывает пропуски за интервал, общий счетчик не сбрасывается"""
+        session = self.supervisor.sessions[0]
+        session.frames_dropped = 3
+
+        assert session.stats(1.0)["dropped"] == 3
+        session.frames_dropped += 2
+        assert session.stats(1.0)["dropped"] == 2
+        assert session.frames_dropped == 5
+
+    def test_logs_dir_from_config(self, tmp_path, monkeypatch):
+        """Тест: каталог логов по умолчанию берется из конфигурации при создании супервизора"""
+        monkeypatch.setitem(CONFIG, "logs_dir", str(tmp_path / "logs"))
+
+        supervisor = Supervisor({"booth1": "0"})
+
+        assert supervisor.sessions[0].app.logger.logs_dir == str(tmp_path / "logs" / "booth1")
+
+    def test_source_end_finishes_session(self):
+        """Тест: когда источник заканчивается, поток захвата завершается, а супервизор - после обработки кадра"""
+        session = self.supervisor.sessions[0]
+        session.capture = SyntheticSource(3)
+        session._running.set()
+
+        session._capture_loop()
+
+        assert session.finished
+        assert session.frames_captured == 3
+        self.supervisor.sessions[1].finished = True
+        assert not self.supervisor.finished()
+        session._processed_seq = 3
+        assert self.supervisor.finished()
+
+
+def test_benchmark(synthetic_models):
+    """Тест замера пропускной способности с общими моделями"""
+    models = [LockedModel(model) for model in synthetic_models]
+
+    results = benchmark(models, [make_face_frame()] * 5, [1, 2])
+
+    assert list(results) == [1, 2]
+    assert all(fps > 0 for fps in results.values())
+
+
+def test_parse_sources():
+    """Тест разбора описаний камер"""
+    assert parse_sources(["booth1=0", "rtsp://host/stream"]) == {"booth1": "0", "camera1": "rtsp://host/stream"}
@@ -1,79 +1,152 @@
+import argparse
+import codecs
+import glob
+import gzip
+import hashlib
 import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from collections import Counter
 
+CACHE_VERSION = 2
+CHUNK_SIZE = 1 << 20
+# Сегменты лога после ротации (log_storage.SegmentedLog)
+SEGMENT_PATTERN = re.compile(r'^(?P<name>.+)\.(?P<segment>\d{6})\.jsonl(?:\.gz)?$')
 
-def parse_behavior_log(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        logs = json.load(f)
 
-    # Словарь для хранения результатов
-    participants = {}
+class HashingReader:
+    """Файл, обновляющий хэш при чтении: хэш считается по байтам файла, в том числе сжатого."""
+
+    def __init__(self, f, digest):
+        self.f = f
+        self.digest = digest
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.digest.update(data)
+        return data
+
 
-    # Временные переменные для хранения данных между итерациями
-    current_participant = None
-    cheating_marks = []
-    cheating_attempts = []
+def iter_log_entries(file_path, digest=None, chunk_size=CHUNK_SIZE):
+    """Потоковое чтение записей лога без загрузки всего файла в память.
+
+    Поддерживаются JSON-массив и формат JSON Lines (сегменты DataLogger), в том числе сжатые gzip.
+    Если передан digest (hashlib), он обновляется прочитанными байтами файла.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    with open(file_path, 'rb') as raw:
+        f = raw if digest is None else HashingReader(raw, digest)
+        if file_path.endswith('.gz'):
+            f = gzip.GzipFile(fileobj=f, mode='rb')
+        reader = codecs.getincrementaldecoder('utf-8')()
+        while True:
+            chunk = f.read(chunk_size)
+            buffer += reader.decode(chunk, final=not chunk)
+
+            position = 0
+            while True:
+                # Пропускаем пробелы, скобки массива и запятые между записями
+                while position < len(buffer) and buffer[position] in ' \t\r\n,[':
+                    position += 1
+                if position >= len(buffer) or buffer[position] == ']':
+                    break
+                try:
+                    entry, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise
+                    # Запись не поместилась в прочитанную часть файла
+                    break
+                yield entry
+            buffer = buffer[position:]
 
-    for log in logs:
-        timestamp_str = log['timestamp']
-        timestamp = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S")
+            if not chunk:
+                break
+        if digest is not None:
+            # Остаток файла после закрывающей скобки тоже входит в хэш
+            for chunk in iter(lambda: raw.read(chunk_size), b''):
+                digest.update(chunk)
+
+
+def new_events():
+    return {'marks': [], 'attempts': [], 'gaze_directions': {}}
+
+
+def collect_events(file_path, digest=None):
+    """Ручные отметки и срабатывания одного файла лога по участникам, без сопоставления.
+
+    Записи до первого начала сеанса собираются в 'leading': в сегменте после ротации
+    они относятся к участнику, сеанс которого начался в одном из предыдущих сегментов.
+    """
+    events = {'leading': new_events(), 'participants': {}, 'last_participant': None}
+    current = events['leading']
+
+    for log in iter_log_entries(file_path, digest):
         data = log['data']
 
         # Тип 1: Начало сессии респондента
         if 'participant_number' in data:
-            current_participant = data['participant_number']
-            if current_participant not in participants:
-                participants[current_participant] = {
-                    'manual_cheating_marks': 0,
-                    'detected_cheating_attempts': 0,
-                    'false_positives': 0,
-                    'gaze_directions': {}  # Будем хранить статистику по направлениям взгляда
-                }
+            events['last_participant'] = data['participant_number']
+            current = events['participants'].setdefault(data['participant_number'], new_events())
 
         # Тип 2: Ручная отметка о списывании
         elif 'event_type' in data and data['event_type'] == 'manual_cheating_mark':
-            if current_participant is not None:
-                participants[current_participant]['manual_cheating_marks'] += 1
-                cheating_marks.append((timestamp, current_participant))
+            current['marks'].append(log['timestamp'])
 
         # Тип 3: Попытка списать (обнаружена системой)
-        elif 'suspicious_actions' in data and 'gaze_history' in data:
-            if current_participant is not None:
-                cheating_attempts.append((timestamp, current_participant))
-
-                # Находим самое частое направление взгляда
-                gaze_counter = Counter(data['gaze_history'])
-                most_common_direction = gaze_counter.most_common(1)[0][0]
-
-                # Увеличиваем счетчик для этого направления
-                if most_common_direction in participants[current_participant]['gaze_directions']:
-                    participants[current_participant]['gaze_directions'][most_common_direction] += 1
-                else:
-                    participants[current_participant]['gaze_directions'][most_common_direction] = 1
-
-    for mark_time, participant in cheating_marks:
-        # Ищем автоматические обнаружения в течение 10 секунд после ручной отметки
-        detected = False
-        for attempt_time, attempt_participant in cheating_attempts:
-            if attempt_participant == participant:
-                time_diff = (attempt_time - mark_time).total_seconds()
-                if 0 <= time_diff <= 10:
-                    detected = True
-                    break
+        elif 'suspicious_actions' in data and ('gaze_history' in data or 'gaze_durations' in data):
+            current['attempts'].append(log['timestamp'])
 
-        if detected:
-            participants[participant]['detected_cheating_attempts'] += 1
+            # Находим самое частое направление взгляда: в новых отчетах длительности уже посчитаны
+            if 'gaze_durations' in data:
+                if not data['gaze_durations']:
+                    continue
+                most_common_direction = max(data['gaze_durations'], key=data['gaze_durations'].get)
+            else:
+                most_common_direction = Counter(data['gaze_history']).most_common(1)[0][0]
 
-    for participant in participants:
-        # Общее количество автоматических обнаружений для этого участника
-        total_attempts = sum(1 for _, p in cheating_attempts if p == participant)
+            # Увеличиваем счетчик для этого направления
+            directions = current['gaze_directions']
+            directions[most_common_direction] = directions.get(most_common_direction, 0) + 1
 
-        participants[participant]['false_positives'] = total_attempts - participants[participant][
-            'detected_cheating_attempts']
+    return events
 
+
+def merge_events(first, second):
+    """Объединение событий одного участника из разных файлов."""
+    directions = dict(first['gaze_directions'])
+    for direction, count in second['gaze_directions'].items():
+        directions[direction] = directions.get(direction, 0) + count
+    return {'marks': first['marks'] + second['marks'], 'attempts': first['attempts'] + second['attempts'],
+            'gaze_directions': directions}
+
+
+def score_events(participants_events):
+    """Сопоставление ручных отметок со срабатываниями по всем событиям каждого участника."""
+    participants = {}
+    for participant, events in participants_events.items():
+        marks = [datetime.strptime(mark, "%Y-%m-%d %H:%M:%S") for mark in events['marks']]
+        attempts = [datetime.strptime(attempt, "%Y-%m-%d %H:%M:%S") for attempt in events['attempts']]
+
+        # Отметка замечена, если автоматическое обнаружение было в течение 10 секунд после нее
+        detected = sum(1 for mark_time in marks
+                       if any(0 <= (attempt_time - mark_time).total_seconds() <= 10 for attempt_time in attempts))
+        participants[participant] = {
+            'manual_cheating_marks': len(marks),
+            'detected_cheating_attempts': detected,
+            'false_positives': len(attempts) - detected,
+            'gaze_directions': dict(events['gaze_directions'])
+        }
     return participants
 
+
+def parse_behavior_log(file_path, digest=None):
+    """Результаты по участникам для одного файла лога."""
+    return score_events(collect_events(file_path, digest)['participants'])
+
 def calculate_total_stats(stats_file):
     if isinstance(stats_file, str):
         with open(stats_file, 'r', encoding='utf-8') as f:
@@ -107,8 +180,206 @@ def print_total_stats(total_stats):
     print(f"4. Всего ложных срабатываний: {total_stats['total_false_positives']}")
 
 
-result = parse_behavior_log('../../behavior_log2.json')
-print(json.dumps(result, indent=2, ensure_ascii=False))
 
-total_stats = calculate_total_stats('../../test_result.json')
-print_total_stats(total_stats)
\ No newline at end of file
+def merge_results(first, second):
+    """Объединение результатов по участникам независимых сеансов (ассоциативно и коммутативно).
+
+    Отметки и срабатывания одного сеанса в разных файлах нужно объединять до сопоставления (aggregate_logs).
+    """
+    merged = {participant: dict(data, gaze_directions=dict(data['gaze_directions']))
+              for participant, data in first.items()}
+    for participant, data in second.items():
+        if participant not in merged:
+            merged[participant] = dict(data, gaze_directions=dict(data['gaze_directions']))
+            continue
+        target = merged[participant]
+        for key in ('manual_cheating_marks', 'detected_cheating_attempts', 'false_positives'):
+            target[key] += data[key]
+        for direction, count in data['gaze_directions'].items():
+            target['gaze_directions'][direction] = target['gaze_directions'].get(direction, 0) + count
+    return merged
+
+
+def merge_total_stats(first, second):
+    """Сложение итоговой статистики двух наборов логов."""
+    return {key: first.get(key, 0) + second.get(key, 0) for key in {**first, **second}}
+
+
+def expand_paths(paths, pattern='**/behavior_log*.json*'):
+    """Файлы логов из списка путей: файлов, папок (поиск по pattern) и glob-шаблонов."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, pattern), recursive=True))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            files.extend(glob.glob(path, recursive=True))
+    return sorted(set(os.path.abspath(file) for file in files))
+
+
+def group_segments(files):
+    """Файлы, сгруппированные в потоки: сегменты одного лога (<имя>.<номер>.jsonl[.gz]) по порядку номеров,
+    остальные файлы - каждый отдельно."""
+    logs = {}
+    streams = []
+    for file_path in files:
+        match = SEGMENT_PATTERN.match(os.path.basename(file_path))
+        if match is None:
+            streams.append([file_path])
+            continue
+        key = (os.path.dirname(file_path), match.group('name'))
+        if key not in logs:
+            logs[key] = {}
+            streams.append(logs[key])
+        segments = logs[key]
+        segment = int(match.group('segment'))
+        # Пока сегмент сжимается, рядом лежат обе копии; несжатая полная
+        if segment not in segments or segments[segment].endswith('.gz'):
+            segments[segment] = file_path
+    return [stream if isinstance(stream, list) else [stream[number] for number in sorted(stream)]
+            for stream in streams]
+
+
+def segment_participants(file_path):
+    """Участник в момент открытия каждого сегмента по индексу <имя>.idx, если он есть."""
+    match = SEGMENT_PATTERN.match(os.path.basename(file_path))
+    index_path = os.path.join(os.path.dirname(file_path), match.group('name') + '.idx')
+    participants = {}
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) == 4 and fields[2]:
+                    participants.setdefault(int(fields[0]), fields[2])
+    except FileNotFoundError:
+        pass
+    return participants
+
+
+def file_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_file(file_path):
+    """Разбор одного файла (выполняется в отдельном процессе) вместе с ключом для кэша."""
+    stat = os.stat(file_path)
+    digest = hashlib.sha256()
+    events = collect_events(file_path, digest)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest(), 'events': events}
+
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return cache.get('files', {}) if cache.get('version') == CACHE_VERSION else {}
+
+
+def save_cache(cache_path, files):
+    temporary_path = cache_path + '.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': CACHE_VERSION, 'files': files}, f, ensure_ascii=False)
+    os.replace(temporary_path, cache_path)
+
+
+def cached_entry(entry, file_path):
+    """Запись кэша, если файл не изменился: совпадают размер и время изменения либо содержимое."""
+    if entry is None:
+        return None
+    stat = os.stat(file_path)
+    if entry['size'] != stat.st_size:
+        return None
+    if entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry
+    # Время изменения другое (например, файл скопирован) - сверяем содержимое
+    if entry['sha256'] == file_hash(file_path):
+        return dict(entry, mtime_ns=stat.st_mtime_ns)
+    return None
+
+
+def aggregate_logs(files, workers=None, cache_path=None):
+    """Разбор файлов логов в пуле процессов и объединение результатов.
+
+    Возвращает результаты по участникам, итоговую статистику и число файлов, взятых из кэша.
+    """
+    cache = load_cache(cache_path) if cache_path else {}
+    entries = {}
+    for file_path in files:
+        entry = cached_entry(cache.get(file_path), file_path)
+        if entry is not None:
+            entries[file_path] = entry
+    pending = [file_path for file_path in files if file_path not in entries]
+
+    if workers == 1 or len(pending) <= 1:
+        entries.update(zip(pending, map(parse_file, pending)))
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            entries.update(zip(pending, executor.map(parse_file, pending)))
+
+    if cache_path:
+        cache.update(entries)
+        save_cache(cache_path, cache)
+
+    # События всех файлов объединяются до сопоставления: сеанс может продолжаться в следующем сегменте
+    participants_events = {}
+
+    def add(participant, events):
+        previous = participants_events.get(participant)
+        participants_events[participant] = events if previous is None else merge_events(previous, events)
+
+    for stream in group_segments(files):
+        segmented = SEGMENT_PATTERN.match(os.path.basename(stream[0])) is not None
+        index = segment_participants(stream[0]) if segmented else {}
+        current = None
+        for file_path in stream:
+            events = entries[file_path]['events']
+            if segmented:
+                segment = int(SEGMENT_PATTERN.match(os.path.basename(file_path)).group('segment'))
+                current = index.get(segment, current)
+            if current is not None:
+                add(current, events['leading'])
+            for participant, participant_events in events['participants'].items():
+                add(participant, participant_events)
+            current = events['last_participant'] or current
+
+    participants = score_events(participants_events)
+    return participants, calculate_total_stats(participants), len(files) - len(pending)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Статистика попыток списывания по логам поведения')
+    parser.add_argument('paths', nargs='*', help='файлы, папки или glob-шаблоны логов поведения')
+    parser.add_argument('--pattern', default='**/behavior_log*.json*', help='шаблон поиска логов в папках')
+    parser.add_argument('--workers', type=int, default=None, help='число процессов (по умолчанию по числу ядер)')
+    parser.add_argument('--cache', default='.parser_logs_cache.json', help='файл кэша результатов')
+    parser.add_argument('--no-cache', action='store_true', help='не использовать кэш')
+    parser.add_argument('--output', help='сохранить результаты по участникам в JSON')
+    parser.add_argument('--stats', help='итоговая статистика по ранее сохраненному JSON с результатами')
+    args = parser.parse_args(argv)
+
+    if args.stats:
+        print_total_stats(calculate_total_stats(args.stats))
+        return
+
+    files = expand_paths(args.paths, args.pattern)
+    if not files:
+        parser.error('не найдено ни одного файла логов')
+
+    result, total_stats, cached = aggregate_logs(files, args.workers, None if args.no_cache else args.cache)
+    print(f"Файлов: {len(files)}, из кэша: {cached}")
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    print_total_stats(total_stats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+import gzip
+import hashlib
+import json
+import os
+import pytest
+from main import (aggregate_logs, cached_entry, calculate_total_stats, expand_paths, file_hash, group_segments,
+                  iter_log_entries, merge_results, merge_total_stats, parse_behavior_log, parse_file)
+
+
+def make_entries(participant, start=0):
+    """Записи лога поведения: начало сеанса, ручные отметки и срабатывания анализатора"""
+    def at(second):
+        return f"2025-06-30 03:{(start + second) // 60:02d}:{(start + second) % 60:02d}"
+
+    return [
+        {"timestamp": at(0), "data": {"participant_number": participant}},
+        {"timestamp": at(5), "data": {"event_type": "manual_cheating_mark", "comment": "Списывание у соседа"}},
+        {"timestamp": at(8), "data": {"suspicious_actions": 2, "gaze_history": ["left", "left", "center"]}},
+        {"timestamp": at(30), "data": {"suspicious_actions": 1, "gaze_durations": {"right": 2.5, "left": 0.5}}},
+        {"timestamp": at(40), "data": {"event_type": "face_absent", "duration": 3.0}},
+    ]
+
+
+def write_array(path, entries):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=4, ensure_ascii=False)
+    return str(path)
+
+
+def write_lines(path, entries):
+    data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries).encode("utf-8")
+    with (gzip.open if str(path).endswith(".gz") else open)(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+class TestIterLogEntries:
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+    def test_array_across_chunks(self, tmp_path, chunk_size):
+        """Тест: записи и многобайтовые символы на границах фрагментов JSON-массива"""
+        entries = make_entries("7") + make_entries("8", 60)
+        path = write_array(tmp_path / "behavior_log.json", entries)
+
+        assert list(iter_log_entries(path, chunk_size=chunk_size)) == entries
+
+    @pytest.mark.parametrize("name", ["behavior_log.jsonl", "behavior_log.jsonl.gz"])
+    def test_json_lines(self, tmp_path, name):
+        """Тест чтения JSON Lines, в том числе сжатых gzip"""
+        entries = make_entries("7") + make_entries("8", 60)
+        path = write_lines(tmp_path / name, entries)
+
+        assert list(iter_log_entries(path, chunk_size=5)) == entries
+
+    @pytest.mark.parametrize("name", ["behavior_log.json", "behavior_log.jsonl.gz"])
+    def test_digest_of_file_bytes(self, tmp_path, name):
+        """Тест: хэш считается по байтам файла, включая остаток после массива"""
+        path = tmp_path / name
+        if name.endswith(".gz"):
+            write_lines(path, make_entries("7"))
+        else:
+            write_array(path, make_entries("7"))
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n\n")
+        digest = hashlib.sha256()
+
+        list(iter_log_entries(str(path), digest, chunk_size=16))
+
+        assert digest.hexdigest() == file_hash(str(path))
+
+    def test_truncated_file(self, tmp_path):
+        """Тест ошибки для оборванной записи в конце файла"""
+        path = tmp_path / "behavior_log.json"
+        path.write_text(json.dumps(make_entries("7"))[:-20], encoding="utf-8")
+
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_log_entries(str(path), chunk_size=16))
+
+
+class TestMerge:
+
+    def setup_method(self):
+        """Настройка перед каждым тестом"""
+        self.first = {"7": {"manual_cheating_marks": 1, "detected_cheating_attempts": 1, "false_positives": 0,
+                            "gaze_directions": {"left": 1}}}
+        self.second = {"7": {"manual_cheating_marks": 2, "detected_cheating_attempts": 0, "false_positives": 3,
+                             "gaze_directions": {"left": 2, "right": 1}},
+                       "8": {"manual_cheating_marks": 0, "detected_cheating_attempts": 0, "false_positives": 1,
+                             "gaze_directions": {}}}
+
+    def test_merge_results(self):
+        """Тест объединения результатов по участникам без изменения исходных словарей"""
+        merged = merge_results(self.first, self.second)
+
+        assert merged["7"] == {"manual_cheating_marks": 3, "detected_cheating_attempts": 1, "false_positives": 3,
+                               "gaze_directions": {"left": 3, "right": 1}}
+        assert merged["8"] == self.second["8"]
+        assert merged == merge_results(self.second, self.first)
+        assert self.first["7"]["gaze_directions"] == {"left": 1}
+
+    def test_merge_total_stats(self):
+        """Тест: итоговая статистика объединения равна сумме статистик"""
+        total = merge_total_stats(calculate_total_stats(self.first), calculate_total_stats(self.second))
+
+        assert total == calculate_total_stats(merge_results(self.first, self.second))
+
+    def test_parallel_matches_single_process(self, tmp_path):
+        """Тест: разбор в пуле процессов совпадает с разбором в одном процессе и разбором общего лога"""
+        entries = [make_entries(str(participant), 60 * participant) for participant in range(4)]
+        files = [write_array(tmp_path / f"behavior_log_{index}.json", part) for index, part in enumerate(entries)]
+        combined = write_array(tmp_path / "combined.json", sum(entries, []))
+
+        parallel = aggregate_logs(files, workers=2)
+        single = aggregate_logs(files, workers=1)
+
+        assert parallel == single
+        assert parallel[0] == parse_behavior_log(combined)
+        assert parallel[1] == calculate_total_stats(parse_behavior_log(combined))
+
+
+class TestSegments:
+
+    def setup_method(self):
+        """Настройка перед каждым тестом"""
+        self.entries = [
+            {"timestamp": "2025-06-30 03:00:00", "data": {"participant_number": "12"}},
+            {"timestamp": "2025-06-30 03:00:55", "data": {"event_type": "manual_cheating_mark"}},
+            {"timestamp": "2025-06-30 03:01:00", "data": {"suspicious_actions": 2, "gaze_history": ["left"]}},
+            {"timestamp": "2025-06-30 03:02:00", "data": {"suspicious_actions": 1, "gaze_history": ["right"]}},
+        ]
+        self.expected = {"12": {"manual_cheating_marks": 1, "detected_cheating_attempts": 1, "false_positives": 1,
+                                "gaze_directions": {"left": 1, "right": 1}}}
+
+    def _rotate(self, tmp_path, with_index=True):
+        """Сегменты SegmentedLog: ротация между отметкой и срабатываниями участника"""
+        first = write_lines(tmp_path / "behavior_log.000001.jsonl.gz", self.entries[:2])
+        second = write_lines(tmp_path / "behavior_log.000002.jsonl", self.entries[2:])
+        if with_index:
+            (tmp_path / "behavior_log.idx").write_text("1\t0.000\t12\t0\n2\t60.000\t12\t0\n", encoding="utf-8")
+        return [first, second]
+
+    def test_session_across_segments(self, tmp_path):
+        """Тест: записи следующего сегмента относятся к участнику, сеанс которого начался раньше"""
+        files = self._rotate(tmp_path, with_index=False)
+
+        assert aggregate_logs(files, workers=1)[0] == self.expected
+        assert aggregate_logs(list(reversed(files)), workers=2)[0] == self.expected
+
+    def test_participant_from_index(self, tmp_path):
+        """Тест: без первого сегмента участник берется из индекса"""
+        second = self._rotate(tmp_path)[1]
+
+        participants = aggregate_logs([second])[0]
+
+        assert participants["12"]["false_positives"] == 2
+
+    def test_expand_and_group(self, tmp_path):
+        """Тест поиска и группировки сегментов; несжатая копия сегмента предпочтительнее сжатой"""
+        files = self._rotate(tmp_path)
+        write_lines(tmp_path / "behavior_log.000002.jsonl.gz", self.entries[2:])
+        other = write_array(tmp_path / "behavior_log.json", make_entries("7"))
+
+        found = expand_paths([str(tmp_path)])
+
+        assert sorted(group_segments(found)) == sorted([[other], files])
+        assert aggregate_logs(found)[0]["12"] == self.expected["12"]
+
+    def test_session_across_files(self, tmp_path):
+        """Тест: отметка в конце одного файла сопоставляется со срабатыванием в начале другого"""
+        first = write_array(tmp_path / "a.json", self.entries[:2])
+        second = write_array(tmp_path / "b.json", [self.entries[0]] + self.entries[2:])
+
+        assert aggregate_logs([first, second], workers=1)[0] == self.expected
+
+
+class TestCache:
+
+    @pytest.fixture(autouse=True)
+    def setup_log(self, tmp_path):
+        """Настройка перед каждым тестом"""
+        self.path = write_array(tmp_path / "behavior_log.json", make_entries("7"))
+        self.cache_path = str(tmp_path / "cache.json")
+        self.entry = parse_file(self.path)
+
+    def _touch(self, delta_ns=10 ** 9):
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + delta_ns))
+
+    def test_unchanged(self):
+        """Тест: неизмененный файл берется из кэша"""
+        assert cached_entry(self.entry, self.path) is self.entry
+        assert cached_entry(None, self.path) is None
+
+    def test_size_changed(self):
+        """Тест: изменение размера сбрасывает запись без чтения файла"""
+        write_array(self.path, make_entries("7") + make_entries("8", 60))
+
+        assert cached_entry(self.entry, self.path) is None
+
+    def test_mtime_changed_same_content(self):
+        """Тест: при другом времени изменения запись сохраняется, если содержимое то же"""
+        self._touch()
+
+        entry = cached_entry(self.entry, self.path)
+
+        assert entry["events"] == self.entry["events"]
+        assert entry["mtime_ns"] == os.stat(self.path).st_mtime_ns
+
+    def test_mtime_changed_other_content(self):
+        """Тест: файл того же размера с другим содержимым разбирается заново"""
+        with open(self.path, "r+", encoding="utf-8") as f:
+            data = f.read()
+            f.seek(0)
+            f.write(data.replace('"7"', '"9"'))
+        self._touch()
+
+        assert cached_entry(self.entry, self.path) is None
+
+    def test_aggregate_uses_cache(self):
+        """Тест: повторный разбор берет файл из кэша, измененный файл разбирается заново"""
+        first = aggregate_logs([self.path], cache_path=self.cache_path)
+        second = aggregate_logs([self.path], cache_path=self.cache_path)
+        write_array(self.path, make_entries("8"))
+        third = aggregate_logs([self.path], cache_path=self.cache_path)
+
+        assert (first[2], second[2], third[2]) == (0, 1, 0)
+        assert second[0] == first[0]
+        assert list(third[0]) == ["8"]
@@ -1,17 +1,33 @@
 import cv2
-from gaze_tracking import GazeTracking
+from behavior_rules import FrequentGlancesRule, RuleEngine
+from gaze_tracking import GazeTracking, direction
 import time
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Optional
 
 
 @dataclass
 class GazeData:
+    """Кадр истории: время и флаги направления из gaze_tracking.direction в одном числе."""
+    __slots__ = ("timestamp", "code")
     timestamp: float
-    is_left: bool
-    is_right: bool
-    is_center: bool
-    is_blinking: bool
+    code: int
+
+    @property
+    def is_left(self) -> bool:
+        return bool(self.code & direction.LEFT)
+
+    @property
+    def is_right(self) -> bool:
+        return bool(self.code & direction.RIGHT)
+
+    @property
+    def is_center(self) -> bool:
+        return bool(self.code & direction.CENTER)
+
+    @property
+    def is_blinking(self) -> bool:
+        return bool(self.code & direction.BLINK)
 
 
 class GazeTracker:
@@ -27,13 +43,18 @@ class GazeTracker:
         self.gaze.refresh(frame)
         frame = self.gaze.annotated_frame()  # Рамка с выделенными глазами
 
-        gaze_data = GazeData(
-            timestamp=time.time(),
-            is_left=self.gaze.is_left(),
-            is_right=self.gaze.is_right(),
-            is_center=self.gaze.is_center(),
-            is_blinking=self.gaze.is_blinking()
-        )
+        # Как в direction.classify: зрачки не найдены - моргание или нет лица, моргание важнее направления
+        if not self.gaze.pupils_located:
+            code = direction.BLINK if self.gaze.face is not None else direction.NO_FACE
+        elif self.gaze.is_blinking():
+            code = direction.BLINK
+        elif self.gaze.is_left():
+            code = direction.LEFT
+        elif self.gaze.is_right():
+            code = direction.RIGHT
+        else:
+            code = direction.CENTER
+        gaze_data = GazeData(timestamp=time.time(), code=code)
 
         cv2.imshow("Gaze Tracking", frame)  # Показ кадра с аннотацией
         if cv2.waitKey(1) == 27:  # ESC для выхода
@@ -48,20 +69,15 @@ class GazeTracker:
 
 class BehaviorAnalyzer:
     def __init__(self, gaze_history_max=10):
-        self.gaze_history: List[GazeData] = []
         self.gaze_history_max = gaze_history_max
+        cheating_threshold = 5  # Настройка порога
+        # Подозрительное поведение: слишком частые взгляды в сторону среди последних кадров
+        self.rule = FrequentGlancesRule(gaze_history_max, cheating_threshold, repeat=True)
+        self.engine = RuleEngine([self.rule], gaze_history_max)
 
     def analyze(self, gaze_data: GazeData) -> bool:
         """Анализирует паттерны взгляда, возвращает True, если есть подозрение на списывание."""
-        self.gaze_history.append(gaze_data)
-        if len(self.gaze_history) > self.gaze_history_max:
-            self.gaze_history.pop(0)
-
-        # Подозрительное поведение: слишком частые взгляды в сторону
-        suspicious_look_count = sum(1 for g in self.gaze_history if g.is_left or g.is_right)
-        cheating_threshold = 5  # Настройка порога
-
-        return suspicious_look_count >= cheating_threshold
+        return bool(self.engine.update(gaze_data.timestamp, gaze_data.code))
 
 
 class CheatingDetectorApp: